@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+CPU benchmark for the pipeline's Python-side hot paths, with a baseline
+
+benchmark_pipeline.py measures the pipeline against a (mock) model
+server; this measures what the pipeline itself costs on the CPU, over a
+pinned slice of the corpus (GEN 1-10, PSA 119, JHN 1-3 by default):
+
+    json_parse      json.loads of the chapter files           (verses/s)
+    tokenize        extract_words_from_arabic on every verse  (words/s)
+    tokenize_batch  tokenizer.tokenize, one call per chapter  (words/s)
+    validate        scripts/validate_mappings checks          (verses/s)
+    scan            scan_manifest.scan_chapter - the scanner behind
+                    complete_bible_gpu / the repair scripts   (verses/s)
+
+Files are read into memory first, so disk speed is not measured. Each
+benchmark runs --rounds times and the best round counts (least disturbed
+by other processes).
+
+--save-baseline stores the results in cache/cpu_benchmark_baseline.json
+(per machine - cache/ is not committed). A later run compares against it
+and exits with status 1 if scan, validate or tokenize throughput dropped
+by more than --threshold.
+
+Usage:
+    python3 benchmark_cpu.py --save-baseline      # On the unchanged tree
+    python3 benchmark_cpu.py                      # After a change: compare
+    python3 benchmark_cpu.py --threshold 0.1 --rounds 10
+    python3 benchmark_cpu.py --chapters GEN:1-50 --json cache/cpu_benchmark.json
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+from pipeline import scan_manifest, tokenizer
+
+MAPPING_DIR = "bible-maps-word-gemma3/mappings"
+DEFAULT_CHAPTERS = "GEN:1-10,PSA:119,JHN:1-3"
+BASELINE_PATH = os.environ.get("CPU_BENCHMARK_BASELINE", "cache/cpu_benchmark_baseline.json")
+
+ROUNDS = 5
+THRESHOLD = 0.2  # Fail on a throughput drop of more than 20%
+GATED = ["scan", "validate", "tokenize"]
+
+
+def parse_chapters(value):
+    """"GEN:1-10,PSA:119" -> [("GEN", 1), ..., ("GEN", 10), ("PSA", 119)]"""
+    chapters = []
+    for item in value.split(','):
+        book, _, span = item.strip().partition(':')
+        first, _, last = span.partition('-')
+        for chapter in range(int(first), int(last or first) + 1):
+            chapters.append((book.upper(), chapter))
+    return chapters
+
+
+def load_slice(chapters, mapping_dir=MAPPING_DIR):
+    """Raw bytes of each chapter file (missing chapters are skipped)"""
+    raws = []
+    for book, chapter in chapters:
+        path = Path(mapping_dir) / book / f"{chapter}.json"
+        if path.exists():
+            raws.append(path.read_bytes())
+        else:
+            print(f"⚠️  Skipping {book} {chapter}: {path} not found")
+    return raws
+
+
+# ----------------------------------------------------------------------
+# Benchmarks: each takes the prepared slice and returns the item count
+# ----------------------------------------------------------------------
+
+def bench_json_parse(raws, chapters_data):
+    return sum(len(json.loads(raw).get("verses", {})) for raw in raws)
+
+
+def bench_tokenize(raws, chapters_data):
+    words = 0
+    for data in chapters_data:
+        for verse_data in data.get("verses", {}).values():
+            words += len(tokenizer.extract_words_from_arabic(verse_data.get("ar", "")))
+    return words
+
+
+def bench_tokenize_batch(raws, chapters_data):
+    return sum(len(tokenizer.tokenize(v.get("ar", "") for v in data.get("verses", {}).values()))
+               for data in chapters_data)
+
+
+def bench_validate(raws, chapters_data):
+    from validate_mappings import validate_chapter_data
+    return sum(validate_chapter_data(data, "benchmark")["total_verses"] for data in chapters_data)
+
+
+def bench_scan(raws, chapters_data):
+    return sum(scan_manifest.scan_chapter(raw)["verses"] for raw in raws)
+
+
+BENCHMARKS = {
+    "json_parse": (bench_json_parse, "verses"),
+    "tokenize": (bench_tokenize, "words"),
+    "tokenize_batch": (bench_tokenize_batch, "words"),
+    "validate": (bench_validate, "verses"),
+    "scan": (bench_scan, "verses"),
+}
+
+
+def run_benchmarks(raws, rounds, names=None):
+    chapters_data = [json.loads(raw) for raw in raws]
+    results = {}
+    for name, (fn, unit) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        fn(raws, chapters_data)  # Warm-up (imports, caches)
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            items = fn(raws, chapters_data)
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        results[name] = {
+            "unit": unit,
+            "items": items,
+            "best_seconds": round(best, 6),
+            "median_seconds": round(sorted(times)[len(times) // 2], 6),
+            "throughput": round(items / best, 1) if best else 0.0,
+        }
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(report, path=BASELINE_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def compare(results, baseline, threshold):
+    """Returns {name: change} and the list of gated benchmarks that regressed"""
+    changes = {}
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if not base or not base["throughput"]:
+            continue
+        change = result["throughput"] / base["throughput"] - 1
+        changes[name] = change
+        if name in GATED and change < -threshold:
+            regressions.append(name)
+    return changes, regressions
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='CPU benchmark for the mapping pipeline')
+    parser.add_argument('--chapters', default=DEFAULT_CHAPTERS,
+                        help=f'Pinned chapters, BOOK:N or BOOK:N-M (default: {DEFAULT_CHAPTERS})')
+    parser.add_argument('--tree', default=MAPPING_DIR, help=f'Mapping tree (default: {MAPPING_DIR})')
+    parser.add_argument('--only', type=str, help=f'Comma-separated benchmarks (default: {",".join(BENCHMARKS)})')
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help=f'Rounds per benchmark (default: {ROUNDS})')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f'Allowed throughput drop vs the baseline (default: {THRESHOLD})')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help=f'Baseline file (default: {BASELINE_PATH})')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--json', type=str, help='Also write the results to this file')
+    args = parser.parse_args()
+
+    raws = load_slice(parse_chapters(args.chapters), args.tree)
+    if not raws:
+        print("❌ No chapters found")
+        sys.exit(1)
+    names = [n.strip() for n in args.only.split(',')] if args.only else None
+
+    print("="*70)
+    print("PIPELINE CPU BENCHMARK")
+    print(f"  Slice:  {args.chapters} ({len(raws)} chapters, {sum(len(r) for r in raws) / 1e6:.1f} MB)")
+    print(f"  Rounds: {args.rounds} (best counts)")
+    print("="*70)
+
+    results = run_benchmarks(raws, args.rounds, names)
+    report = {
+        "chapters": args.chapters,
+        "tree": args.tree,
+        "rounds": args.rounds,
+        "environment": environment(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    if baseline and baseline.get("chapters") != args.chapters:
+        print(f"⚠️  Baseline was taken on {baseline.get('chapters')}; not comparing")
+        baseline = None
+    changes, regressions = compare(results, baseline, args.threshold) if baseline else ({}, [])
+
+    print(f"\n{'benchmark':<15} {'items':>8} {'best ms':>9} {'median ms':>10} {'throughput':>16} {'vs baseline':>12}")
+    for name, r in results.items():
+        change = f"{changes[name]:+.1%}" if name in changes else "-"
+        flag = " ❌" if name in regressions else ""
+        print(f"{name:<15} {r['items']:>8} {r['best_seconds'] * 1000:>9.1f} {r['median_seconds'] * 1000:>10.1f} "
+              f"{r['throughput']:>10.0f} {r['unit'] + '/s':<7} {change:>10}{flag}")
+
+    if baseline and baseline.get("environment") != report["environment"]:
+        print(f"\n⚠️  Baseline environment differs: {baseline.get('environment')}")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"\nNo baseline at {args.baseline} - run with --save-baseline first")
+    elif regressions:
+        print(f"\n❌ Throughput regression (> {args.threshold:.0%}): {', '.join(regressions)}")
+        sys.exit(1)
+    else:
+        print(f"\n✅ Within {args.threshold:.0%} of the baseline ({baseline.get('created')})")
+
+
+if __name__ == "__main__":
+    main()
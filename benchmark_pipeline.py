@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Benchmark the mapping pipeline against the local mock Ollama server
+
+Runs the real pipeline code - regenerate_mappings_gpu (generate),
+repair_shifted_verses_gpu (repair) and scripts/validate_alignment_ollama
+(validate) - on a few pinned chapters, against pipeline/mock_ollama.py
+(or a real server with --host), and reports per scenario:
+
+    verses/sec, requests/sec, request latency p50/p95/p99,
+    retries / failures / timeouts / truncated answers
+
+Everything runs in a scratch workspace (a temp dir with the source texts
+symlinked in), with its own translation cache, scan manifest and output
+budget, so nothing in the repo or cache/ is touched and every run starts
+cold. The translation memory is off: every word goes to the model.
+
+Usage:
+    python3 benchmark_pipeline.py
+    python3 benchmark_pipeline.py --chapters PHP:1,JHN:3 --workers 8 --capacity 8
+    python3 benchmark_pipeline.py --only generate --latency fixed:0.5 --per-token 0.02
+    python3 benchmark_pipeline.py --failure-rate 0.05 --truncation-rate 0.05
+    python3 benchmark_pipeline.py --host http://gpu-box:11434   # A real server
+    python3 benchmark_pipeline.py --json cache/benchmark_pipeline.json
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pipeline import mock_ollama
+from pipeline.tokenizer import count_arabic_words
+
+REPO_DIR = Path(__file__).resolve().parent
+SOURCE_DIR = REPO_DIR / "bible-translations/unified"
+MAPPING_DIR = REPO_DIR / "bible-maps-word-gemma3/mappings"
+
+DEFAULT_CHAPTERS = "PHP:1,PHP:2,JUD:1,RUT:1"
+SCENARIOS = ["generate", "repair", "validate"]
+MAX_WORKERS = 4
+SHIFTS_PER_CHAPTER = 10  # Verses per chapter that lose one mapping for the repair run
+BIBLE_VERSES = 30635  # For the full-Bible projection
+
+
+def parse_chapters(value):
+    chapters = []
+    for item in value.split(','):
+        book, _, chapter = item.strip().partition(':')
+        chapters.append((book.upper(), int(chapter)))
+    return chapters
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_workspace(chapters):
+    """
+    Temp dir laid out like the repo root, with its own cache/ state:
+        bible-translations/unified   -> symlink to the real source texts
+        bible-maps-word-gemma3/mappings  (empty: generate writes here)
+        aligned/BOOK/N.json          copies of the existing mappings (validate)
+        shifted/BOOK/N.json          copies with one mapping dropped (repair)
+    """
+    workspace = Path(tempfile.mkdtemp(prefix="pipeline-bench-"))
+    # Cold, isolated state: set before any pipeline module reads these
+    for var, name in [("TRANSLATION_CACHE", "translations.sqlite3"),
+                      ("SCAN_MANIFEST", "scan_manifest.json"),
+                      ("OUTPUT_BUDGET", "output_budget.json"),
+                      ("TOKEN_INDEX", "token_index.npz"),
+                      ("OLLAMA_CONTROLLER_STATS", "ollama_controller.json")]:
+        os.environ[var] = str(workspace / "cache" / name)
+
+    (workspace / "bible-translations").mkdir()
+    os.symlink(SOURCE_DIR, workspace / "bible-translations/unified")
+    (workspace / "bible-maps-word-gemma3/mappings").mkdir(parents=True)
+
+    for book, chapter in chapters:
+        for tree in ("aligned", "shifted"):
+            (workspace / tree / book).mkdir(parents=True, exist_ok=True)
+        source = MAPPING_DIR / book / f"{chapter}.json"
+        shutil.copy(source, workspace / "aligned" / book / f"{chapter}.json")
+
+        with open(source, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with open(SOURCE_DIR / book / f"{chapter}.json", 'r', encoding='utf-8') as f:
+            source_verses = json.load(f)
+
+        shifted = 0
+        for verse_num, verse in data["verses"].items():
+            if shifted >= SHIFTS_PER_CHAPTER or verse_num not in source_verses:
+                continue
+            expected = count_arabic_words(source_verses[verse_num]['ar'])
+            mappings = verse["mappings"]
+            if len(mappings) == expected and expected >= 3:
+                del mappings[len(mappings) // 2]
+                shifted += 1
+        with open(workspace / "shifted" / book / f"{chapter}.json", 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    return workspace
+
+
+def run_generate(chapters, workers):
+    import regenerate_mappings_gpu as generate
+    generate.USE_TRANSLATION_MEMORY = False
+    verses = [0]
+
+    def count(chapter_output):
+        verses[0] += len(chapter_output.output["verses"])
+
+    generate.run_generation([(book, str(chapter)) for book, chapter in chapters], workers,
+                            on_chapter_done=count)
+    return verses[0]
+
+
+def run_repair(chapters, workers):
+    import repair_shifted_verses_gpu as repair
+    shifts = repair.find_single_shift_verses(mapping_dir="shifted")
+    chapters = repair.group_by_chapter(shifts)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda item: repair.repair_chapter_shifts(
+                item[0][0], item[0][1], [v[2] for v in item[1]], mapping_dir="shifted"),
+            chapters.items()))
+    return sum(1 for chapter in results for success, _ in chapter.values() if success)
+
+
+def run_validate(chapters, workers):
+    import scripts.validate_alignment_ollama as validate
+    verses = 0
+    for book, chapter in chapters:
+        validate.validate_and_fix_chapter(book, str(chapter), Path("aligned"), auto_fix=False)
+        with open(Path("aligned") / book / f"{chapter}.json", 'r', encoding='utf-8') as f:
+            verses += sum(1 for v in json.load(f)["verses"].values() if len(v["mappings"]) >= 3)
+    return verses
+
+
+def run_scenario(name, fn, chapters, workers, verbose):
+    """Run one scenario and return its metrics"""
+    from pipeline import ollama_client
+    client = ollama_client.get_client()
+    before = dict(client.stats)
+    client.latencies.clear()
+
+    output = io.StringIO()
+    start = time.time()
+    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+        verses = fn(chapters, workers)
+    wall = time.time() - start
+
+    delta = {key: client.stats[key] - before[key] for key in before}
+    latencies = sorted(client.latencies)
+    return {
+        "scenario": name,
+        "verses": verses,
+        "wall_seconds": round(wall, 3),
+        "verses_per_second": round(verses / wall, 3) if wall else 0.0,
+        "requests": delta["requests"],
+        "requests_per_second": round(delta["requests"] / wall, 3) if wall else 0.0,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "retries": delta["retries"],
+        "failures": delta["failures"],
+        "timeouts": delta["timeouts"],
+        "truncated": delta["truncated"],
+    }
+
+
+def print_report(results):
+    def ms(value):
+        return f"{value * 1000:.0f}" if value is not None else "-"
+
+    print(f"\n{'scenario':<10} {'verses':>7} {'wall s':>8} {'verse/s':>8} {'reqs':>6} {'req/s':>7} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'retry':>6} {'fail':>5} {'trunc':>6}")
+    for r in results:
+        print(f"{r['scenario']:<10} {r['verses']:>7} {r['wall_seconds']:>8.2f} {r['verses_per_second']:>8.2f} "
+              f"{r['requests']:>6} {r['requests_per_second']:>7.2f} {ms(r['latency_p50']):>7} "
+              f"{ms(r['latency_p95']):>7} {ms(r['latency_p99']):>7} {r['retries']:>6} "
+              f"{r['failures']:>5} {r['truncated']:>6}")
+
+    for r in results:
+        if r["scenario"] == "generate" and r["verses_per_second"]:
+            hours = BIBLE_VERSES / r["verses_per_second"] / 3600
+            print(f"\nProjected full Bible generation ({BIBLE_VERSES:,} verses): {hours:.1f} hours")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline against a mock Ollama server')
+    parser.add_argument('--chapters', default=DEFAULT_CHAPTERS,
+                        help=f'BOOK:CHAPTER list to run on (default: {DEFAULT_CHAPTERS})')
+    parser.add_argument('--only', type=str, help=f'Comma-separated scenarios (default: {",".join(SCENARIOS)})')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Parallel jobs / in-flight ceiling (default: {MAX_WORKERS})')
+    parser.add_argument('--host', type=str, help='Benchmark a real Ollama server instead of the mock')
+    parser.add_argument('--json', type=str, help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show the scripts\' own output')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch workspace')
+    mock_ollama.add_arguments(parser)
+    args = parser.parse_args()
+
+    chapters = parse_chapters(args.chapters)
+    scenarios = [s.strip() for s in args.only.split(',')] if args.only else SCENARIOS
+    json_path = Path(args.json).resolve() if args.json else None
+
+    server = None
+    if args.host:
+        api_url = f"{args.host.rstrip('/')}/api/generate"
+    else:
+        server = mock_ollama.MockOllama(mock_ollama.config_from_args(args)).start()
+        api_url = server.api_url
+
+    workspace = make_workspace(chapters)
+    os.chdir(workspace)
+
+    from pipeline import ollama_client
+    ollama_client.configure(api_url=api_url, max_in_flight=args.workers)
+    # Import the scripts now: they reconfigure sys.stdout on import, which
+    # fails once their output is being captured
+    import regenerate_mappings_gpu
+    import repair_shifted_verses_gpu
+    import scripts.validate_alignment_ollama
+
+    print("="*70)
+    print("PIPELINE BENCHMARK")
+    print(f"  Server:    {api_url}{' (mock)' if server else ''}")
+    if server:
+        print(f"  Mock:      latency {args.latency} + {args.per_token}s/token, capacity {args.capacity}, "
+              f"{args.failure_rate:.0%} failures, {args.truncation_rate:.0%} truncations, seed {args.seed}")
+    print(f"  Chapters:  {', '.join(f'{b} {c}' for b, c in chapters)}")
+    print(f"  Workers:   {args.workers}")
+    print(f"  Workspace: {workspace}")
+    print("="*70)
+
+    runners = {"generate": run_generate, "repair": run_repair, "validate": run_validate}
+    results = []
+    try:
+        for name in scenarios:
+            print(f"⏱️  {name}...")
+            results.append(run_scenario(name, runners[name], chapters, args.workers, args.verbose))
+    finally:
+        os.chdir(REPO_DIR)
+        if server:
+            server.stop()
+        if not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    print_report(results)
+    print(f"\nConcurrency: {ollama_client.controller_summary()}")
+    print(f"Streaming: {ollama_client.stream_summary()}")
+    if server:
+        print(f"Mock served: {server.stats}")
+
+    if json_path:
+        report = {
+            "server": api_url,
+            "mock": vars(mock_ollama.config_from_args(args)) if server else None,
+            "chapters": [f"{b}:{c}" for b, c in chapters],
+            "workers": args.workers,
+            "results": results,
+        }
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,19 @@ GPU-Optimized Complete Bible Repair Pipeline
 Optimized for Apple M4 with native Ollama GPU acceleration
 
 All-inclusive script that intelligently handles:
-1. Fast shift repair (single-word missing) - GPU parallel processing (4 workers)
-2. Full robust repair (multi-word missing) - GPU accelerated
-3. Multiple repair passes until complete or no progress
-4. Final validation and statistics
+1. Scan for misaligned verses
+2. One alignment repair pass - existing mappings are kept and only the
+   missing words go to the model (GPU parallel processing, 4 workers)
+3. Final validation and statistics
 
 Works on ALL books (Old Testament + New Testament)
 """
 
 import subprocess
 import sys
-import json
 from pathlib import Path
-import time
+
+from pipeline import scan_manifest
 
 def print_header(title):
     """Print a formatted header"""
@@ -59,46 +59,20 @@ def count_misaligned_verses(mapping_dir="bible-maps-word-gemma3/mappings", books
     Returns:
         (misaligned, single_shifts, multi_shifts) tuples with verse data
     """
-    import re
-
     misaligned = []
     single_shifts = []
     multi_shifts = []
 
-    for book_dir in sorted(Path(mapping_dir).iterdir()):
-        if not book_dir.is_dir():
-            continue
-
-        # Apply filter if provided
-        if books_filter and book_dir.name not in books_filter:
-            continue
-
-        for chapter_file in sorted(book_dir.glob("*.json")):
-            try:
-                with open(chapter_file, 'r') as f:
-                    data = json.load(f)
-
-                book = data.get("book", book_dir.name)
-                chapter = data.get("chapter", chapter_file.stem)
-
-                for verse_num, verse_data in data.get("verses", {}).items():
-                    ar_text = verse_data.get("ar", "")
-                    mappings = verse_data.get("mappings", [])
-
-                    # Count expected words (same logic as repair scripts)
-                    tokens = re.split(r'\s+', ar_text)
-                    expected = len([t for t in tokens if len(t.strip()) >= 3])
-                    actual = len(mappings)
-                    diff = expected - actual
-
-                    if diff > 0:
-                        misaligned.append((book, chapter, verse_num, expected, actual, diff))
-                        if diff == 1:
-                            single_shifts.append((book, chapter, verse_num))
-                        else:
-                            multi_shifts.append((book, chapter, verse_num))
-            except Exception as e:
-                print(f"⚠️  Error reading {chapter_file}: {e}")
+    # The manifest re-parses only chapters changed since the last scan
+    # (i.e. the ones the previous repair pass rewrote)
+    for book, chapter, results in scan_manifest.scan(mapping_dir, books_filter):
+        for verse_num, expected, actual in results["misaligned"]:
+            diff = expected - actual
+            misaligned.append((book, chapter, verse_num, expected, actual, diff))
+            if diff == 1:
+                single_shifts.append((book, chapter, verse_num))
+            else:
+                multi_shifts.append((book, chapter, verse_num))
 
     return misaligned, single_shifts, multi_shifts
 
@@ -114,25 +88,8 @@ def get_all_books(mapping_dir="bible-maps-word-gemma3/mappings"):
 
 def count_total_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
     """Count total verses across all books"""
-    total_chapters = 0
-    total_verses = 0
-
-    for book_dir in sorted(Path(mapping_dir).iterdir()):
-        if not book_dir.is_dir():
-            continue
-
-        chapter_files = list(book_dir.glob("*.json"))
-        total_chapters += len(chapter_files)
-
-        for chapter_file in chapter_files:
-            try:
-                with open(chapter_file, 'r') as f:
-                    data = json.load(f)
-                total_verses += len(data.get("verses", {}))
-            except:
-                pass
-
-    return total_chapters, total_verses
+    chapters = scan_manifest.scan(mapping_dir)
+    return len(chapters), sum(results["verses"] for _, _, results in chapters)
 
 
 def main():
@@ -143,10 +100,8 @@ def main():
 
     print("This all-inclusive script will:")
     print("  1. Scan all Bible books for misaligned verses")
-    print("  2. Run GPU-accelerated fast shift repair (4x parallel workers)")
-    print("  3. Run GPU-accelerated full robust repair")
-    print("  4. Repeat steps 2-3 until complete or no progress")
-    print("  5. Generate final completion report")
+    print("  2. Align existing mappings and translate only the missing words (4x parallel workers)")
+    print("  3. Generate final completion report")
     print()
     print("⚡ Expected speedup: 3-5x faster than CPU version!")
     print("💾 Optimized for M4 with 16GB unified memory")
@@ -178,107 +133,28 @@ def main():
         show_final_stats()
         return
 
-    # Track progress across repair passes
-    max_passes = 5  # Prevent infinite loops
-    pass_num = 1
-    previous_count = len(misaligned)
-
-    while len(misaligned) > 0 and pass_num <= max_passes:
-        print_header(f"REPAIR PASS {pass_num}")
-        print(f"Starting pass with {len(misaligned)} misaligned verses")
-        print(f"  Single-word shifts: {len(single_shifts)}")
-        print(f"  Multi-word issues:  {len(multi_shifts)}")
-        print()
-
-        # Step A: GPU-accelerated fast shift repair (if applicable)
-        if len(single_shifts) > 0:
-            print_header(f"PASS {pass_num}A: GPU-ACCELERATED FAST SHIFT REPAIR")
-            print(f"Repairing {len(single_shifts)} single-word shifts...")
-
-            # GPU estimate: ~5-10 seconds per verse with 4 parallel workers
-            estimated_minutes = (len(single_shifts) * 7.5) / (60 * 4)  # 7.5s avg, 4 workers
-            estimated_hours = estimated_minutes / 60
+    # One repair pass: the alignment in repair_misaligned_verses.py places
+    # every existing mapping and sends only the missing words to the model,
+    # so single- and multi-word gaps are fixed together
+    print_header("STEP 2: GPU-ACCELERATED ALIGNMENT REPAIR")
+    print(f"Repairing {len(misaligned)} verses "
+          f"({sum(diff for *_, diff in misaligned)} missing words)...")
+
+    # GPU estimate: ~5-10 seconds per missing-word batch with 4 parallel workers
+    estimated_minutes = (len(misaligned) * 7.5) / (60 * 4)  # 7.5s avg, 4 workers
+    if estimated_minutes < 60:
+        print(f"Estimated time: ~{estimated_minutes:.1f} minutes")
+    else:
+        print(f"Estimated time: ~{estimated_minutes / 60:.1f} hours ({estimated_minutes:.0f} minutes)")
+    print("\n⚠️  You can stop with Ctrl+C and resume later.\n")
 
-            if estimated_hours < 1:
-                print(f"Estimated time: ~{estimated_minutes:.1f} minutes")
-            else:
-                print(f"Estimated time: ~{estimated_hours:.1f} hours ({estimated_minutes:.0f} minutes)")
-
-            print("Using 4 parallel workers (optimized for M4)")
-            print("\n⚠️  You can stop with Ctrl+C and resume later.\n")
-
-            success = run_command(
-                "GPU-accelerated fast shift repair",
-                "python3 repair_shifted_verses_gpu.py --workers 4 --all"
-            )
-
-            if not success:
-                print("⚠️  Fast shift repair interrupted or had issues")
-                user_choice = input("\nContinue to full repair? (y/n): ")
-                if user_choice.lower() != 'y':
-                    print("Stopping repair process.")
-                    break
-        else:
-            print(f"✅ No single-word shifts in pass {pass_num}, skipping fast repair")
-
-        # Re-scan after fast repair
-        print(f"\n🔍 Re-scanning after fast shift repair...")
-        misaligned, single_shifts, multi_shifts = count_misaligned_verses()
-        print(f"   Remaining: {len(misaligned)} verses ({len(single_shifts)} single, {len(multi_shifts)} multi)")
-
-        # Step B: GPU-accelerated full robust repair (if still needed)
-        if len(misaligned) > 0:
-            print_header(f"PASS {pass_num}B: GPU-ACCELERATED FULL ROBUST REPAIR")
-            print(f"Repairing {len(misaligned)} remaining verses...")
-
-            # GPU estimate: ~15-20 seconds per verse (vs 50 seconds on CPU)
-            estimated_hours = (len(misaligned) * 17.5) / 3600
-            cpu_hours = (len(misaligned) * 50) / 3600
-            speedup = cpu_hours / estimated_hours if estimated_hours > 0 else 1
-
-            print(f"Estimated time: ~{estimated_hours:.1f} hours")
-            print(f"CPU equivalent: ~{cpu_hours:.1f} hours (speedup: ~{speedup:.1f}x)")
-            print("\n⚠️  This will run for a while. You can stop with Ctrl+C and resume later.\n")
-
-            success = run_command(
-                "GPU-accelerated full robust repair",
-                "python3 repair_misaligned_verses.py"
-            )
-
-            if not success:
-                print("⚠️  Full repair interrupted or had issues")
-                break
-        else:
-            print(f"✅ No remaining misaligned verses after pass {pass_num}")
-
-        # Re-scan after full repair
-        print(f"\n🔍 Re-scanning after full repair...")
-        misaligned, single_shifts, multi_shifts = count_misaligned_verses()
-
-        print(f"\nPass {pass_num} complete:")
-        print(f"  Remaining misaligned: {len(misaligned)} verses")
-        print(f"  Single-word shifts:   {len(single_shifts)}")
-        print(f"  Multi-word issues:    {len(multi_shifts)}")
-
-        # Check for progress
-        verses_fixed = previous_count - len(misaligned)
-        print(f"  Verses fixed this pass: {verses_fixed}")
-
-        if verses_fixed == 0:
-            print("\n⚠️  No progress made in this pass. Stopping.")
-            break
-
-        if len(misaligned) == 0:
-            print(f"\n🎉 All verses repaired after {pass_num} pass(es)!")
-            break
-
-        # Prepare for next pass
-        previous_count = len(misaligned)
-        pass_num += 1
-
-        if pass_num <= max_passes:
-            print(f"\n🔄 Starting next repair pass...")
-            time.sleep(2)  # Brief pause before next pass
+    previous_count = len(misaligned)
+    success = run_command(
+        "GPU-accelerated alignment repair",
+        "python3 repair_misaligned_verses.py --workers 4"
+    )
+    if not success:
+        print("⚠️  Repair interrupted or had issues")
 
     # Final validation
     print_header("FINAL VALIDATION")
@@ -290,6 +166,7 @@ def main():
     print(f"  Single-word shifts: {len(single_shifts)} verses")
     print(f"  Multi-word issues:  {len(multi_shifts)} verses")
     print(f"  Total misaligned:   {len(misaligned)} verses")
+    print(f"  Fixed by the pass:  {previous_count - len(misaligned)} verses")
 
     # Generate detailed report if issues remain
     if len(misaligned) > 0:
@@ -336,9 +213,9 @@ def main():
 
     print_header("GPU PERFORMANCE SUMMARY")
     print("🚀 This GPU-optimized pipeline provided:")
-    print("  • 3-5x faster single-word repairs with parallel processing")
-    print("  • ~3x faster multi-word repairs with GPU acceleration")
-    print("  • Intelligent multi-pass repair strategy")
+    print("  • Parallel repairs with an adaptive in-flight limit")
+    print("  • Only missing words sent to the model (existing translations kept)")
+    print("  • A single alignment pass instead of repeated repair passes")
     print("  • Lower timeouts (faster failure detection)")
     print("  • Better resource utilization on Apple M4")
     print()
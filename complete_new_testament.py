@@ -41,7 +41,7 @@ def run_command(description, command):
 
 def count_misaligned_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
     """Count verses with misalignment in NT books only"""
-    import re
+    from pipeline.token_index import get_token_index
 
     # NT books only
     nt_books = [
@@ -51,6 +51,7 @@ def count_misaligned_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
         'HEB', 'JAS', '1PE', '2PE', '1JN', '2JN', '3JN', 'JUD', 'REV'
     ]
 
+    index = get_token_index()
     misaligned = []
     single_shifts = []
     multi_shifts = []
@@ -75,9 +76,7 @@ def count_misaligned_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
                     ar_text = verse_data.get("ar", "")
                     mappings = verse_data.get("mappings", [])
 
-                    # Count expected words
-                    tokens = re.split(r'\s+', ar_text)
-                    expected = len([t for t in tokens if len(t.strip()) >= 3])
+                    expected = index.expected_count(book, chapter, verse_num, ar_text)
                     actual = len(mappings)
                     diff = expected - actual
 
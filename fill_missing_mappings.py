@@ -4,19 +4,25 @@ Fill in missing verse mappings in existing Bible mapping files
 Only processes verses that have empty mappings arrays
 """
 
-import json
 import os
-import requests
 import re
 import sys
 from pathlib import Path
 
+from pipeline import ollama_client, output_budget, streaming
+from pipeline.mapping_journal import ChapterJournal
+from pipeline.tokenizer import mapped_words
+from pipeline.translation_cache import cached_batch
+
 # Force unbuffered output for real-time progress updates
 sys.stdout.reconfigure(line_buffering=True)
 
-OLLAMA_API = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
+# Bump when a prompt changes so cached translations are not reused
+BATCH_PROMPT_VERSION = "verse-batch-v1"
+
+@cached_batch(MODEL, BATCH_PROMPT_VERSION)
 def translate_verse_batch(arabic_words, full_verse_ar, full_verse_en):
     """
     Translate ALL words in a verse at once using Gemma 3 (MUCH faster!)
@@ -35,21 +41,14 @@ Words to translate:
 
 Provide ONLY the English translation for each word (one per line, no labels, no explanations):"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 200  # More tokens for batch response
-        }
+    options = {
+        "temperature": 0.1  # num_predict is sized per batch by output_budget
     }
 
     try:
-        response = requests.post(OLLAMA_API, json=payload, timeout=120)
-        response.raise_for_status()
-        result = response.json()
-        response_text = result.get("response", "").strip()
+        response_text = ollama_client.generate(MODEL, prompt, options, timeout=120,
+                                               stream=streaming.plain(len(arabic_words)),
+                                               budget=output_budget.plan(MODEL, len(arabic_words), "plain"))
 
         # Parse the response - expect one translation per line
         translations = []
@@ -77,36 +76,14 @@ Provide ONLY the English translation for each word (one per line, no labels, no
         return {word: None for word in arabic_words}
 
 
-def extract_words_from_arabic(arabic_text):
-    """
-    Extract individual words from Arabic text, preserving positions
-    Returns list of (word, start_pos, end_pos) tuples
-    """
-    # Split by whitespace but track positions
-    words = []
-    current_pos = 0
-
-    # Split by whitespace
-    tokens = re.split(r'(\s+)', arabic_text)
-
-    for token in tokens:
-        if token.strip():  # Not whitespace
-            start = current_pos
-            end = current_pos + len(token)
-            words.append((token, start, end))
-        current_pos += len(token)
-
-    return words
-
-
 def fill_missing_verses_in_chapter(book, chapter, mapping_file):
     """
     Fill in missing verse mappings in an existing mapping file
     Only processes verses with empty mappings arrays
     """
-    # Read the existing mapping file
-    with open(mapping_file, 'r', encoding='utf-8') as f:
-        output = json.load(f)
+    # Read the existing mapping file (plus the journal of an interrupted run)
+    journal = ChapterJournal(mapping_file)
+    output = journal.load(book, chapter)
 
     # Count verses that need mapping
     verses_to_process = []
@@ -115,6 +92,8 @@ def fill_missing_verses_in_chapter(book, chapter, mapping_file):
             verses_to_process.append(verse_num)
 
     if not verses_to_process:
+        if journal.exists():
+            journal.compact(output)
         print(f"  ✓ {book} {chapter} - All verses already have mappings")
         return True, 0
 
@@ -127,11 +106,8 @@ def fill_missing_verses_in_chapter(book, chapter, mapping_file):
         arabic = verse_data['ar']
         english = verse_data['en']
 
-        # Extract Arabic words with positions
-        arabic_words_with_pos = extract_words_from_arabic(arabic)
-
-        # Filter words (skip very short words - likely particles)
-        filtered_words = [(w, s, e) for w, s, e in arabic_words_with_pos if len(w) >= 3]
+        # Arabic words with positions, minus very short words (likely particles)
+        filtered_words = mapped_words(arabic)
 
         # Batch translate all words in this verse
         words_only = [w for w, s, e in filtered_words]
@@ -152,13 +128,15 @@ def fill_missing_verses_in_chapter(book, chapter, mapping_file):
         # Update verse with new mappings
         output["verses"][verse_num]["mappings"] = mappings
 
-        # SAVE AFTER EACH VERSE (checkpoint for resume)
-        with open(mapping_file, 'w', encoding='utf-8') as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        # CHECKPOINT AFTER EACH VERSE (one fsync'd journal line, for resume)
+        journal.append(verse_num, output["verses"][verse_num])
 
         percent = (idx / total_missing) * 100
         print(f"     {book} {chapter}:{verse_num} - {idx}/{total_missing} ({percent:.1f}%)")
 
+    # Write the chapter JSON once and drop the journal
+    journal.compact(output)
+
     return True, total_missing
 
 
@@ -204,6 +182,7 @@ def scan_and_fill_missing_mappings():
     print(f"✅ COMPLETE!")
     print(f"   Processed: {total_chapters_processed} chapters")
     print(f"   Filled: {total_verses_filled} verses")
+    print(f"   Output budget: {output_budget.summary()}")
     print("="*70)
 
 
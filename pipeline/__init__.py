@@ -0,0 +1,6 @@
+"""
+Shared building blocks for the Bible word-mapping pipeline scripts
+
+Top-level scripts (regenerate_*, repair_*, complete_*) and the helpers in
+scripts/ import from here instead of carrying their own copies.
+"""
@@ -0,0 +1,124 @@
+"""
+Align a verse's existing mappings against its expected words
+
+The repair scripts used to find "the" missing word by walking expected
+words and mappings side by side until the first mismatch. That only works
+when exactly one word is missing and nothing else is off, so every other
+verse went back to the model in full, and complete_bible_gpu.py looped
+over repair passes hoping the shapes would eventually become single
+shifts.
+
+align() diffs the two word sequences once (difflib's longest-matching-block
+alignment over the folded Arabic words - pipeline/normalization.py - so a
+mapping whose harakat or hamza differ from the source still counts), then
+classifies every position:
+
+    kept     expected word matched by a mapping in sequence
+    moved    expected word whose mapping exists, but out of order
+    missing  expected word with no mapping (or one with an empty translation)
+    extra    mapping matching no expected word (dropped on rebuild)
+
+Only the missing words need the model; rebuild() reuses every existing
+translation and takes the word and start/end from the source text, which
+also fixes stale positions and respelled words (`respelled` lists them).
+
+Usage:
+    alignment = align(mapped_words(arabic), verse["mappings"])
+    alignment = align(index.mapped_words(...), verse["mappings"], keys=index.folded_keys(...))
+    translations = translate(alignment.missing_words(), ...)    # {word: english}
+    verse["mappings"] = alignment.rebuild(translations)
+"""
+
+import difflib
+
+from pipeline.normalization import fold_all
+
+
+class Alignment:
+    """Expected words vs existing mappings of one verse (see align())"""
+
+    def __init__(self, words, mappings, pairs, moved, extra):
+        self.words = words
+        self.mappings = mappings
+        self.pairs = pairs  # expected index -> mapping index
+        self.moved = moved
+        self.extra = extra
+        self.missing = [i for i in range(len(words)) if i not in pairs]
+
+    @property
+    def kept(self):
+        return len(self.pairs) - len(self.moved)
+
+    @property
+    def respelled(self):
+        """Paired expected words whose mapping spells the word differently"""
+        return sorted(i for i, j in self.pairs.items() if self.mappings[j].get("ar") != self.words[i][0])
+
+    @property
+    def complete(self):
+        """Nothing to translate: every expected word has a usable mapping"""
+        return not self.missing
+
+    def missing_words(self):
+        """Arabic words still needing a translation, in verse order"""
+        return [self.words[i][0] for i in self.missing]
+
+    def rebuild(self, translations=None):
+        """
+        Mappings in verse order: existing translations where matched, else
+        translations[word]; words without either are left out
+        """
+        translations = translations or {}
+        mappings = []
+        for i, (word, start, end) in enumerate(self.words):
+            if i in self.pairs:
+                english = self.mappings[self.pairs[i]]["en"]
+            else:
+                english = translations.get(word)
+            if english:
+                mappings.append({"ar": word, "en": english, "start": start, "end": end})
+        return mappings
+
+    def summary(self):
+        return (f"{self.kept} kept, {len(self.moved)} moved, "
+                f"{len(self.missing)} missing, {len(self.extra)} extra, "
+                f"{len(self.respelled)} respelled")
+
+
+def align(words, mappings, keys=None):
+    """
+    words:    [(word, start, end)] expected for the verse (tokenizer.mapped_words)
+    mappings: the verse's existing mapping dicts
+    keys:     folded keys of words, if precomputed (TokenIndex.folded_keys)
+    """
+    expected = keys if keys is not None else fold_all(w for w, _, _ in words)
+    actual = fold_all(str(m.get("ar") or "") for m in mappings)
+    usable = [bool(str(m.get("en") or "").strip()) for m in mappings]
+
+    pairs = {}
+    matcher = difflib.SequenceMatcher(None, expected, actual, autojunk=False)
+    for i, j, size in matcher.get_matching_blocks():
+        for k in range(size):
+            if usable[j + k]:
+                pairs[i + k] = j + k
+
+    # Mappings left over whose word is still unmatched elsewhere were
+    # reordered: pair them with the remaining occurrences in order
+    unmatched = {}
+    for i, word in enumerate(expected):
+        if i not in pairs:
+            unmatched.setdefault(word, []).append(i)
+    used = set(pairs.values())
+    moved = []
+    extra = []
+    for j, word in enumerate(actual):
+        if j in used or not usable[j]:
+            continue
+        if unmatched.get(word):
+            i = unmatched[word].pop(0)
+            pairs[i] = j
+            moved.append(i)
+        else:
+            extra.append(j)
+
+    return Alignment(words, mappings, pairs, sorted(moved), extra)
@@ -0,0 +1,193 @@
+"""
+AIMD concurrency controller for requests to the Ollama server
+
+The scripts used to hard-code MAX_WORKERS=4, a 0/2/4/6 s start-up stagger
+and TIMEOUT=20 - values tuned for one M4 laptop that starve a fast server
+or time out on a slow CPU box. This controller adapts instead:
+
+- Additive increase: while callers are queued waiting for a slot and
+  latency is near its best observed level, the in-flight limit grows by
+  about one per limit-sized window of successful requests
+- Multiplicative decrease: a timeout, a retryable server error (429/5xx)
+  or latency rising well above its baseline cuts the limit by
+  DECREASE_FACTOR (at most once per latency window)
+- Adaptive timeouts: a caller's timeout is a floor, stretched to
+  TIMEOUT_FACTOR x the observed p95 latency when the server is slow
+
+It lives on the shared ollama_client event loop, so every script that
+goes through pipeline/ollama_client.py shares one controller per process.
+snapshot() exports the current limit, throughput, latency percentiles and
+timeout rate; the client also writes it to cache/ollama_controller.json.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+
+MIN_LIMIT = 1
+DECREASE_FACTOR = 0.7
+LATENCY_TOLERANCE = 2.0  # Back off when smoothed latency > 2x its baseline
+EWMA_ALPHA = 0.2
+WINDOW = 200  # Recent requests kept for percentiles / timeout rate
+BUCKET_WINDOW = 50  # Smoothed-latency history kept per request size
+THROUGHPUT_WINDOW = 60  # Seconds
+TIMEOUT_FACTOR = 4.0
+MAX_TIMEOUT = 600
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class AIMDController:
+    """Adaptive in-flight limit; acquire()/release() must run on one event loop"""
+
+    def __init__(self, max_limit, initial=None, min_limit=MIN_LIMIT):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial if initial is not None else max(min_limit, max_limit // 2))
+        self.in_flight = 0
+        self.waiting = 0
+
+        self._buckets = {}  # Request size -> [latency EWMA, EWMA history]
+        self._latencies = deque(maxlen=WINDOW)
+        self._outcomes = deque(maxlen=WINDOW)  # True = timed out / overloaded
+        self._completions = deque()
+        self._last_decrease = 0.0
+        self._since_decrease = 0
+        self._condition = None
+
+        self.increases = 0
+        self.decreases = 0
+
+    def _clamp(self):
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), self.limit))
+
+    # ------------------------------------------------------------------
+    # Slots
+    # ------------------------------------------------------------------
+
+    async def acquire(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        self.waiting += 1
+        try:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+                self.in_flight += 1
+        finally:
+            self.waiting -= 1
+
+    async def release(self, latency=None, overloaded=False, tokens=None):
+        """
+        Free a slot and feed the outcome back:
+            latency     - seconds, for a completed request
+            overloaded  - True for a timeout or retryable server error
+            tokens      - tokens generated (Ollama's eval_count), so requests
+                          of different sizes are compared per token
+        """
+        now = time.monotonic()
+        if overloaded:
+            self._outcomes.append(True)
+            self._decrease(now)
+        elif latency is not None:
+            self._outcomes.append(False)
+            self._latencies.append(latency)
+            self._completions.append(now)
+            self._on_success(latency, tokens, now)
+
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    # ------------------------------------------------------------------
+    # AIMD
+    # ------------------------------------------------------------------
+
+    def _on_success(self, latency, tokens, now):
+        # Prompt processing makes short answers cost far more per token than
+        # long ones, so latency is only compared between requests of similar
+        # size (half-octave buckets of generated tokens)
+        bucket = int(2 * math.log2(tokens)) if tokens else -1
+        cost = latency / tokens if tokens else latency
+        state = self._buckets.get(bucket)
+        if state is None:
+            state = self._buckets[bucket] = [cost, deque(maxlen=BUCKET_WINDOW)]
+        else:
+            state[0] += EWMA_ALPHA * (cost - state[0])
+        ewma, history = state
+        history.append(ewma)
+        # Best smoothed latency over the recent window = the uncongested level
+        baseline = min(history)
+        self._since_decrease += 1
+
+        if ewma > baseline * LATENCY_TOLERANCE:
+            # Requests already in flight at the last cut still carry the old
+            # load; wait for them to drain before judging the new limit
+            if self._since_decrease > self.limit:
+                self._decrease(now)
+        elif self.waiting > 0 and self.limit < self.max_limit:
+            # Demand exceeds the limit and the server keeps up: grow ~1 per window
+            self.limit += 1.0 / self.limit
+            self._clamp()
+            self.increases += 1
+
+    def _decrease(self, now):
+        # One cut per latency window, so a burst of timeouts from the same
+        # overload does not collapse the limit to the minimum
+        window = _percentile(self._latencies, 0.5) or 1.0
+        if now - self._last_decrease < window:
+            return
+        self.limit *= DECREASE_FACTOR
+        self._clamp()
+        self._last_decrease = now
+        self._since_decrease = 0
+        self.decreases += 1
+
+    # ------------------------------------------------------------------
+    # Timeouts / export
+    # ------------------------------------------------------------------
+
+    def timeout_for(self, floor):
+        """Per-request timeout: the caller's value, stretched on a slow server"""
+        p95 = _percentile(self._latencies, 0.95)
+        if p95 is None:
+            return floor
+        return max(floor, min(MAX_TIMEOUT, TIMEOUT_FACTOR * p95))
+
+    def throughput(self):
+        """Completed requests per second over the last THROUGHPUT_WINDOW seconds"""
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        while self._completions and self._completions[0] < cutoff:
+            self._completions.popleft()
+        if not self._completions:
+            return 0.0
+        span = max(1.0, time.monotonic() - self._completions[0])
+        return len(self._completions) / span
+
+    def snapshot(self):
+        """Current state as a plain dict (safe to json.dump)"""
+        outcomes = list(self._outcomes)
+        latencies = list(self._latencies)
+        return {
+            "limit": round(self.limit, 2),
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "throughput_rps": round(self.throughput(), 3),
+            "latency_p50": _percentile(latencies, 0.5),
+            "latency_p95": _percentile(latencies, 0.95),
+            "timeout_rate": round(sum(outcomes) / len(outcomes), 3) if outcomes else 0.0,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+    def summary(self):
+        s = self.snapshot()
+        p95 = f"{s['latency_p95']:.1f}s" if s['latency_p95'] is not None else "n/a"
+        return (f"limit {s['limit']:.1f}/{s['max_limit']}, {s['throughput_rps']:.2f} req/s, "
+                f"p95 {p95}, {s['timeout_rate']:.0%} timeouts/overloads")
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Single-file SQLite corpus store for verses and word mappings
+
+The data lives in ~3,600 pretty-printed chapter JSON files across three
+trees (bible-translations/unified, bible-translations/mappings and
+bible-maps-word-gemma3/mappings), and every scanner used to open and parse
+all of them. This packs them into one SQLite file:
+
+    chapters  (tree, book, chapter)               header + file stat
+    verses    (tree, book, chapter, verse)        ar / en text, verse order
+    mappings  (tree, book, chapter, verse, idx)   ar / en / start / end
+
+A tree is identified by its directory path. sync() re-imports only the
+chapter files whose mtime/size changed since the last import, so scanners
+can call it before every query and still see fresh data after a repair
+pass rewrote some chapters. Per-chapter summary scans (misaligned verses,
+totals) are pipeline/scan_manifest.py's job; the store serves row-level
+queries (validation, the mmap corpus, validate_mappings).
+
+Exports round-trip to the current JSON layout (indent=2, UTF-8, same key
+order); keys outside the standard layout are kept in an `extra` column.
+
+Usage:
+    python3 -m pipeline.corpus_store import               # Import/refresh all trees
+    python3 -m pipeline.corpus_store export --tree bible-translations/mappings --out /tmp/mappings
+    python3 -m pipeline.corpus_store verify               # Check JSON round-trip
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+STORE_PATH = os.environ.get("CORPUS_STORE", "cache/corpus.sqlite3")
+
+UNIFIED_DIR = "bible-translations/unified"
+TREES = [
+    UNIFIED_DIR,
+    "bible-translations/mappings",
+    "bible-maps-word-gemma3/mappings",
+]
+
+VERSE_KEYS = ("ar", "en", "mappings")
+MAPPING_KEYS = ("ar", "en", "start", "end")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    tree TEXT NOT NULL,
+    book TEXT NOT NULL,
+    chapter INTEGER NOT NULL,
+    header TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (tree, book, chapter)
+);
+CREATE TABLE IF NOT EXISTS verses (
+    tree TEXT NOT NULL,
+    book TEXT NOT NULL,
+    chapter INTEGER NOT NULL,
+    verse TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    ar TEXT,
+    en TEXT,
+    key_order TEXT NOT NULL,
+    extra TEXT,
+    PRIMARY KEY (tree, book, chapter, verse)
+);
+CREATE TABLE IF NOT EXISTS mappings (
+    tree TEXT NOT NULL,
+    book TEXT NOT NULL,
+    chapter INTEGER NOT NULL,
+    verse TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    ar TEXT,
+    en TEXT,
+    start_pos INTEGER,
+    end_pos INTEGER,
+    extra TEXT,
+    PRIMARY KEY (tree, book, chapter, verse, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_verses_order ON verses (tree, book, chapter, pos);
+"""
+
+
+def _chapter_files(tree, books=None):
+    """Yield (book, chapter_number, path) for every chapter file in a tree"""
+    root = Path(tree)
+    if not root.exists():
+        return
+    for book_dir in sorted(root.iterdir()):
+        if not book_dir.is_dir() or (books and book_dir.name not in books):
+            continue
+        for chapter_file in book_dir.glob("*.json"):
+            if chapter_file.stem.isdigit():
+                yield book_dir.name, int(chapter_file.stem), chapter_file
+
+
+def _extra(d, standard_keys):
+    extra = {k: v for k, v in d.items() if k not in standard_keys}
+    return json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+class CorpusStore:
+    """Packed, indexed view of the JSON chapter trees"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    def sync(self, tree, books=None, force=False, on_error=None):
+        """
+        Bring the store up to date with the JSON files of one tree
+        Only chapters whose mtime/size changed are re-parsed.
+        Returns (imported, unchanged, removed) chapter counts.
+        """
+        tree = str(tree)
+        with self._lock:
+            known = {}
+            for book, chapter, mtime_ns, size in self._conn.execute(
+                    "SELECT book, chapter, mtime_ns, size FROM chapters WHERE tree = ?", (tree,)):
+                if not books or book in books:
+                    known[(book, chapter)] = (mtime_ns, size)
+
+            imported = unchanged = 0
+            seen = set()
+            with self._conn:
+                for book, chapter, chapter_file in _chapter_files(tree, books):
+                    seen.add((book, chapter))
+                    stat = chapter_file.stat()
+                    if not force and known.get((book, chapter)) == (stat.st_mtime_ns, stat.st_size):
+                        unchanged += 1
+                        continue
+                    try:
+                        with open(chapter_file, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+                    except (json.JSONDecodeError, ValueError, OSError) as e:
+                        if on_error:
+                            on_error(chapter_file, e)
+                        continue
+                    self._write_chapter(tree, book, chapter, data, stat)
+                    imported += 1
+
+                removed = [key for key in known if key not in seen]
+                for book, chapter in removed:
+                    self._delete_chapter(tree, book, chapter)
+
+        return imported, unchanged, len(removed)
+
+    def _delete_chapter(self, tree, book, chapter):
+        for table in ("chapters", "verses", "mappings"):
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE tree = ? AND book = ? AND chapter = ?",
+                (tree, book, chapter))
+
+    def _write_chapter(self, tree, book, chapter, data, stat):
+        """Replace one chapter's rows (caller holds the lock and a transaction)"""
+        self._delete_chapter(tree, book, chapter)
+
+        # Unified files are a bare {verse: {...}} dict; mapping files wrap
+        # the verses with book/chapter header fields
+        if isinstance(data.get("verses"), dict):
+            verses = data["verses"]
+            header = json.dumps({k: v for k, v in data.items() if k != "verses"},
+                                ensure_ascii=False)
+        else:
+            verses = data
+            header = None
+
+        self._conn.execute(
+            "INSERT INTO chapters VALUES (?, ?, ?, ?, ?, ?)",
+            (tree, book, chapter, header, stat.st_mtime_ns, stat.st_size))
+
+        verse_rows = []
+        mapping_rows = []
+        for pos, (verse_num, verse) in enumerate(verses.items()):
+            key_order = ",".join(k for k in verse if k in VERSE_KEYS)
+            verse_rows.append((tree, book, chapter, verse_num, pos,
+                               verse.get("ar"), verse.get("en"), key_order,
+                               _extra(verse, VERSE_KEYS)))
+            for idx, m in enumerate(verse.get("mappings") or []):
+                mapping_rows.append((tree, book, chapter, verse_num, idx,
+                                     m.get("ar"), m.get("en"), m.get("start"), m.get("end"),
+                                     _extra(m, MAPPING_KEYS)))
+
+        self._conn.executemany(
+            "INSERT INTO verses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", verse_rows)
+        self._conn.executemany(
+            "INSERT INTO mappings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", mapping_rows)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _book_filter(self, books, column="book"):
+        if not books:
+            return "", []
+        return f" AND {column} IN ({','.join('?' * len(books))})", list(books)
+
+    def chapters(self, tree, books=None):
+        """List (book, chapter) pairs in a tree, in book/chapter order"""
+        clause, params = self._book_filter(books)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT book, chapter FROM chapters WHERE tree = ?{clause} "
+                f"ORDER BY book, chapter", [str(tree), *params]).fetchall()
+
+    def signature(self, tree):
+        """Hash of every chapter's file stat - changes whenever sync() imports anything"""
+        digest = hashlib.sha1()
+        with self._lock:
+            for row in self._conn.execute(
+                    "SELECT book, chapter, mtime_ns, size FROM chapters WHERE tree = ? "
+                    "ORDER BY book, chapter", (str(tree),)):
+                digest.update(repr(row).encode())
+        return digest.hexdigest()
+
+    def verse_texts(self, tree, books=None):
+        """Return (book, chapter, verse, ar) for every verse, in verse order"""
+        clause, params = self._book_filter(books)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT book, chapter, verse, ar FROM verses WHERE tree = ?{clause} "
+                f"ORDER BY book, chapter, pos", [str(tree), *params]).fetchall()
+
+    def mapping_rows(self, tree, books=None):
+        """
+        Return (book, chapter, verse, idx, ar, en, start, end) for every
+        mapping, grouped by verse in mapping order (primary key order, not
+        verse order) - flat columns for array-based checks
+        """
+        clause, params = self._book_filter(books)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT book, chapter, verse, idx, ar, en, start_pos, end_pos FROM mappings "
+                f"WHERE tree = ?{clause} ORDER BY book, chapter, verse, idx",
+                [str(tree), *params]).fetchall()
+
+    def load_chapter(self, tree, book, chapter):
+        """Rebuild one chapter in its JSON layout (None if not stored)"""
+        tree = str(tree)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT header FROM chapters WHERE tree = ? AND book = ? AND chapter = ?",
+                (tree, book, chapter)).fetchone()
+            if row is None:
+                return None
+            verse_rows = self._conn.execute(
+                "SELECT verse, ar, en, key_order, extra FROM verses "
+                "WHERE tree = ? AND book = ? AND chapter = ? ORDER BY pos",
+                (tree, book, chapter)).fetchall()
+            mapping_rows = self._conn.execute(
+                "SELECT verse, ar, en, start_pos, end_pos, extra FROM mappings "
+                "WHERE tree = ? AND book = ? AND chapter = ? ORDER BY verse, idx",
+                (tree, book, chapter)).fetchall()
+
+        mappings_by_verse = {}
+        for verse_num, ar, en, start, end, extra in mapping_rows:
+            m = {}
+            for key, value in zip(MAPPING_KEYS, (ar, en, start, end)):
+                if value is not None:
+                    m[key] = value
+            if extra:
+                m.update(json.loads(extra))
+            mappings_by_verse.setdefault(verse_num, []).append(m)
+
+        verses = {}
+        for verse_num, ar, en, key_order, extra in verse_rows:
+            values = {"ar": ar, "en": en, "mappings": mappings_by_verse.get(verse_num, [])}
+            verse = {}
+            for key in key_order.split(","):
+                if key:
+                    verse[key] = values[key]
+            if extra:
+                verse.update(json.loads(extra))
+            verses[verse_num] = verse
+
+        header = row[0]
+        if header is None:
+            return verses
+        data = json.loads(header)
+        data["verses"] = verses
+        return data
+
+    def iter_chapters(self, tree, books=None):
+        """Yield (book, chapter, data) for every chapter, in JSON layout"""
+        for book, chapter in self.chapters(tree, books):
+            yield book, chapter, self.load_chapter(tree, book, chapter)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def export_tree(self, tree, out_dir, books=None):
+        """Write a tree back out as {out_dir}/{BOOK}/{chapter}.json files"""
+        written = 0
+        for book, chapter, data in self.iter_chapters(tree, books):
+            book_dir = Path(out_dir) / book
+            book_dir.mkdir(parents=True, exist_ok=True)
+            with open(book_dir / f"{chapter}.json", 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            written += 1
+        return written
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide corpus store, opening it on first use (a forked worker opens its own)"""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store is None or _store_pid != pid:
+        with _store_lock:
+            if _store is None or _store_pid != pid:
+                _store = CorpusStore()
+                _store_pid = pid
+    return _store
+
+
+def synced_store(tree, books=None):
+    """get_store() after refreshing one tree, reporting unreadable files"""
+    store = get_store()
+    store.sync(tree, books, on_error=lambda path, e: print(f"⚠️  Error reading {path}: {e}"))
+    return store
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Packed SQLite corpus store')
+    parser.add_argument('command', choices=['import', 'export', 'verify'])
+    parser.add_argument('--tree', action='append',
+                        help='Tree directory (repeatable, default: all three trees)')
+    parser.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    parser.add_argument('--out', type=str, help='Output directory for export')
+    parser.add_argument('--force', action='store_true', help='Re-import unchanged chapters too')
+    args = parser.parse_args()
+
+    trees = args.tree or TREES
+    books = [b.strip().upper() for b in args.books.split(',')] if args.books else None
+    store = get_store()
+
+    if args.command == 'import':
+        for tree in trees:
+            start = time.time()
+            imported, unchanged, removed = store.sync(
+                tree, books, force=args.force,
+                on_error=lambda path, e: print(f"  ⚠️  Error reading {path}: {e}"))
+            print(f"✓ {tree}: {imported} imported, {unchanged} unchanged, "
+                  f"{removed} removed ({time.time() - start:.1f}s)")
+
+    elif args.command == 'export':
+        if not args.out:
+            parser.error("export needs --out")
+        for tree in trees:
+            out_dir = Path(args.out) / tree if len(trees) > 1 else Path(args.out)
+            written = store.export_tree(tree, out_dir, books)
+            print(f"✓ {tree}: wrote {written} chapters to {out_dir}")
+
+    elif args.command == 'verify':
+        mismatches = 0
+        for tree in trees:
+            store.sync(tree, books)
+            checked = 0
+            for book, chapter, chapter_file in _chapter_files(tree, books):
+                with open(chapter_file, 'r', encoding='utf-8') as f:
+                    original = f.read()
+                exported = json.dumps(store.load_chapter(tree, book, chapter),
+                                      ensure_ascii=False, indent=2)
+                checked += 1
+                if exported != original:
+                    mismatches += 1
+                    print(f"  ✗ {chapter_file} differs after round-trip")
+            print(f"✓ {tree}: {checked} chapters checked")
+        print(f"\n{'✅ Round-trip exact' if mismatches == 0 else f'❌ {mismatches} mismatches'}")
+        sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Byte-level Unicode corruption scanner for the three data trees
+
+Text damaged by a bad decode shows up as U+FFFD, which is EF BF BD in the
+UTF-8 files. Seven fix scripts each carried a has_corruption() (some
+re-encoding every string and walking its bytes in a Python loop) and each
+read every chapter file of a tree as text to find the few damaged ones.
+
+Here each chapter file is mmap'd and searched for the raw byte pattern -
+clean files (nearly all of them) are never decoded. Only a file with a
+hit is parsed, to pin every hit to its verse and field. Files are scanned
+by a pool of worker processes, and the result is a corruption index
+(cache/corruption_index.json), one row per damaged field:
+
+    tree, book, chapter, verse, field, mapping
+
+field is "ar" or "en"; mapping is the mapping index within the verse for
+a mapping's field, or None for the verse text. A file that is not valid
+UTF-8 JSON gets one row with verse None and field "json".
+
+Usage:
+    python3 -m pipeline.corruption                           # All three trees
+    python3 -m pipeline.corruption --tree bible-translations/unified
+
+    files = corruption.corrupted_files("bible-translations/mappings")
+    if corruption.has_corruption(text): ...
+"""
+
+import json
+import mmap
+import os
+from pathlib import Path
+
+INDEX_PATH = os.environ.get("CORRUPTION_INDEX", "cache/corruption_index.json")
+TREES = [
+    "bible-translations/unified",
+    "bible-translations/mappings",
+    "bible-maps-word-gemma3/mappings",
+]
+
+REPLACEMENT_CHAR = '�'
+REPLACEMENT_BYTES = REPLACEMENT_CHAR.encode('utf-8')  # EF BF BD
+ESCAPED = (b'\\ufffd', b'\\uFFFD')  # The same character written by json.dump(ensure_ascii=True)
+
+COLUMNS = ["tree", "book", "chapter", "verse", "field", "mapping"]
+
+
+def has_corruption(data):
+    """True if text (str) or raw file content (bytes) contains U+FFFD"""
+    if isinstance(data, str):
+        return REPLACEMENT_CHAR in data or any(p.decode('ascii') in data for p in ESCAPED)
+    return any(pattern in data for pattern in (REPLACEMENT_BYTES, *ESCAPED))
+
+
+def chapter_files(tree):
+    """Every BOOK/<chapter>.json of a tree, in book/chapter order"""
+    files = []
+    root = Path(tree)
+    if not root.exists():
+        return files
+    for book_dir in sorted(root.iterdir()):
+        if book_dir.is_dir():
+            chapters = [f for f in book_dir.glob("*.json") if f.stem.isdigit()]
+            files.extend(sorted(chapters, key=lambda f: int(f.stem)))
+    return files
+
+
+def _file_hit(path):
+    """mmap the file and search its bytes; nothing is decoded"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return any(mm.find(pattern) != -1 for pattern in (REPLACEMENT_BYTES, *ESCAPED))
+
+
+def locate(raw):
+    """(verse, field, mapping) for every damaged field of one chapter file's bytes"""
+    try:
+        data = json.loads(raw.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return [(None, "json", None)]
+
+    # Unified files are a bare {verse: {...}} dict; mapping files wrap it
+    verses = data["verses"] if isinstance(data.get("verses"), dict) else data
+    hits = []
+    for verse_num, verse in verses.items():
+        if not isinstance(verse, dict):
+            continue
+        for field in ("ar", "en"):
+            if has_corruption(str(verse.get(field) or "")):
+                hits.append((verse_num, field, None))
+        for i, m in enumerate(verse.get("mappings") or []):
+            for field in ("ar", "en"):
+                if has_corruption(str(m.get(field) or "")):
+                    hits.append((verse_num, field, i))
+    return hits
+
+
+def scan_file(args):
+    """Pool worker: (tree, path) -> index rows for one chapter file"""
+    tree, path = args
+    path = Path(path)
+    if not _file_hit(path):
+        return []
+    hits = locate(path.read_bytes()) or [(None, "json", None)]
+    book, chapter = path.parent.name, int(path.stem)
+    return [[str(tree), book, chapter, verse, field, mapping] for verse, field, mapping in hits]
+
+
+def scan(trees=None, workers=1):
+    """Scan whole trees (in parallel with workers > 1); returns the corruption index dict"""
+    trees = trees or TREES
+    tasks = [(tree, str(path)) for tree in trees for path in chapter_files(tree)]
+
+    if workers > 1 and len(tasks) > 1:
+        from multiprocessing import Pool
+        with Pool(processes=workers) as pool:
+            results = pool.map(scan_file, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+    else:
+        results = [scan_file(task) for task in tasks]
+
+    rows = [row for file_rows in results for row in file_rows]
+    return {
+        "trees": {str(tree): len(chapter_files(tree)) for tree in trees},
+        "files": len({(r[0], r[1], r[2]) for r in rows}),
+        "columns": COLUMNS,
+        "rows": rows,
+    }
+
+
+def write_index(index, path=INDEX_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_index(path=INDEX_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def corrupted_files(tree, fields=None, index=None, workers=1):
+    """
+    Chapter files of a tree with damaged fields (any, or only the given
+    fields), from an index or a fresh scan of that tree
+    """
+    index = index or scan([tree], workers)
+    files = {(r[1], r[2]) for r in index["rows"]
+             if r[0] == str(tree) and (not fields or r[4] in fields)}
+    return [Path(tree) / book / f"{chapter}.json" for book, chapter in sorted(files)]
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Find U+FFFD corruption in the data trees')
+    parser.add_argument('--tree', action='append', help='Tree directory (repeatable, default: all three trees)')
+    parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1),
+                        help='Worker processes (default: CPU count, max 8)')
+    parser.add_argument('--output', default=INDEX_PATH, help=f'Corruption index (default: {INDEX_PATH})')
+    parser.add_argument('--show', type=int, default=20, help='Rows to print (default: 20)')
+    args = parser.parse_args()
+
+    start = time.time()
+    index = scan(args.tree, args.workers)
+    path = write_index(index, args.output)
+    elapsed = time.time() - start
+
+    total_files = sum(index["trees"].values())
+    print(f"🔍 Scanned {total_files} chapter files in {elapsed:.2f}s")
+    for tree, count in index["trees"].items():
+        tree_rows = [r for r in index["rows"] if r[0] == tree]
+        tree_files = len({(r[1], r[2]) for r in tree_rows})
+        print(f"  {tree:<34} {count:>5} files, {tree_files:>4} corrupted, {len(tree_rows):>5} fields")
+
+    for tree, book, chapter, verse, field, mapping in index["rows"][:args.show]:
+        where = f"{book} {chapter}:{verse}" if verse is not None else f"{book} {chapter}"
+        target = f"mapping {mapping} {field}" if mapping is not None else field
+        print(f"  ⚠️  {tree}: {where} {target}")
+    if len(index["rows"]) > args.show:
+        print(f"  ... and {len(index['rows']) - args.show} more")
+
+    print(f"💾 {len(index['rows'])} corrupted fields in {index['files']} files written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Fill the missing words of many verses in a few packed requests
+
+Repair used to send one prompt per missing word: a verse with four gaps
+paid for its verse context four times, and a chapter with gaps in twenty
+verses made dozens of requests. A GapFiller takes every gap of a chapter
+at once, packs the verses (request_packing.pack, by estimated prompt
+tokens) and asks for all their missing words in one labelled prompt:
+
+    Verse A
+    Arabic: <verse>
+    English: <verse>
+    Words:
+    A1. <missing word>
+    A2. <missing word>
+    Verse B
+    ...
+
+demultiplex() validates the numbering per verse; a verse whose answer does
+not validate falls back to the caller's single-word translator, word by
+word. Answers are cached per verse context like the other prompts. With
+use_memory, words the translation memory glosses confidently (see
+TranslationMemory.resolve) are filled before anything is packed.
+
+Usage:
+    filler = GapFiller(MODEL, fallback=translate_single_word, use_memory=True)
+    found = filler.fill([(verse_num, missing_words, verse_ar, verse_en), ...])
+    # found[verse_num] = {word: translation or None}
+"""
+
+import threading
+
+from pipeline import ollama_client, output_budget, streaming
+from pipeline.request_packing import demultiplex, estimate_tokens, pack, section_label
+from pipeline.translation_cache import context_hash, get_cache
+from pipeline.translation_memory import get_memory
+
+# Bump when the prompt changes so cached translations are not reused
+GAP_PROMPT_VERSION = "gaps-packed-v1"
+
+TOKEN_BUDGET = 1500  # Estimated prompt tokens per packed request
+TIMEOUT = 40  # Minimum per-request timeout; stretched automatically when the server is slow
+
+
+def clean_gloss(gloss):
+    return gloss.strip('"\'.,!?')
+
+
+class GapFiller:
+    """Packed gap-filling requests for one model, with per-run stats"""
+
+    def __init__(self, model, fallback=None, token_budget=TOKEN_BUDGET, timeout=TIMEOUT, options=None,
+                 use_memory=False):
+        self.model = model
+        self.fallback = fallback  # fn(word, verse_ar, verse_en) -> translation or None
+        self.token_budget = token_budget
+        self.timeout = timeout
+        self.options = options or {"temperature": 0.1}
+        self.use_memory = use_memory
+        self.stats = {"gaps": 0, "cached": 0, "memory": 0, "verses": 0, "requests": 0, "fallbacks": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def _request(self, sections):
+        """One packed request; per section {word: translation} or None if it did not validate"""
+        blocks = []
+        for i, (words, verse_ar, verse_en) in enumerate(sections):
+            label = section_label(i)
+            word_list = "\n".join(f"{label}{n+1}. {word}" for n, word in enumerate(words))
+            blocks.append(f"Verse {label}\nArabic: {verse_ar}\nEnglish: {verse_en}\nWords:\n{word_list}")
+
+        prompt = f"""Translate the listed Arabic words to English using each verse's context. Each Arabic word may include articles (الْ), prepositions, or conjunctions - translate the COMPLETE word meaning, not just prefixes.
+
+{chr(10).join(blocks)}
+
+Answer with one line per word, keeping its label exactly (for example "A1. translation"). No explanations:"""
+
+        word_counts = [len(words) for words, _, _ in sections]
+        try:
+            response_text = ollama_client.generate(
+                self.model, prompt, dict(self.options), timeout=self.timeout,
+                stream=streaming.labelled(word_counts),
+                budget=output_budget.plan(self.model, sum(word_counts), "labelled"))
+        except Exception:
+            return [None] * len(sections)
+
+        glosses = demultiplex(response_text, word_counts, clean=clean_gloss)
+        return [
+            dict(zip(words, section_glosses)) if section_glosses else None
+            for (words, _, _), section_glosses in zip(sections, glosses)
+        ]
+
+    def fill(self, gaps):
+        """
+        gaps: [(key, missing_words, verse_ar, verse_en), ...]
+        Returns {key: {word: translation or None}} for every key
+        """
+        cache = get_cache()
+        found = {}
+        pending = []
+        contexts = {}
+
+        for key, words, verse_ar, verse_en in gaps:
+            words = list(dict.fromkeys(words))
+            context = contexts[key] = context_hash(verse_ar, verse_en)
+            found[key] = cache.get_many(words, context, self.model, GAP_PROMPT_VERSION)
+            misses = [w for w in words if w not in found[key]]
+            self._count(gaps=len(words), cached=len(words) - len(misses))
+            if misses and self.use_memory:
+                known, misses = get_memory().resolve(misses)
+                found[key].update(known)
+                self._count(memory=len(known))
+            if misses:
+                pending.append((key, misses, verse_ar, verse_en))
+
+        def size(item):
+            _, words, verse_ar, verse_en = item
+            return (estimate_tokens(verse_ar) + estimate_tokens(verse_en)
+                    + sum(estimate_tokens(w) + 2 for w in words))
+
+        for group in pack(pending, size, self.token_budget):
+            answers = self._request([(words, verse_ar, verse_en) for _, words, verse_ar, verse_en in group])
+            self._count(requests=1, verses=len(group))
+
+            for (key, words, verse_ar, verse_en), answer in zip(group, answers):
+                if answer is None:
+                    self._count(fallbacks=1)
+                    answer = {w: self.fallback(w, verse_ar, verse_en) if self.fallback else None
+                              for w in words}
+                else:
+                    cache.put_many(answer, contexts[key], self.model, GAP_PROMPT_VERSION)
+                found[key].update(answer)
+
+        return {key: {w: found[key].get(w) for w in dict.fromkeys(words)}
+                for key, words, _, _ in gaps}
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['gaps']} missing words ({s['cached']} cached, {s['memory']} from memory), {s['verses']} verses in "
+                f"{s['requests']} packed requests, {s['fallbacks']} verses fell back to single words")
@@ -0,0 +1,121 @@
+"""
+Append-only per-chapter checkpoint journal for mapping generation
+
+regenerate_chapter_mappings used to re-serialize and rewrite the whole
+chapter JSON (indent=2) after every verse - O(verses²) bytes per chapter,
+which hurts on Psalm 119 and the long genealogies. Instead each finished
+verse is appended as ONE line to {chapter}.jsonl next to the chapter file
+and fsync'd, so a crash loses at most the verse in flight. The chapter
+JSON is written once at the end (atomically) and the journal removed.
+
+Resume = load the chapter JSON if present, then replay the journal.
+
+Usage:
+    journal = ChapterJournal(output_file)
+    output = journal.load(book, chapter)
+    ...
+    journal.append(verse_num, output["verses"][verse_num])
+    ...
+    journal.compact(output)
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+def journal_path(output_file):
+    """GEN/1.json -> GEN/1.jsonl (scanners glob *.json, so it is never picked up)"""
+    return Path(output_file).with_suffix(".jsonl")
+
+
+class ChapterJournal:
+    """Crash-safe, linear-I/O checkpointing for one chapter output file"""
+
+    def __init__(self, output_file):
+        self.output_file = Path(output_file)
+        self.path = journal_path(output_file)
+        self._handle = None
+
+    def exists(self):
+        return self.path.exists()
+
+    def load(self, book, chapter):
+        """
+        Return the chapter output structure with every journaled verse applied
+        A corrupted chapter file is treated as empty (the journal still replays)
+        """
+        output = None
+        if self.output_file.exists():
+            try:
+                with open(self.output_file, 'r', encoding='utf-8') as f:
+                    output = json.load(f)
+            except (json.JSONDecodeError, ValueError):
+                output = None
+
+        if output is None:
+            output = {
+                "book": book,
+                "chapter": int(chapter),
+                "verses": {}
+            }
+
+        self.replay(output)
+        return output
+
+    def replay(self, output):
+        """Apply journaled verses onto output["verses"]; returns how many"""
+        if not self.path.exists():
+            return 0
+
+        replayed = 0
+        good_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn line")
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write - that verse is redone
+                    break
+                output["verses"][record["verse"]] = record["data"]
+                good_bytes += len(line)
+                replayed += 1
+
+        # Cut the torn tail so the next append starts on a clean line
+        if good_bytes < self.path.stat().st_size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_bytes)
+
+        return replayed
+
+    def append(self, verse_num, verse_data):
+        """Durably record one finished verse"""
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = open(self.path, 'a', encoding='utf-8')
+
+        line = json.dumps({"verse": verse_num, "data": verse_data}, ensure_ascii=False)
+        self._handle.write(line + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def compact(self, output):
+        """Write the full chapter JSON once (atomic replace), then drop the journal"""
+        self.close()
+
+        tmp_file = self.output_file.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.output_file)
+
+        if self.path.exists():
+            self.path.unlink()
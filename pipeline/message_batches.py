@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Asynchronous message batches: one submission, many prompts
+
+regenerate_mappings_haiku.py sends one synchronous messages.create() per
+verse, so a testament is tens of thousands of round trips. The Message
+Batches API takes the same requests as one JSONL-style list, processes them
+asynchronously (at half the price) and returns the results by custom_id.
+This module is the submit/poll layer, with two interchangeable backends:
+
+    AnthropicBatches  client.messages.batches (create / retrieve / results)
+    FileBatches       a directory stand-in: submit() writes
+                      <dir>/<batch_id>/requests.jsonl, and the batch has
+                      ended once results.jsonl appears next to it - written
+                      by a responder function, or by hand / another process
+
+Both take requests as {"custom_id", "params"} dicts (params being the
+messages.create() arguments), report status() as {"status": "in_progress" |
+"ended", "counts": {...}}, and yield results() as {"custom_id", "type",
+"text"} with type "succeeded", "errored", "canceled" or "expired".
+results.jsonl uses the API's result line format, so a downloaded result
+file can be dropped in unchanged.
+
+Usage:
+    backend = FileBatches("cache/batches", responder=mock_responder)   # or AnthropicBatches()
+    write_requests("cache/batches/NT.jsonl", requests)
+    batch_id = backend.submit(read_jsonl("cache/batches/NT.jsonl"))
+    wait(backend, batch_id, interval=60)
+    for result in backend.results(batch_id): ...
+
+    python3 -m pipeline.message_batches status BATCH_ID --dir cache/batches
+    python3 -m pipeline.message_batches respond BATCH_ID --dir cache/batches   # Mock answers
+"""
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+MAX_REQUESTS = 100_000  # Per batch (API limit)
+POLL_INTERVAL = 60  # Seconds between status checks; batches take minutes to hours
+
+RESULT_TYPES = ["succeeded", "errored", "canceled", "expired"]
+
+
+def write_requests(path, requests):
+    """Write {"custom_id", "params"} requests as JSONL (atomically); returns the path"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def result_line(custom_id, text=None, error=None):
+    """One results.jsonl line in the API's format"""
+    if text is None:
+        result = {"type": "errored", "error": {"type": "error", "message": error or "no response"}}
+    else:
+        result = {"type": "succeeded",
+                  "message": {"role": "assistant", "content": [{"type": "text", "text": text}]}}
+    return {"custom_id": custom_id, "result": result}
+
+
+def _parse_result(line):
+    """API result line (dict) -> {"custom_id", "type", "text"}"""
+    result = line["result"]
+    text = None
+    if result["type"] == "succeeded":
+        text = "".join(block.get("text", "") for block in result["message"]["content"]
+                       if block.get("type") == "text")
+    return {"custom_id": line["custom_id"], "type": result["type"], "text": text}
+
+
+class AnthropicBatches:
+    """The Message Batches API (needs the anthropic package and ANTHROPIC_API_KEY)"""
+
+    def __init__(self, client=None):
+        if client is None:
+            from anthropic import Anthropic
+            client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+        self.client = client
+
+    def submit(self, requests):
+        batch = self.client.messages.batches.create(requests=requests)
+        return batch.id
+
+    def status(self, batch_id):
+        batch = self.client.messages.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": "ended" if batch.processing_status == "ended" else "in_progress",
+            "counts": {"processing": counts.processing, "succeeded": counts.succeeded,
+                       "errored": counts.errored, "canceled": counts.canceled, "expired": counts.expired},
+        }
+
+    def results(self, batch_id):
+        for entry in self.client.messages.batches.results(batch_id):
+            yield _parse_result(entry.model_dump() if hasattr(entry, "model_dump") else entry)
+
+
+class FileBatches:
+    """
+    Local stand-in for the batch API: a directory per batch
+
+    responder(params) -> text (or None for an errored request) answers a
+    batch on its first status() check; without one the batch stays
+    in_progress until results.jsonl is written by someone else.
+    """
+
+    def __init__(self, root, responder=None):
+        self.root = Path(root)
+        self.responder = responder
+
+    def _dir(self, batch_id):
+        return self.root / batch_id
+
+    def submit(self, requests):
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        write_requests(self._dir(batch_id) / "requests.jsonl", requests)
+        return batch_id
+
+    def respond(self, batch_id, responder):
+        """Answer every request of a batch with responder(params) and write results.jsonl"""
+        lines = []
+        for request in read_jsonl(self._dir(batch_id) / "requests.jsonl"):
+            try:
+                text = responder(request["params"])
+                lines.append(result_line(request["custom_id"], text))
+            except Exception as e:
+                lines.append(result_line(request["custom_id"], error=str(e)))
+        write_requests(self._dir(batch_id) / "results.jsonl", lines)
+
+    def status(self, batch_id):
+        batch_dir = self._dir(batch_id)
+        if not (batch_dir / "requests.jsonl").exists():
+            raise KeyError(f"Unknown batch: {batch_id}")
+        results_file = batch_dir / "results.jsonl"
+        if not results_file.exists() and self.responder:
+            self.respond(batch_id, self.responder)
+
+        total = len(read_jsonl(batch_dir / "requests.jsonl"))
+        counts = dict.fromkeys(["processing"] + RESULT_TYPES, 0)
+        if not results_file.exists():
+            counts["processing"] = total
+            return {"status": "in_progress", "counts": counts}
+        for line in read_jsonl(results_file):
+            counts[line["result"]["type"]] += 1
+        return {"status": "ended", "counts": counts}
+
+    def results(self, batch_id):
+        for line in read_jsonl(self._dir(batch_id) / "results.jsonl"):
+            yield _parse_result(line)
+
+
+def wait(backend, batch_id, interval=POLL_INTERVAL, timeout=None, on_progress=None):
+    """Poll until the batch has ended; returns its final status (TimeoutError after timeout seconds)"""
+    start = time.time()
+    while True:
+        status = backend.status(batch_id)
+        if on_progress:
+            on_progress(status)
+        if status["status"] == "ended":
+            return status
+        if timeout is not None and time.time() - start + interval > timeout:
+            raise TimeoutError(f"Batch {batch_id} still in progress after {time.time() - start:.0f}s")
+        time.sleep(interval)
+
+
+def mock_responder(params):
+    """Deterministic answers to the mapping prompts (pipeline/mock_ollama.py's glosses)"""
+    import random
+    from pipeline import mock_ollama
+
+    prompt = "".join(m["content"] if isinstance(m["content"], str) else
+                     "".join(block.get("text", "") for block in m["content"])
+                     for m in params["messages"] if m["role"] == "user")
+    return mock_ollama.answer(prompt, random.Random(prompt), no_rate=0.0)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect or answer message batches')
+    parser.add_argument('command', choices=['status', 'respond'],
+                        help='status: show a batch; respond: answer a file batch with mock glosses')
+    parser.add_argument('batch_id')
+    parser.add_argument('--dir', help='File stand-in directory (default: the Anthropic API)')
+    args = parser.parse_args()
+
+    backend = FileBatches(args.dir) if args.dir else AnthropicBatches()
+    if args.command == 'respond':
+        if not args.dir:
+            parser.error("respond only works with a file stand-in (--dir)")
+        backend.respond(args.batch_id, mock_responder)
+
+    status = backend.status(args.batch_id)
+    counts = ", ".join(f"{count} {name}" for name, count in status["counts"].items())
+    print(f"📦 {args.batch_id}: {status['status']} ({counts})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped, read-only corpus view for position checks
+
+Position validation only needs each verse's Arabic text and the
+start/end/ar of its mappings, but loading chapters as JSON builds a dict
+per mapping (~400k of them for the whole Bible). This packs one mapping
+tree into a flat binary file under cache/ and mmaps it:
+
+    verses    u32[5] per verse   text byte offset, char-offset base, char count,
+                                 first mapping, mapping count
+    offsets   u32 per char + 1   byte offset of every character boundary,
+                                 relative to the start of its verse text
+    starts    i32 per mapping    mapping["start"] (MISSING if absent)
+    ends      i32 per mapping    mapping["end"]
+    words     u32[2] per mapping byte offset / length of mapping["ar"]
+    blob      UTF-8              all verse texts and mapping words
+    keys      JSON               [[book, chapter, verse], ...]
+
+ar[start:end] == mapping["ar"] then becomes a comparison of two slices of
+the mmap'd blob, found through the integer arrays - nothing is decoded or
+allocated per mapping unless it actually mismatches.
+
+The file is rebuilt from the corpus store (pipeline/corpus_store.py)
+whenever the store's signature for the tree changes.
+
+Usage:
+    python3 -m pipeline.mmap_corpus                    # Whole-Bible position check
+    python3 -m pipeline.mmap_corpus --tree bible-maps-word-gemma3/mappings
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from pipeline.corpus_store import synced_store
+
+CACHE_DIR = os.environ.get("MMAP_CORPUS_DIR", "cache")
+DEFAULT_TREE = "bible-translations/mappings"
+
+MAGIC = b"BCORPUS1"
+HEADER = struct.Struct("<8s8sIIIQQ40s")  # magic, byteorder, verses, mappings, offsets, blob, keys, signature
+VERSE_FIELDS = 5
+MISSING = -(2 ** 31)
+
+
+def corpus_path(tree):
+    """bible-translations/mappings -> cache/bible-translations-mappings.corpus"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', str(tree)).strip('-')
+    return Path(CACHE_DIR) / f"{slug}.corpus"
+
+
+def _char_offsets(text):
+    """UTF-8 byte offset of every character boundary (len(text) + 1 entries)"""
+    offsets = [0]
+    pos = 0
+    for ch in text:
+        code = ord(ch)
+        pos += 1 if code < 0x80 else 2 if code < 0x800 else 3 if code < 0x10000 else 4
+        offsets.append(pos)
+    return offsets
+
+
+def _span(value):
+    return value if isinstance(value, int) and -(2 ** 31) < value < 2 ** 31 else MISSING
+
+
+def build(tree, path=None, store=None):
+    """Pack one tree from the corpus store into a binary corpus file"""
+    store = store or synced_store(tree)
+    path = Path(path or corpus_path(tree))
+
+    verses = array('I')
+    offsets = array('I')
+    starts = array('i')
+    ends = array('i')
+    words = array('I')
+    blob = bytearray()
+    keys = []
+
+    for book, chapter, data in store.iter_chapters(tree):
+        chapter_verses = data["verses"] if isinstance(data.get("verses"), dict) else data
+        for verse_num, verse in chapter_verses.items():
+            text = verse.get("ar") or ""
+            mappings = verse.get("mappings") or []
+
+            verses.extend((len(blob), len(offsets), len(text), len(starts), len(mappings)))
+            offsets.extend(_char_offsets(text))
+            blob += text.encode('utf-8')
+            keys.append([book, chapter, verse_num])
+
+            for m in mappings:
+                word = (m.get("ar") or "").encode('utf-8')
+                starts.append(_span(m.get("start")))
+                ends.append(_span(m.get("end")))
+                words.extend((len(blob), len(word)))
+                blob += word
+
+    keys_blob = json.dumps(keys, ensure_ascii=False).encode('utf-8')
+    signature = store.signature(tree).encode('ascii')
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, sys.byteorder.encode().ljust(8), len(keys), len(starts),
+                            len(offsets), len(blob), len(keys_blob), signature))
+        for section in (verses, offsets, starts, ends, words):
+            f.write(section.tobytes())
+        f.write(blob)
+        f.write(keys_blob)
+    os.replace(tmp_path, path)
+    return path
+
+
+class MappedCorpus:
+    """Read-only view over a corpus file; all arrays are zero-copy memoryviews"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = self._buf = memoryview(self._mmap)
+
+        (magic, byteorder, self.verse_count, self.mapping_count, offset_count,
+         blob_len, keys_len, signature) = HEADER.unpack_from(buf)
+        if magic != MAGIC or byteorder.strip() != sys.byteorder.encode():
+            self.close()
+            raise ValueError(f"Not a corpus file for this platform: {self.path}")
+        self.signature = signature.decode('ascii')
+
+        pos = HEADER.size
+
+        def take(count, typecode):
+            nonlocal pos
+            size = count * array(typecode).itemsize
+            view = buf[pos:pos + size].cast('B').cast(typecode)
+            pos += size
+            return view
+
+        self.verses = take(self.verse_count * VERSE_FIELDS, 'I')
+        self.offsets = take(offset_count, 'I')
+        self.starts = take(self.mapping_count, 'i')
+        self.ends = take(self.mapping_count, 'i')
+        self.words = take(self.mapping_count * 2, 'I')
+        self.blob = buf[pos:pos + blob_len]
+        self._keys_view = buf[pos + blob_len:pos + blob_len + keys_len]
+        self._keys = None
+
+    def close(self):
+        for name in ("verses", "offsets", "starts", "ends", "words", "blob", "_keys_view", "_buf"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Lookups (these decode - use them for reporting, not in hot loops)
+    # ------------------------------------------------------------------
+
+    def key(self, verse_idx):
+        """(book, chapter, verse) for a verse index"""
+        if self._keys is None:
+            self._keys = json.loads(bytes(self._keys_view).decode('utf-8'))
+        return tuple(self._keys[verse_idx])
+
+    def verse_text(self, verse_idx):
+        text_start, base, char_count = self.verses[verse_idx * VERSE_FIELDS:verse_idx * VERSE_FIELDS + 3]
+        return bytes(self.blob[text_start:text_start + self.offsets[base + char_count]]).decode('utf-8')
+
+    def mapping_word(self, mapping_idx):
+        offset, length = self.words[mapping_idx * 2], self.words[mapping_idx * 2 + 1]
+        return bytes(self.blob[offset:offset + length]).decode('utf-8')
+
+    def mapping_span(self, mapping_idx):
+        start, end = self.starts[mapping_idx], self.ends[mapping_idx]
+        return (None if start == MISSING else start, None if end == MISSING else end)
+
+    # ------------------------------------------------------------------
+    # Position check
+    # ------------------------------------------------------------------
+
+    def position_mismatches(self):
+        """
+        Yield (verse_idx, mapping_idx, mapping_number) wherever
+        ar[start:end] != mapping["ar"] (mapping_number is the index within
+        the verse). Mirrors Python slice semantics, including clamping.
+        """
+        verses, offsets, starts, ends, words, blob = (
+            self.verses, self.offsets, self.starts, self.ends, self.words, self.blob)
+
+        for v in range(self.verse_count):
+            row = v * VERSE_FIELDS
+            text_start = verses[row]
+            base = verses[row + 1]
+            char_count = verses[row + 2]
+            first = verses[row + 3]
+
+            for j in range(first, first + verses[row + 4]):
+                start = starts[j]
+                end = ends[j]
+                if start == MISSING or end == MISSING:
+                    yield v, j, j - first
+                    continue
+                if start < 0 or end < 0 or start > char_count or end > char_count:
+                    start, end, _ = slice(start, end).indices(char_count)
+                if end < start:
+                    end = start
+
+                lo = text_start + offsets[base + start]
+                hi = text_start + offsets[base + end]
+                word_at = words[2 * j]
+                word_len = words[2 * j + 1]
+                if hi - lo != word_len or blob[lo:hi] != blob[word_at:word_at + word_len]:
+                    yield v, j, j - first
+
+    def mismatched_chapters(self, books=None):
+        """{(book, chapter)} with at least one position mismatch"""
+        chapters = set()
+        for v, _, _ in self.position_mismatches():
+            book, chapter, _ = self.key(v)
+            if not books or book in books:
+                chapters.add((book, chapter))
+        return chapters
+
+
+def open_corpus(tree=DEFAULT_TREE, rebuild=False):
+    """
+    Map the corpus file for a tree, (re)building it first if it is missing
+    or older than the JSON files (via the corpus store signature)
+    """
+    store = synced_store(tree)
+    path = corpus_path(tree)
+
+    if not rebuild and path.exists():
+        try:
+            corpus = MappedCorpus(path)
+        except (ValueError, struct.error):
+            corpus = None
+        if corpus is not None:
+            if corpus.signature == store.signature(tree):
+                return corpus
+            corpus.close()
+
+    build(tree, path, store)
+    return MappedCorpus(path)
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Whole-corpus position check over the mmap corpus')
+    parser.add_argument('--tree', default=DEFAULT_TREE, help=f'Mapping tree (default: {DEFAULT_TREE})')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the corpus file first')
+    parser.add_argument('--show', type=int, default=10, help='Mismatches to print (default: 10)')
+    args = parser.parse_args()
+
+    start = time.time()
+    corpus = open_corpus(args.tree, rebuild=args.rebuild)
+    opened = time.time() - start
+
+    start = time.time()
+    mismatches = list(corpus.position_mismatches())
+    checked = time.time() - start
+
+    print(f"📖 {args.tree}: {corpus.verse_count} verses, {corpus.mapping_count} mappings "
+          f"(opened in {opened:.2f}s)")
+    print(f"🔍 Position check: {len(mismatches)} mismatches in {checked:.2f}s")
+
+    for v, j, n in mismatches[:args.show]:
+        book, chapter, verse = corpus.key(v)
+        start_pos, end_pos = corpus.mapping_span(j)
+        text = corpus.verse_text(v)
+        actual = text[start_pos:end_pos] if start_pos is not None and end_pos is not None else None
+        print(f"  {book} {chapter}:{verse} #{n}: expected '{corpus.mapping_word(j)}' got '{actual}'")
+
+    corpus.close()
+
+
+if __name__ == "__main__":
+    main()
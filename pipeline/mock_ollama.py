@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Ollama's /api/generate, for benchmarks and dry runs
+
+Every script needs a live Ollama at localhost:11434, so nothing about the
+pipeline's throughput could be measured without a GPU box. This server
+speaks the same protocol (stream and non-stream, num_predict, done_reason,
+eval_count) and answers the pipeline's prompts deterministically:
+
+- numbered word lists      -> "N. gloss" (or bare lines for the plain prompt)
+- packed "A1. word" lists  -> "A1. gloss"
+- single-word prompts      -> "gloss"
+- YES/NO validation        -> "YES", or "NO" for --no-rate of the prompts
+
+A gloss is derived from a hash of the Arabic word, so the same word always
+gets the same gloss and runs are reproducible. Timing and faults are
+configurable: a latency distribution for the time to first token, a
+per-token generation time, a capacity (requests served at once - the rest
+queue like on a real GPU), and failure (HTTP 503) and truncation rates.
+Random choices are seeded from --seed, the prompt and how often it was
+sent, so they do not depend on request arrival order.
+
+Usage:
+    python3 -m pipeline.mock_ollama --port 11434 --latency lognormal:0.4,0.3 --capacity 4
+    OLLAMA_HOST=http://localhost:11434 python3 regenerate_mappings_gpu.py --books PHP
+
+    server = MockOllama(MockConfig(latency="fixed:0.05")).start()   # In-process
+    ollama_client.configure(api_url=server.api_url)
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from aiohttp import web
+
+GLOSS_WORDS = [
+    "the", "lord", "god", "people", "land", "house", "word", "son", "king",
+    "heart", "day", "man", "city", "name", "father", "spirit", "way", "hand",
+    "light", "life", "law", "sea", "mountain", "servant", "voice", "glory",
+    "said", "came", "went", "gave", "saw", "made", "heard", "spoke", "walked",
+    "and", "in", "to", "from", "upon", "with", "for", "against", "before",
+]
+
+LABELLED_WORD = re.compile(r'^([A-Z]{1,2}\d+)\. (\S+)$', re.MULTILINE)
+NUMBERED_WORD = re.compile(r'^(\d+)\. (\S+)$', re.MULTILINE)
+SINGLE_WORD = re.compile(r"(?:Word to translate: (\S+)|the Arabic word '([^']+)')")
+TOKEN = re.compile(r'\w+|[^\w\s]|\s+')
+
+
+class MockConfig:
+    """Timing and fault settings for MockOllama"""
+
+    def __init__(self, model="gemma3:12b", latency="lognormal:0.3,0.25", per_token=0.01,
+                 capacity=4, failure_rate=0.0, truncation_rate=0.0, no_rate=0.1, seed=0):
+        self.model = model
+        self.latency = latency  # Time to first token
+        self.per_token = per_token  # Seconds per generated token
+        self.capacity = capacity  # Requests generated at once; the rest wait
+        self.failure_rate = failure_rate  # Share of requests answered with HTTP 503
+        self.truncation_rate = truncation_rate  # Share of answers cut short (done_reason "length")
+        self.no_rate = no_rate  # Share of YES/NO prompts answered NO
+        self.seed = seed
+
+
+def parse_distribution(spec):
+    """
+    "fixed:0.2", "uniform:0.1,0.5", "exp:0.3" (mean) or
+    "lognormal:0.3,0.25" (median, sigma) -> rng -> seconds
+    """
+    kind, _, params = spec.partition(':')
+    values = [float(v) for v in params.split(',')] if params else []
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def gloss(word):
+    """Deterministic one- or two-word English stand-in for an Arabic word"""
+    digest = hashlib.sha1(word.encode('utf-8')).digest()
+    first = GLOSS_WORDS[digest[0] % len(GLOSS_WORDS)]
+    if digest[1] % 3:
+        return first
+    return f"{first} {GLOSS_WORDS[digest[2] % len(GLOSS_WORDS)]}"
+
+
+def answer(prompt, rng, no_rate):
+    """The text a well-behaved model would give for one of the pipeline's prompts"""
+    labelled = LABELLED_WORD.findall(prompt)
+    if labelled:
+        return "\n".join(f"{label}. {gloss(word)}" for label, word in labelled)
+
+    numbered = NUMBERED_WORD.findall(prompt)
+    if numbered:
+        if "no labels" in prompt:
+            return "\n".join(gloss(word) for _, word in numbered)
+        return "\n".join(f"{n}. {gloss(word)}" for n, word in numbered)
+
+    if '"YES" or "NO"' in prompt:
+        return "NO" if rng.random() < no_rate else "YES"
+
+    single = SINGLE_WORD.search(prompt)
+    if single:
+        return gloss(single.group(1) or single.group(2))
+
+    return "OK"
+
+
+class MockOllama:
+    """aiohttp server on a background thread (or run_forever() from the CLI)"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self.first_token = parse_distribution(self.config.latency)
+        self.stats = {
+            "requests": 0,
+            "failures": 0,
+            "truncated": 0,
+            "cancelled": 0,
+            "tokens": 0,
+        }
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self._slots = None
+        self._attempts = {}
+
+    @property
+    def api_url(self):
+        return f"http://{self.host}:{self.port}/api/generate"
+
+    # ------------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------------
+
+    def _rng(self, payload):
+        # Seeded per prompt and attempt: a retry of a failed prompt gets a fresh draw
+        prompt = payload.get('prompt', '').encode('utf-8')
+        digest = hashlib.sha1(prompt).hexdigest()
+        attempt = self._attempts.get(digest, 0)
+        self._attempts[digest] = attempt + 1
+        key = f"{self.config.seed}|{attempt}|{digest}".encode('utf-8')
+        return random.Random(hashlib.sha1(key).digest())
+
+    async def _generate(self, request):
+        payload = await request.json()
+        self.stats["requests"] += 1
+        rng = self._rng(payload)
+
+        if rng.random() < self.config.failure_rate:
+            self.stats["failures"] += 1
+            return web.json_response({"error": "server busy"}, status=503)
+
+        tokens = TOKEN.findall(answer(payload.get("prompt", ""), rng, self.config.no_rate))
+        done_reason = "stop"
+        num_predict = (payload.get("options") or {}).get("num_predict")
+        if num_predict and len(tokens) > num_predict:
+            tokens, done_reason = tokens[:num_predict], "length"
+        elif tokens and rng.random() < self.config.truncation_rate:
+            tokens, done_reason = tokens[:rng.randrange(len(tokens))], "length"
+        if done_reason == "length":
+            self.stats["truncated"] += 1
+
+        final = {
+            "model": payload.get("model", self.config.model),
+            "done": True,
+            "done_reason": done_reason,
+            "eval_count": len(tokens),
+        }
+        first_token = self.first_token(rng)
+
+        async with self._slots:
+            start = time.monotonic()
+            if not payload.get("stream", True):
+                await asyncio.sleep(first_token + self.config.per_token * len(tokens))
+                self.stats["tokens"] += len(tokens)
+                final["response"] = "".join(tokens)
+                final["total_duration"] = int((time.monotonic() - start) * 1e9)
+                return web.json_response(final)
+
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            await asyncio.sleep(first_token)
+            try:
+                for token in tokens:
+                    await asyncio.sleep(self.config.per_token)
+                    self.stats["tokens"] += 1
+                    await response.write((json.dumps({"response": token, "done": False}) + "\n").encode())
+                final["response"] = ""
+                final["total_duration"] = int((time.monotonic() - start) * 1e9)
+                await response.write((json.dumps(final) + "\n").encode())
+            except (ConnectionResetError, asyncio.CancelledError):
+                # The client stopped reading (early stop / abort): stop generating
+                self.stats["cancelled"] += 1
+                raise
+            return response
+
+    async def _tags(self, request):
+        return web.json_response({"models": [{"name": self.config.model}]})
+
+    async def _stats(self, request):
+        return web.json_response(self.stats)
+
+    def _app(self):
+        app = web.Application()
+        app.router.add_post('/api/generate', self._generate)
+        app.router.add_get('/api/tags', self._tags)
+        app.router.add_get('/mock/stats', self._stats)
+        return app
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def _start(self):
+        self._slots = asyncio.Semaphore(self.config.capacity)
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port 0 = pick a free one
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self):
+        """Serve from a daemon thread; returns self once the port is bound"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="mock-ollama", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+
+    def run_forever(self):
+        """Serve on the calling thread until interrupted"""
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(self._start())
+        print(f"🧪 Mock Ollama listening on {self.api_url}")
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            loop.run_until_complete(self._runner.cleanup())
+            print(f"Served: {self.stats}")
+
+
+def add_arguments(parser):
+    """Mock settings as CLI flags (shared with benchmark_pipeline.py)"""
+    defaults = MockConfig()
+    parser.add_argument('--latency', default=defaults.latency,
+                        help=f'Time-to-first-token distribution (default: {defaults.latency})')
+    parser.add_argument('--per-token', type=float, default=defaults.per_token,
+                        help=f'Seconds per generated token (default: {defaults.per_token})')
+    parser.add_argument('--capacity', type=int, default=defaults.capacity,
+                        help=f'Requests generated at once (default: {defaults.capacity})')
+    parser.add_argument('--failure-rate', type=float, default=defaults.failure_rate,
+                        help='Share of requests answered with HTTP 503 (default: 0)')
+    parser.add_argument('--truncation-rate', type=float, default=defaults.truncation_rate,
+                        help='Share of answers cut short (default: 0)')
+    parser.add_argument('--no-rate', type=float, default=defaults.no_rate,
+                        help=f'Share of YES/NO prompts answered NO (default: {defaults.no_rate})')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='Random seed (default: 0)')
+
+
+def config_from_args(args):
+    return MockConfig(latency=args.latency, per_token=args.per_token, capacity=args.capacity,
+                      failure_rate=args.failure_rate, truncation_rate=args.truncation_rate,
+                      no_rate=args.no_rate, seed=args.seed)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Mock Ollama /api/generate server')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=11434, help='Port (default: 11434)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    MockOllama(config_from_args(args), args.host, args.port).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Diacritic-insensitive folding of Arabic words
+
+A mapping's `ar` and the verse text often spell the same word with
+different harakat (a model re-vocalizes it, or a source import truncated
+the final vowel), so exact string matching fails and each fix script
+grew its own workaround (strip_final_diacritics in fix_2ch_diacritics.py,
+match_key in fix_positions.py, the hand-written fuzzy match in
+fix_word_mappings.py). fold() is the one comparison key:
+
+    tashkeel     fathatan .. sukun, superscript alef, maddah/hamza marks  -> removed
+    hamza forms  أ إ آ ٱ -> ا,   ؤ -> و,   ئ -> ي
+    tatweel      ـ -> removed
+    punctuation  Arabic and ASCII punctuation -> removed
+
+so words that differ only in those fold to the same key, and matching is
+a dict lookup on keys. fold() is a single str.translate() call; the token
+index (pipeline/token_index.py) also stores the folded key of every source
+word, so repair matching does not re-fold the verse text at all.
+
+Usage:
+    fold("إِلَى")                      # "الى"
+    same_word("الرَّبِّ", "الرب")         # True
+    strip_final_diacritics("كَتَبَ")     # "كَتَب"
+"""
+
+import string
+
+# Short vowels, tanween, shadda, sukun, and the combining marks after them
+TASHKEEL = (
+    [chr(c) for c in range(0x064B, 0x0660)]  # fathatan .. wavy hamza below
+    + ['ٰ']  # superscript alef
+    + [chr(c) for c in range(0x06D6, 0x06EE)]  # Quranic annotation marks
+)
+TATWEEL = 'ـ'
+HAMZA_FORMS = {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ؤ': 'و', 'ئ': 'ي'}
+PUNCTUATION = '،.؟!:«»؛' + string.punctuation + '؍٪٫٬۔'
+
+# Vowel marks the source text sometimes truncates from the end of a word
+FINAL_DIACRITICS = 'َُِّْ'  # fatha, damma, kasra, shadda, sukun
+
+_FOLD = str.maketrans({
+    **{c: None for c in TASHKEEL},
+    TATWEEL: None,
+    **HAMZA_FORMS,
+    **{c: None for c in PUNCTUATION},
+})
+
+
+def fold(word):
+    """The diacritic-, hamza-, tatweel- and punctuation-insensitive key of a word"""
+    return word.translate(_FOLD)
+
+
+def same_word(a, b):
+    """True if two spellings fold to the same (non-empty) key"""
+    key = fold(a)
+    return bool(key) and key == fold(b)
+
+
+def strip_final_diacritics(word):
+    """Remove trailing vowel marks (the truncation some source imports show)"""
+    return word.rstrip(FINAL_DIACRITICS)
+
+
+def fold_all(words):
+    """[fold(w) for w in words]"""
+    return [w.translate(_FOLD) for w in words]
+
+
+def key_positions(keys):
+    """{key: [index, ...]} in order - for "next occurrence of this key" lookups"""
+    positions = {}
+    for i, key in enumerate(keys):
+        positions.setdefault(key, []).append(i)
+    return positions
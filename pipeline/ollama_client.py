@@ -0,0 +1,408 @@
+"""
+Shared asyncio Ollama client with a pooled keep-alive HTTP session
+
+Every pipeline script used to call requests.post(OLLAMA_API, ...) with no
+Session, which opened a fresh TCP connection per batch and parked a whole
+thread on it. This module keeps ONE aiohttp session per process on a
+background event loop:
+
+- HTTP/1.1 keep-alive connection pool (connections are reused across batches)
+- Adaptive in-flight limit (AIMD, pipeline/concurrency.py): extra callers
+  wait instead of piling onto Ollama, and the limit follows what the
+  server can actually sustain
+- Per-request timeouts (stretched on a slow server) and retries with
+  exponential backoff
+- Optional streaming (pipeline/streaming.py): numbered answers are parsed
+  as tokens arrive and the request is cut off once every line is in, or
+  as soon as the output goes off-format (then asked again, ABORT_RETRIES
+  times)
+- Optional output budgets (pipeline/output_budget.py): num_predict sized
+  from the batch's word count, truncated answers counted
+
+Synchronous callers (ThreadPoolExecutor workers, multiprocessing workers)
+just call generate(); async callers can await the future from submit().
+
+Usage:
+    from pipeline import ollama_client
+    text = ollama_client.generate(MODEL, prompt, {"temperature": 0.1}, timeout=20)
+    text = ollama_client.generate(MODEL, prompt, options, stream=streaming.numbered(len(words)),
+                                  budget=output_budget.plan(MODEL, len(words)))
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from pipeline.concurrency import AIMDController
+
+DEFAULT_PORT = 11434
+
+
+def normalize_host(host):
+    """
+    OLLAMA_HOST as Ollama itself reads it: a bare host ("0.0.0.0", "gpu-box")
+    is http on port 11434; with an explicit scheme the scheme's port applies
+    """
+    host = host.strip().rstrip('/')
+    if "://" in host:
+        return host
+    if urlsplit(f"//{host}").port is None:
+        host = f"{host}:{DEFAULT_PORT}"
+    return f"http://{host}"
+
+
+OLLAMA_HOST = normalize_host(os.environ.get("OLLAMA_HOST", "http://localhost:11434"))
+OLLAMA_API = f"{OLLAMA_HOST}/api/generate"
+
+MAX_IN_FLIGHT = int(os.environ.get("OLLAMA_MAX_IN_FLIGHT", "4"))  # Ceiling for the adaptive limit
+POOL_SIZE = 8  # Keep-alive connections held open to the server
+TIMEOUT = 120  # Default per-request timeout (seconds)
+RETRIES = 2  # Extra attempts after the first one
+BACKOFF = 0.5  # Seconds, doubled after each failed attempt
+STREAMING = os.environ.get("OLLAMA_STREAM", "1") != "0"  # Honour stream= parsers
+ABORT_RETRIES = 1  # Fresh attempts after a streamed answer went off-format
+
+# Status codes worth retrying (server busy / model still loading)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Controller state is exported here (at most every EXPORT_INTERVAL seconds)
+CONTROLLER_EXPORT = os.environ.get("OLLAMA_CONTROLLER_STATS", "cache/ollama_controller.json")
+EXPORT_INTERVAL = 5
+LATENCY_HISTORY = 10000  # Completed-request latencies kept for percentiles
+
+
+class OllamaError(Exception):
+    """Raised when a request still fails after all retries"""
+
+
+class OllamaClient:
+    """
+    Pooled client for Ollama's /api/generate with an adaptive in-flight limit
+
+    The event loop and aiohttp session live on a daemon thread that is
+    started on first use, so the client can be shared by any number of
+    worker threads.
+    """
+
+    def __init__(self, api_url=OLLAMA_API, max_in_flight=MAX_IN_FLIGHT,
+                 pool_size=POOL_SIZE, timeout=TIMEOUT, retries=RETRIES,
+                 backoff=BACKOFF, streaming=STREAMING, abort_retries=ABORT_RETRIES):
+        self.api_url = api_url
+        self.controller = AIMDController(max_in_flight)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.streaming = streaming
+        self.abort_retries = abort_retries
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._last_export = 0.0
+
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "streamed": 0,
+            "stopped": 0,
+            "aborted": 0,
+            "rerolled": 0,
+            "truncated": 0,
+            "total_latency": 0.0,
+        }
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+    @property
+    def max_in_flight(self):
+        """Upper bound for the adaptive limit (e.g. a script's --workers)"""
+        return self.controller.max_limit
+
+    @max_in_flight.setter
+    def max_in_flight(self, value):
+        self.controller.max_limit = value
+        self.controller.limit = float(max(self.controller.min_limit, value // 2))
+
+    # ------------------------------------------------------------------
+    # Event loop / session lifecycle
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        """Start the background loop and open the pooled session"""
+        if self._loop is not None:
+            return
+
+        with self._lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever,
+                                      name="ollama-client", daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+
+            self._thread = thread
+            self._loop = loop
+
+    async def _open(self):
+        connector = aiohttp.TCPConnector(limit=max(self.pool_size, self.max_in_flight),
+                                         keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector)
+
+    async def _close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close(self):
+        """Close the session and stop the background loop"""
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    async def agenerate(self, model, prompt, options=None, timeout=None,
+                        retries=None, stream=None, budget=None):
+        """
+        Coroutine version of generate() - must run on the client's loop
+        (use submit() from other threads or event loops)
+        """
+        for reroll in range(self.abort_retries + 1):
+            if reroll > 0:
+                self.stats["rerolled"] += 1
+            text, done_reason = await self._request(model, prompt, options, timeout,
+                                                    retries, stream, budget)
+            if done_reason != "aborted":
+                break
+        # Still off-format: the caller parses what arrived before the abort
+        return text
+
+    async def _request(self, model, prompt, options, timeout, retries, stream, budget):
+        """One request with network retries; returns (text, done reason)"""
+        streaming = stream is not None and self.streaming
+        options = dict(options or {})
+        if budget is not None:
+            options["num_predict"] = budget.num_predict
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": streaming,
+            "options": options,
+        }
+        floor = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+
+        last_error = None
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+            await self.controller.acquire()
+            # The caller's timeout is a floor; a slow server stretches it
+            client_timeout = aiohttp.ClientTimeout(total=self.controller.timeout_for(floor))
+            start = time.monotonic()
+            latency = None
+            overloaded = False
+            tokens = None
+            try:
+                async with self._session.post(self.api_url, json=payload,
+                                              timeout=client_timeout) as response:
+                    if response.status in RETRY_STATUSES:
+                        last_error = OllamaError(f"HTTP {response.status}")
+                        overloaded = True
+                        continue
+                    if response.status >= 400:
+                        body = await response.text()
+                        raise OllamaError(f"HTTP {response.status}: {body[:200]}")
+
+                    if streaming:
+                        stream.reset()
+                        text, tokens, done_reason = await self._read_stream(response, stream)
+                    else:
+                        result = await response.json(content_type=None)
+                        text, tokens = result.get("response", ""), result.get("eval_count")
+                        done_reason = result.get("done_reason")
+                    latency = time.monotonic() - start
+                    self.stats["requests"] += 1
+                    self.stats["total_latency"] += latency
+                    self.latencies.append(latency)
+                    # Ollama reports "length" when the answer hit num_predict
+                    truncated = done_reason == "length"
+                    self.stats["truncated"] += truncated
+                    if budget is not None and done_reason != "aborted":
+                        budget.record(tokens, truncated)
+                    return text.strip(), done_reason
+
+            except asyncio.TimeoutError as e:
+                last_error = e
+                overloaded = True
+                self.stats["timeouts"] += 1
+            except (aiohttp.ClientError, ValueError) as e:
+                last_error = e
+            finally:
+                await self.controller.release(latency, overloaded, tokens)
+                self._maybe_export()
+
+        self.stats["failures"] += 1
+        raise OllamaError(f"Request failed after {retries + 1} attempts: {last_error!r}")
+
+    async def _read_stream(self, response, stream):
+        """
+        Feed streamed chunks to the parser until the answer is complete,
+        goes off-format or ends
+        Returns (text so far, tokens generated, done reason)
+        """
+        self.stats["streamed"] += 1
+        pieces = []
+        tokens = 0
+        async for raw in response.content:
+            if not raw.strip():
+                continue
+            chunk = json.loads(raw)
+            if "error" in chunk:
+                raise OllamaError(f"Stream error: {chunk['error']}")
+            piece = chunk.get("response", "")
+            pieces.append(piece)
+            tokens += 1  # Ollama streams one token per chunk
+            if chunk.get("done"):
+                stream.finish()
+                return "".join(pieces), chunk.get("eval_count", tokens), chunk.get("done_reason")
+            state = stream.feed(piece)
+            if state:
+                # Dropping the connection makes Ollama stop generating
+                self.stats[state] += 1
+                response.close()
+                return "".join(pieces), tokens, state
+        return "".join(pieces), tokens, None
+
+    def _maybe_export(self):
+        """Write the controller snapshot for dashboards / other processes"""
+        now = time.monotonic()
+        if not CONTROLLER_EXPORT or now - self._last_export < EXPORT_INTERVAL:
+            return
+        self._last_export = now
+        snapshot = dict(self.controller.snapshot(), pid=os.getpid(), updated=time.time())
+        try:
+            path = Path(CONTROLLER_EXPORT)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(snapshot))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def submit(self, model, prompt, options=None, timeout=None, retries=None,
+               stream=None, budget=None):
+        """Schedule a request and return a concurrent.futures.Future"""
+        self._ensure_started()
+        coro = self.agenerate(model, prompt, options, timeout, retries, stream, budget)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def generate(self, model, prompt, options=None, timeout=None, retries=None,
+                 stream=None, budget=None):
+        """
+        Send one prompt and return the stripped response text
+        With a stream parser (pipeline/streaming.py) the text may stop early:
+        once every expected line is in, or where the output went off-format
+        With a budget (pipeline/output_budget.py) num_predict is set from it
+        and the answer's token count is fed back
+        Raises OllamaError if every attempt fails
+        """
+        return self.submit(model, prompt, options, timeout, retries, stream, budget).result()
+
+    def generate_many(self, model, prompts, options=None, timeout=None):
+        """
+        Send several prompts concurrently (bounded by the adaptive limit)
+        Returns a list of response texts, None where a request failed
+        """
+        futures = [self.submit(model, p, options, timeout) for p in prompts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except OllamaError:
+                results.append(None)
+        return results
+
+
+# ----------------------------------------------------------------------
+# Shared per-process client
+# ----------------------------------------------------------------------
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide client, creating it on first use
+    A forked multiprocessing worker gets its own client (the parent's
+    loop thread does not survive fork)
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = OllamaClient()
+                _client_pid = pid
+                atexit.register(_client.close)
+    return _client
+
+
+def configure(**settings):
+    """
+    Override settings (max_in_flight, timeout, retries, ...) on the shared
+    client - call before the first request, e.g. from a script's --workers
+    """
+    client = get_client()
+    for key, value in settings.items():
+        if not hasattr(client, key):
+            raise TypeError(f"Unknown client setting: {key}")
+        setattr(client, key, value)
+    return client
+
+
+def generate(model, prompt, options=None, timeout=None, retries=None, stream=None,
+             budget=None):
+    """Shortcut for get_client().generate(...)"""
+    return get_client().generate(model, prompt, options, timeout, retries, stream, budget)
+
+
+def controller_stats():
+    """Current adaptive limit, throughput, latency and timeout rate"""
+    return get_client().controller.snapshot()
+
+
+def controller_summary():
+    """One-line controller stats for end-of-run reports"""
+    return get_client().controller.summary()
+
+
+def stream_summary():
+    """One-line streaming stats for end-of-run reports"""
+    stats = get_client().stats
+    return (f"{stats['streamed']} streamed, {stats['stopped']} stopped early, "
+            f"{stats['aborted']} aborted off-format ({stats['rerolled']} asked again)")
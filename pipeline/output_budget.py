@@ -0,0 +1,191 @@
+"""
+Per-batch num_predict from the word count and observed tokens per gloss
+
+NUM_PREDICT used to be a constant (100 for GPU batches, 300/400 for the
+numbered prompts) whatever the batch size: a long batch got cut off
+mid-list - words silently dropped, later reported as "misaligned" verses -
+while a two-word batch reserved hundreds of tokens it never used.
+
+plan(model, words, style) sizes num_predict for one request as
+
+    words x p90(tokens per word) x MARGIN + OVERHEAD
+
+where tokens per word is learned from Ollama's eval_count on earlier
+answers of the same model and answer style ("plain" one-gloss-per-line,
+"numbered" N. lines, "labelled" A1. lines), with a conservative default
+until enough answers have been seen. Answers that hit the limit
+(done_reason "length") are counted as truncations and push the estimate
+up. History is kept in cache/output_budget.json across runs.
+
+Usage:
+    budget = output_budget.plan(MODEL, len(words), style="numbered")
+    text = ollama_client.generate(MODEL, prompt, options, budget=budget)
+
+    python3 -m pipeline.output_budget   # Show the learned budgets
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+from pathlib import Path
+
+STATS_PATH = os.environ.get("OUTPUT_BUDGET", "cache/output_budget.json")
+
+# Tokens per word until MIN_SAMPLES answers have been seen for a model/style
+DEFAULT_TOKENS_PER_WORD = {"plain": 4, "numbered": 6, "labelled": 8}
+MIN_SAMPLES = 20
+HISTORY = 500  # Recent tokens-per-word samples kept per model/style
+
+PERCENTILE = 0.9
+MARGIN = 1.25
+OVERHEAD = 16  # Preamble, blank lines, end of turn
+MIN_TOKENS = 32
+MAX_TOKENS = 2048
+TRUNCATION_BOOST = 1.5  # A truncated answer needed more than it was given
+SAVE_EVERY = 50  # Observations between saves
+
+
+class Budget:
+    """num_predict for one request; the client reports back how it went"""
+
+    def __init__(self, stats, key, words, num_predict):
+        self.stats = stats
+        self.key = key
+        self.words = words
+        self.num_predict = num_predict
+
+    def record(self, tokens, truncated):
+        self.stats.observe(self.key, self.words, tokens, truncated)
+
+
+class OutputBudgetStats:
+    """Tokens-per-word history and truncation counts per model/style"""
+
+    def __init__(self, path=STATS_PATH):
+        self.path = Path(path)
+        self.samples = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (json.JSONDecodeError, ValueError, OSError):
+            return
+        for key, entry in saved.items():
+            self.samples[key] = entry.get("samples", [])[-HISTORY:]
+            self.counts[key] = entry.get("counts", {})
+
+    def save(self):
+        with self._lock:
+            if not self._unsaved:
+                return
+            data = {
+                key: {"samples": self.samples[key], "counts": self.counts.get(key, {})}
+                for key in self.samples
+            }
+            self._unsaved = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def tokens_per_word(self, key, style):
+        with self._lock:
+            samples = sorted(self.samples.get(key, []))
+        if len(samples) < MIN_SAMPLES:
+            # Too few answers for a percentile: never plan below the worst seen
+            return max([DEFAULT_TOKENS_PER_WORD[style]] + samples)
+        return samples[min(len(samples) - 1, int(PERCENTILE * len(samples)))]
+
+    def plan(self, model, words, style="numbered"):
+        key = f"{model}|{style}"
+        estimate = words * self.tokens_per_word(key, style) * MARGIN + OVERHEAD
+        num_predict = max(MIN_TOKENS, min(MAX_TOKENS, math.ceil(estimate)))
+        return Budget(self, key, words, num_predict)
+
+    def observe(self, key, words, tokens, truncated):
+        if not words or not tokens:
+            return
+        sample = tokens / words
+        if truncated:
+            sample *= TRUNCATION_BOOST
+        with self._lock:
+            samples = self.samples.setdefault(key, [])
+            samples.append(round(sample, 3))
+            del samples[:-HISTORY]
+            counts = self.counts.setdefault(key, {"requests": 0, "truncated": 0})
+            counts["requests"] += 1
+            counts["truncated"] += bool(truncated)
+            self._unsaved += 1
+            due = self._unsaved >= SAVE_EVERY
+        if due:
+            self.save()
+
+    def truncation_rate(self):
+        requests = sum(c["requests"] for c in self.counts.values())
+        truncated = sum(c["truncated"] for c in self.counts.values())
+        return truncated / requests if requests else 0.0
+
+    def summary(self):
+        requests = sum(c["requests"] for c in self.counts.values())
+        truncated = sum(c["truncated"] for c in self.counts.values())
+        return f"{truncated}/{requests} answers truncated ({self.truncation_rate():.1%})"
+
+
+# ----------------------------------------------------------------------
+# Shared per-process stats
+# ----------------------------------------------------------------------
+
+_stats = None
+_stats_pid = None
+_stats_lock = threading.Lock()
+
+
+def get_budget_stats():
+    """Return the process-wide stats (a forked worker loads its own)"""
+    global _stats, _stats_pid
+    pid = os.getpid()
+    if _stats is None or _stats_pid != pid:
+        with _stats_lock:
+            if _stats is None or _stats_pid != pid:
+                _stats = OutputBudgetStats()
+                _stats_pid = pid
+                atexit.register(_stats.save)
+    return _stats
+
+
+def plan(model, words, style="numbered"):
+    """Budget for one request of `words` glosses (see module docstring)"""
+    return get_budget_stats().plan(model, words, style)
+
+
+def summary():
+    """One-line truncation stats for end-of-run reports"""
+    return get_budget_stats().summary()
+
+
+def main():
+    stats = get_budget_stats()
+    if not stats.samples:
+        print(f"No answers recorded yet in {stats.path}")
+        return
+    print(f"{'model / style':<32} {'answers':>8} {'trunc':>7} {'tok/word p90':>13} {'20 words':>9}")
+    for key in sorted(stats.samples):
+        model, style = key.rsplit('|', 1)
+        counts = stats.counts.get(key, {"requests": 0, "truncated": 0})
+        print(f"{key:<32} {counts['requests']:>8} {counts['truncated']:>7} "
+              f"{stats.tokens_per_word(key, style):>13.2f} {stats.plan(model, 20, style).num_predict:>9}")
+    print(f"\n{stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
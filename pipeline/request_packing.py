@@ -0,0 +1,91 @@
+"""
+Pack several short verses into one model request and split the answer back
+
+Short verses (Proverbs, Psalms) make tiny requests whose fixed prompt
+overhead dominates. A packed prompt gives each verse a letter and each of
+its words a label (A1, A2, ..., B1, ...), and the model answers one
+"A1. gloss" line per word. demultiplex() then checks the numbering
+strictly per verse: a verse is only accepted if every one of its labels
+appears exactly once; otherwise that verse is reported as failed so the
+caller can fall back to a single-verse request.
+
+Usage:
+    for group in pack(verses, size=lambda v: estimate_tokens(v.ar) + ..., budget=1500):
+        prompt = ... section_label(i) ...
+        results = demultiplex(response, [len(words) for words in group_words])
+"""
+
+import re
+import string
+
+CHARS_PER_TOKEN = 3  # Rough, conservative for vocalized Arabic
+
+LABEL_LINE = re.compile(r'^\W*([A-Z]{1,2})\s*(\d+)\s*[.):\-]\s*(.*)$')
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def section_label(index):
+    """0 -> A, 25 -> Z, 26 -> AA, ..."""
+    letters = string.ascii_uppercase
+    if index < len(letters):
+        return letters[index]
+    return letters[index // len(letters) - 1] + letters[index % len(letters)]
+
+
+def pack(items, size, budget, max_items=26):
+    """
+    Greedily group items (in order) so each group's total size stays within
+    budget. An item larger than the budget gets a group of its own.
+    """
+    groups = []
+    current = []
+    used = 0
+    for item in items:
+        item_size = size(item)
+        if current and (used + item_size > budget or len(current) >= max_items):
+            groups.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += item_size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def demultiplex(response_text, word_counts, clean=None):
+    """
+    Split a packed response into per-section gloss lists
+
+    word_counts[i] is the number of words in section i (label section_label(i)).
+    Returns a list with, per section, the glosses in word order - or None if
+    that section's numbering was incomplete, duplicated or out of range.
+    """
+    labels = {section_label(i): i for i in range(len(word_counts))}
+    found = [dict() for _ in word_counts]
+    broken = set()
+
+    for line in response_text.split('\n'):
+        match = LABEL_LINE.match(line.strip())
+        if not match:
+            continue
+        label, number, gloss = match.group(1), int(match.group(2)), match.group(3).strip()
+        if clean:
+            gloss = clean(gloss)
+        section = labels.get(label)
+        if section is None:
+            continue
+        if not 1 <= number <= word_counts[section] or number in found[section] or not gloss:
+            broken.add(section)
+            continue
+        found[section][number] = gloss
+
+    results = []
+    for i, count in enumerate(word_counts):
+        if i in broken or len(found[i]) != count:
+            results.append(None)
+        else:
+            results.append([found[i][n] for n in range(1, count + 1)])
+    return results
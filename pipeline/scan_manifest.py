@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Incremental chapter scanner backed by a hash manifest
+
+complete_bible_gpu.py rescans the mapping tree before and after every
+repair pass, and the repair scripts each walk it again to find work. Most
+chapters do not change between passes, so this keeps a manifest
+(cache/scan_manifest.json) with, per chapter file:
+
+    mtime_ns, size, sha1   - to detect changes
+    results                - the cached scan of that file:
+        verses               verse count
+        misaligned           [[verse, expected, actual], ...] (fewer mappings than words)
+        empty_translations   [[verse, index], ...]
+        position_mismatches  [[verse, index], ...] (ar[start:end] != mapping ar)
+        corrupted            True if the file contains U+FFFD or is not valid JSON
+
+A rescan stats every file; unchanged stat means the cached results are
+reused, a changed stat with the same content hash only refreshes the
+stat, and only files whose content changed are parsed again.
+
+Usage:
+    python3 -m pipeline.scan_manifest                       # Scan + summary
+    python3 -m pipeline.scan_manifest --tree bible-translations/mappings
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from pipeline.corruption import has_corruption
+from pipeline.tokenizer import tokenize
+
+MANIFEST_PATH = os.environ.get("SCAN_MANIFEST", "cache/scan_manifest.json")
+DEFAULT_TREE = "bible-maps-word-gemma3/mappings"
+
+# Bump when scan_chapter() changes so stale cached results are discarded
+SCAN_VERSION = 2
+
+
+def scan_chapter(raw):
+    """Scan one chapter file's bytes; returns the results dict stored in the manifest"""
+    results = {
+        "verses": 0,
+        "misaligned": [],
+        "empty_translations": [],
+        "position_mismatches": [],
+        "corrupted": has_corruption(raw),
+    }
+
+    try:
+        data = json.loads(raw.decode('utf-8'))
+        verses = data.get("verses", {})
+    except (UnicodeDecodeError, ValueError, AttributeError):
+        results["corrupted"] = True
+        return results
+
+    results["verses"] = len(verses)
+    # Words >= 3 chars per verse (same rule the repair scripts use), whole chapter at once
+    expected_counts = tokenize(v.get("ar", "") for v in verses.values()).long_words().counts().tolist()
+    for (verse_num, verse_data), expected in zip(verses.items(), expected_counts):
+        ar_text = verse_data.get("ar", "")
+        mappings = verse_data.get("mappings", [])
+
+        if expected > len(mappings):
+            results["misaligned"].append([verse_num, expected, len(mappings)])
+
+        for i, m in enumerate(mappings):
+            if not str(m.get("en", "")).strip():
+                results["empty_translations"].append([verse_num, i])
+            start, end = m.get("start"), m.get("end")
+            if not isinstance(start, int) or not isinstance(end, int) or ar_text[start:end] != m.get("ar"):
+                results["position_mismatches"].append([verse_num, i])
+
+    return results
+
+
+class ScanManifest:
+    """Per-file scan cache for one or more chapter trees"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries = {}
+        self.parsed = 0
+        self.rehashed = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                if saved.get("version") == SCAN_VERSION:
+                    self.entries = saved.get("files", {})
+            except (json.JSONDecodeError, ValueError, OSError):
+                self.entries = {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": SCAN_VERSION, "files": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def _refresh(self, chapter_file):
+        """Return up-to-date results for one file, re-parsing only if its content changed"""
+        key = str(chapter_file)
+        stat = chapter_file.stat()
+        entry = self.entries.get(key)
+
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            self.reused += 1
+            return entry["results"]
+
+        raw = chapter_file.read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        if entry and entry["sha1"] == digest:
+            # Touched but not changed (e.g. rewritten with identical content)
+            self.rehashed += 1
+        else:
+            entry = {"sha1": digest, "results": scan_chapter(raw)}
+            self.parsed += 1
+
+        entry["mtime_ns"] = stat.st_mtime_ns
+        entry["size"] = stat.st_size
+        with self._lock:
+            self.entries[key] = entry
+        return entry["results"]
+
+    def scan(self, tree=DEFAULT_TREE, books=None):
+        """
+        Yield (book, chapter, results) for every chapter file in a tree,
+        in book/chapter order, then persist the manifest
+        """
+        root = Path(tree)
+        seen = set()
+        for book_dir in sorted(root.iterdir()):
+            if not book_dir.is_dir() or (books and book_dir.name not in books):
+                continue
+            chapter_files = [f for f in book_dir.glob("*.json") if f.stem.isdigit()]
+            for chapter_file in sorted(chapter_files, key=lambda f: int(f.stem)):
+                seen.add(str(chapter_file))
+                yield book_dir.name, int(chapter_file.stem), self._refresh(chapter_file)
+
+        # Forget deleted files of this tree (only when the whole tree was scanned)
+        if not books:
+            prefix = str(root) + os.sep
+            with self._lock:
+                for key in [k for k in self.entries if k.startswith(prefix) and k not in seen]:
+                    del self.entries[key]
+        self.save()
+
+    def summary(self):
+        return f"{self.parsed} parsed, {self.rehashed} re-hashed, {self.reused} unchanged"
+
+
+def scan(tree=DEFAULT_TREE, books=None):
+    """Scan a tree with the shared manifest; returns [(book, chapter, results), ...]"""
+    return list(ScanManifest().scan(tree, books))
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Incremental chapter scan with a hash manifest')
+    parser.add_argument('--tree', default=DEFAULT_TREE, help=f'Mapping tree (default: {DEFAULT_TREE})')
+    parser.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    args = parser.parse_args()
+
+    books = [b.strip().upper() for b in args.books.split(',')] if args.books else None
+    manifest = ScanManifest()
+
+    start = time.time()
+    chapters = list(manifest.scan(args.tree, books))
+    elapsed = time.time() - start
+
+    totals = {"verses": 0, "misaligned": 0, "empty_translations": 0, "position_mismatches": 0}
+    corrupted = []
+    for book, chapter, results in chapters:
+        totals["verses"] += results["verses"]
+        for field in ("misaligned", "empty_translations", "position_mismatches"):
+            totals[field] += len(results[field])
+        if results["corrupted"]:
+            corrupted.append(f"{book} {chapter}")
+
+    print(f"🔍 {args.tree}: {len(chapters)} chapters in {elapsed:.2f}s ({manifest.summary()})")
+    print(f"  Verses:              {totals['verses']}")
+    print(f"  Misaligned verses:   {totals['misaligned']}")
+    print(f"  Empty translations:  {totals['empty_translations']}")
+    print(f"  Position mismatches: {totals['position_mismatches']}")
+    print(f"  Corrupted chapters:  {len(corrupted)}")
+    for ref in corrupted[:20]:
+        print(f"    {ref}")
+
+
+if __name__ == "__main__":
+    main()
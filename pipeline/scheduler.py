@@ -0,0 +1,137 @@
+"""
+Longest-job-first scheduler for verse-level work items
+
+Splitting work by chapter leaves the end of a run waiting on a few huge
+chapters (PSA 119, the 1CH genealogies) while the other workers sit idle.
+Here every verse (or batch) is its own job with a weight - normally its
+word count - and workers always take the heaviest job left, so the small
+jobs fill in the gaps at the end and all workers stay busy until the
+queue is empty.
+
+Jobs belong to a group (normally the (book, chapter) they write to).
+Result callbacks for one group run one at a time under that group's lock,
+so per-chapter file writes never interleave, and on_group_done fires once
+the last job of a group has been committed.
+
+Usage:
+    scheduler = JobScheduler(workers=4)
+    for ...:
+        scheduler.add(weight, (book, chapter), translate_verse, verse_num, ar, en)
+    scheduler.run(on_result=commit_verse, on_group_done=compact_chapter)
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+
+class JobScheduler:
+    """Run weighted jobs on a thread pool, heaviest first"""
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self._heap = []
+        self._counter = itertools.count()
+        self._pending = {}
+        self._group_locks = {}
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.callback_errors = []
+        self.busy_time = 0.0
+        self.wall_time = 0.0
+
+    def add(self, weight, group, fn, *args):
+        """Queue fn(*args); larger weights are started first"""
+        with self._lock:
+            # Ties keep insertion order
+            heapq.heappush(self._heap, (-weight, next(self._counter), group, fn, args))
+            self._pending[group] = self._pending.get(group, 0) + 1
+            self._group_locks.setdefault(group, threading.Lock())
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _next_job(self):
+        with self._lock:
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)
+
+    def _worker(self, on_result, on_group_done):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            _, _, group, fn, args = job
+
+            start = time.time()
+            try:
+                result, error = fn(*args), None
+            except Exception as e:
+                result, error = None, e
+                traceback.print_exc()
+            elapsed = time.time() - start
+
+            with self._group_locks[group]:
+                try:
+                    if on_result:
+                        on_result(group, args, result, error)
+                except Exception as e:
+                    # A failed commit must not kill the worker (its group
+                    # would never finish); run() re-raises it at the end
+                    error = error or e
+                    self._callback_error(e)
+                finally:
+                    with self._lock:
+                        self.busy_time += elapsed
+                        if error is None:
+                            self.completed += 1
+                        else:
+                            self.failed += 1
+                        self._pending[group] -= 1
+                        group_done = self._pending[group] == 0
+                    if group_done and on_group_done:
+                        try:
+                            on_group_done(group)
+                        except Exception as e:
+                            self._callback_error(e)
+
+    def _callback_error(self, error):
+        traceback.print_exc()
+        with self._lock:
+            self.callback_errors.append(error)
+
+    def run(self, on_result=None, on_group_done=None):
+        """
+        Drain the queue with self.workers threads
+            on_result(group, args, result, error)  - per job, under the group lock
+            on_group_done(group)                   - after a group's last job
+        Exceptions from the callbacks do not stop the other jobs; the first
+        one is re-raised once the queue has drained.
+        """
+        start = time.time()
+        threads = [
+            threading.Thread(target=self._worker, args=(on_result, on_group_done), daemon=True)
+            for _ in range(max(1, self.workers))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_time += time.time() - start
+
+        if self.callback_errors:
+            errors, self.callback_errors = self.callback_errors, []
+            raise errors[0]
+
+    def utilization(self):
+        """Share of worker time spent running jobs (1.0 = never idle)"""
+        capacity = self.wall_time * max(1, self.workers)
+        return self.busy_time / capacity if capacity else 0.0
+
+    def summary(self):
+        return (f"{self.completed} jobs done, {self.failed} failed, "
+                f"{self.utilization():.0%} worker utilization")
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Offline mirror of the upstream Bible source texts, with a local HTTP stand-in
+
+The repair scripts re-fetch chapters from raw.githubusercontent.com one
+request at a time (fetch_chapter in the Unicode/English fix scripts, the
+NIV replacers, fetch_psalms), so a repair over a few hundred chapters is a
+few hundred sequential round trips, and nothing works offline. This keeps
+every fetched file in a local content-addressed store:
+
+    cache/source_mirror/objects/ab/abcdef...   file bytes, named by sha256
+    cache/source_mirror/index.json             {url: {sha256, size, fetched}}
+
+fetch_json(url) serves a mirrored URL from disk and only goes to the
+network for a URL it has never seen (never, with SOURCE_OFFLINE=1). A
+whole edition is mirrored once, in parallel, with `download`; a local
+checkout of a source repository can be imported with `import` instead.
+Identical files (the same chapter in two URL spellings, unchanged
+re-downloads) are stored once.
+
+`serve` answers GET requests in the raw.githubusercontent.com URL layout
+from the mirror, for tools that fetch over HTTP themselves; pointing
+SOURCE_HOST at it (or at any other mirror) also redirects this module's
+own network misses.
+
+Usage:
+    python3 -m pipeline.source_mirror download --edition arb-kehm          # Whole edition
+    python3 -m pipeline.source_mirror download --edition en-niv --books PSA,MAT
+    python3 -m pipeline.source_mirror import --dir ~/bible-api --url https://raw.githubusercontent.com/wldeh/bible-api/main
+    python3 -m pipeline.source_mirror serve --port 8765
+    python3 -m pipeline.source_mirror status
+
+    data = source_mirror.fetch_json(url)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+MIRROR_DIR = os.environ.get("SOURCE_MIRROR", "cache/source_mirror")
+OFFLINE = os.environ.get("SOURCE_OFFLINE", "") not in ("", "0")
+
+RAW_HOST = "https://raw.githubusercontent.com"
+# Where network misses go (another mirror's `serve` works too)
+UPSTREAM = os.environ.get("SOURCE_HOST", RAW_HOST).rstrip("/")
+
+UNIFIED_DIR = "bible-translations/unified"
+
+ARABIC_BOOKS = {
+    "GEN": "التكوين", "EXO": "الخروج", "LEV": "اللاويين", "NUM": "العدد", "DEU": "التثنية",
+    "JOS": "يشوع", "JDG": "القضاة", "RUT": "راعوث", "1SA": "صموئيلالأول",
+    "2SA": "صموئيلالثاني", "1KI": "ملوكالأول", "2KI": "ملوكالثاني",
+    "1CH": "أخبارالأيامالأول", "2CH": "أخبارالأيامالثاني", "EZR": "عزرا", "NEH": "نحميا",
+    "EST": "أستير", "JOB": "أيوب", "PSA": "مزمور", "PRO": "الأمثال", "ECC": "الجامعة",
+    "SNG": "نشيدالأنشاد", "ISA": "إشعياء", "JER": "إرميا", "LAM": "مراثيإرميا",
+    "EZK": "حزقيال", "DAN": "دانيال", "HOS": "هوشع", "JOL": "يوئيل", "AMO": "عاموس",
+    "OBA": "عوبديا", "JON": "يونان", "MIC": "ميخا", "NAM": "ناحوم", "HAB": "حبقوق",
+    "ZEP": "صفنيا", "HAG": "حجي", "ZEC": "زكريا", "MAL": "ملاخي", "MAT": "إنجيلمتى",
+    "MRK": "إنجيلمرقس", "LUK": "إنجيللوقا", "JHN": "إنجيليوحنا", "ACT": "أعمال",
+    "ROM": "روما", "1CO": "كورنثوسالأولى", "2CO": "كورنثوسالثانية", "GAL": "غلاطية",
+    "EPH": "أفسس", "PHP": "فيلبي", "COL": "كولوسي", "1TH": "تسالونيكيالأولى",
+    "2TH": "تسالونيكيالثانية", "1TI": "تيموثاوسالأولى", "2TI": "تيموثاوسالثانية",
+    "TIT": "تيطس", "PHM": "فليمون", "HEB": "العبرانيين", "JAS": "يعقوب",
+    "1PE": "بطرسالأولى", "2PE": "بطرسالثانية", "1JN": "يوحناالأولى", "2JN": "يوحناالثانية",
+    "3JN": "يوحناالثالثة", "JUD": "يهوذا", "REV": "رؤيايوحنا",
+}
+
+ENGLISH_BOOKS = {
+    "GEN": "Genesis", "EXO": "Exodus", "LEV": "Leviticus", "NUM": "Numbers",
+    "DEU": "Deuteronomy", "JOS": "Joshua", "JDG": "Judges", "RUT": "Ruth",
+    "1SA": "1 Samuel", "2SA": "2 Samuel", "1KI": "1 Kings", "2KI": "2 Kings",
+    "1CH": "1 Chronicles", "2CH": "2 Chronicles", "EZR": "Ezra", "NEH": "Nehemiah",
+    "EST": "Esther", "JOB": "Job", "PSA": "Psalm", "PRO": "Proverbs", "ECC": "Ecclesiastes",
+    "SNG": "Song Of Solomon", "ISA": "Isaiah", "JER": "Jeremiah", "LAM": "Lamentations",
+    "EZK": "Ezekiel", "DAN": "Daniel", "HOS": "Hosea", "JOL": "Joel", "AMO": "Amos",
+    "OBA": "Obadiah", "JON": "Jonah", "MIC": "Micah", "NAM": "Nahum", "HAB": "Habakkuk",
+    "ZEP": "Zephaniah", "HAG": "Haggai", "ZEC": "Zechariah", "MAL": "Malachi",
+    "MAT": "Matthew", "MRK": "Mark", "LUK": "Luke", "JHN": "John", "ACT": "Acts",
+    "ROM": "Romans", "1CO": "1 Corinthians", "2CO": "2 Corinthians", "GAL": "Galatians",
+    "EPH": "Ephesians", "PHP": "Philippians", "COL": "Colossians", "1TH": "1 Thessalonians",
+    "2TH": "2 Thessalonians", "1TI": "1 Timothy", "2TI": "2 Timothy", "TIT": "Titus",
+    "PHM": "Philemon", "HEB": "Hebrews", "JAS": "James", "1PE": "1 Peter", "2PE": "2 Peter",
+    "1JN": "1 John", "2JN": "2 John", "3JN": "3 John", "JUD": "Jude", "REV": "Revelation",
+}
+
+# jadenzaleski/bible-translations spells one book differently
+NIV_BOOKS = dict(ENGLISH_BOOKS, SNG="Song of Solomon")
+
+
+class Edition:
+    """One upstream edition: where its files live and how books are named"""
+
+    def __init__(self, name, base_url, books, layout="chapters"):
+        self.name = name
+        self.base_url = base_url
+        self.books = books
+        self.layout = layout  # "chapters": one file per chapter, "books": one file per book
+
+    def url(self, book_code, chapter=None):
+        book = urllib.parse.quote(self.books[book_code])
+        if self.layout == "books":
+            return f"{self.base_url}/{book}.json"
+        return f"{self.base_url}/{book}/chapters/{chapter}.json"
+
+    def urls(self, books=None):
+        """Every file URL of the edition (chapter counts from the unified tree)"""
+        urls = []
+        for book_code in books or self.books:
+            if self.layout == "books":
+                urls.append(self.url(book_code))
+                continue
+            book_dir = Path(UNIFIED_DIR) / book_code
+            chapters = sorted(int(f.stem) for f in book_dir.glob("*.json") if f.stem.isdigit())
+            urls.extend(self.url(book_code, chapter) for chapter in chapters)
+        return urls
+
+
+WLDEH = f"{RAW_HOST}/wldeh/bible-api/main/bibles"
+EDITIONS = {
+    "arb-kehm": Edition("arb-kehm", f"{WLDEH}/arb-kehm/books", ARABIC_BOOKS),
+    "en-niv": Edition("en-niv", f"{WLDEH}/en-niv/books", ENGLISH_BOOKS),
+    "niv-books": Edition("niv-books", f"{RAW_HOST}/jadenzaleski/bible-translations/master/NIV/NIV_books",
+                         NIV_BOOKS, layout="books"),
+}
+
+
+def _key(url):
+    """Index key: the URL with its path decoded, so quoted and unquoted spellings match"""
+    return urllib.parse.unquote(url)
+
+
+class SourceMirror:
+    """Content-addressed store of fetched source files, keyed by URL"""
+
+    def __init__(self, root=MIRROR_DIR, offline=OFFLINE, upstream=UPSTREAM):
+        self.root = Path(root)
+        self.offline = offline
+        self.upstream = upstream
+        self.stats = {"hits": 0, "downloads": 0}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._index = self._load_index()
+
+    @property
+    def index_path(self):
+        return self.root / "index.json"
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _object_path(self, digest):
+        return self.root / "objects" / digest[:2] / digest
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, url):
+        return _key(url) in self._index
+
+    def get(self, url):
+        """Mirrored bytes for a URL, or None"""
+        entry = self._index.get(_key(url))
+        if entry is None:
+            return None
+        try:
+            return self._object_path(entry["sha256"]).read_bytes()
+        except OSError:
+            return None
+
+    def put(self, url, data):
+        """Store bytes for a URL; returns their sha256"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._index[_key(url)] = {"sha256": digest, "size": len(data), "fetched": int(time.time())}
+            self._dirty = True
+        return digest
+
+    def save(self):
+        """Write the index, merging entries other processes added meanwhile"""
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._load_index()
+            merged.update(self._index)
+            self._index = merged
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, ensure_ascii=False, indent=0, sort_keys=True)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    def fetch(self, url, timeout=30):
+        """
+        Bytes for a URL: from the mirror, else downloaded (from UPSTREAM)
+        and stored. Raises LookupError offline, urllib errors on failure.
+        """
+        data = self.get(url)
+        if data is not None:
+            with self._lock:
+                self.stats["hits"] += 1
+            return data
+        if self.offline:
+            raise LookupError(f"Not mirrored (offline): {_key(url)}")
+
+        data = self._download(url, timeout)
+        self.put(url, data)
+        with self._lock:
+            self.stats["downloads"] += 1
+        return data
+
+    def _download(self, url, timeout):
+        source = self.upstream + url[len(RAW_HOST):] if url.startswith(RAW_HOST) else url
+        with urllib.request.urlopen(source, timeout=timeout) as response:
+            return response.read()
+
+    def fetch_json(self, url, timeout=30):
+        return json.loads(self.fetch(url, timeout).decode('utf-8'))
+
+    # ------------------------------------------------------------------
+    # Bulk
+    # ------------------------------------------------------------------
+
+    def download(self, urls, workers=16, timeout=60, refresh=False):
+        """Mirror many URLs concurrently; returns (downloaded, already mirrored, [failed urls])"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        pending = [u for u in urls if refresh or u not in self]
+        if self.offline:
+            return 0, len(urls) - len(pending), pending
+        failed = []
+
+        def one(url):
+            try:
+                self.put(url, self._download(url, timeout))
+                return None
+            except Exception as e:
+                return url, e
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(one, pending):
+                if result is not None:
+                    failed.append(result[0])
+        self.save()
+        return len(pending) - len(failed), len(urls) - len(pending), failed
+
+    def import_dir(self, directory, url_prefix):
+        """Store every file under a local checkout as url_prefix/<relative path>"""
+        directory = Path(directory)
+        count = 0
+        for path in sorted(directory.rglob("*.json")):
+            relative = path.relative_to(directory).as_posix()
+            self.put(f"{url_prefix.rstrip('/')}/{relative}", path.read_bytes())
+            count += 1
+        self.save()
+        return count
+
+    def status(self):
+        """(urls, distinct objects, bytes stored)"""
+        digests = {entry["sha256"]: entry["size"] for entry in self._index.values()}
+        return len(self._index), len(digests), sum(digests.values())
+
+
+_mirror = None
+_mirror_pid = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror():
+    """Return the process-wide mirror (a forked worker opens its own)"""
+    global _mirror, _mirror_pid
+    pid = os.getpid()
+    if _mirror is None or _mirror_pid != pid:
+        with _mirror_lock:
+            if _mirror is None or _mirror_pid != pid:
+                _mirror = SourceMirror()
+                _mirror_pid = pid
+                atexit.register(_mirror.save)
+    return _mirror
+
+
+def fetch_json(url, timeout=30):
+    """JSON for a source URL, from the shared mirror (see SourceMirror.fetch)"""
+    return get_mirror().fetch_json(url, timeout)
+
+
+# ----------------------------------------------------------------------
+# Local HTTP stand-in
+# ----------------------------------------------------------------------
+
+class MirrorServer:
+    """Serves mirrored files at their raw.githubusercontent.com paths"""
+
+    def __init__(self, mirror=None, host="127.0.0.1", port=0):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        mirror = mirror or get_mirror()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = mirror.get(RAW_HOST + self.path.split('?', 1)[0])
+                if data is None:
+                    self.send_error(404, "Not mirrored")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Offline mirror of the upstream source texts')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    download = sub.add_parser('download', help='Mirror a whole edition')
+    download.add_argument('--edition', choices=sorted(EDITIONS), required=True)
+    download.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    download.add_argument('--workers', type=int, default=16, help='Concurrent downloads (default: 16)')
+    download.add_argument('--refresh', action='store_true', help='Download already mirrored files again')
+
+    importer = sub.add_parser('import', help='Import a local checkout of a source repository')
+    importer.add_argument('--dir', required=True, help='Checkout directory')
+    importer.add_argument('--url', required=True, help='URL the directory corresponds to')
+
+    serve = sub.add_parser('serve', help='Serve the mirror in the raw.githubusercontent.com layout')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+
+    sub.add_parser('status', help='Show what is mirrored')
+    args = parser.parse_args()
+
+    mirror = get_mirror()
+
+    if args.command == 'download':
+        edition = EDITIONS[args.edition]
+        books = [b.strip().upper() for b in args.books.split(',')] if args.books else None
+        urls = edition.urls(books)
+        print(f"📥 Mirroring {args.edition}: {len(urls)} files ({args.workers} at a time)")
+        start = time.time()
+        downloaded, cached, failed = mirror.download(urls, args.workers, refresh=args.refresh)
+        print(f"✅ {downloaded} downloaded, {cached} already mirrored in {time.time() - start:.1f}s")
+        if failed:
+            print(f"⚠️  {len(failed)} failed:")
+            for url in failed[:10]:
+                print(f"  {_key(url)}")
+
+    elif args.command == 'import':
+        count = mirror.import_dir(args.dir, args.url)
+        print(f"✅ Imported {count} files from {args.dir} as {args.url}")
+
+    elif args.command == 'serve':
+        server = MirrorServer(mirror, args.host, args.port)
+        print(f"🌐 Serving {len(mirror)} mirrored files at {server.url}")
+        print(f"   SOURCE_HOST={server.url} SOURCE_OFFLINE=0 python3 scripts/...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    urls, objects, size = mirror.status()
+    print(f"💾 {mirror.root}: {urls} URLs, {objects} objects, {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
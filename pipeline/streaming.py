@@ -0,0 +1,119 @@
+"""
+Incremental parsers for streamed numbered / labelled responses
+
+The numbered prompts ask for "N. translation" lines (or "A1. translation"
+for packed verses, or just one translation per line in word order). With
+"stream": False the whole answer - including any rambling after the last
+line or a run of junk - has to finish generating before it can be parsed. A LineStream is fed the text as tokens arrive
+and tells the client when to stop reading:
+
+- "stopped": every expected line has arrived, the rest is not needed
+- "aborted": the output went off-format (too many unparseable, duplicate
+  or out-of-range lines, or one line running on without a newline)
+
+Either way the client closes the connection (Ollama stops generating when
+the client goes away). An aborted answer is asked for again
+(ollama_client.ABORT_RETRIES times); if it goes off-format every time, the
+client returns the text received so far, and callers parse it exactly as
+before - it just comes back incomplete.
+
+Usage:
+    text = ollama_client.generate(MODEL, prompt, options, timeout=120,
+                                  stream=numbered(len(words)))
+"""
+
+import re
+
+from pipeline.request_packing import LABEL_LINE, section_label
+
+NUMBERED_LINE = re.compile(r'^(\d+)[.\):\s]+(.+)$')
+PLAIN_LINE = re.compile(r'^(?:\d+\.\s*)?(.*)$')  # Numbering is optional (and dropped)
+
+MAX_JUNK_LINES = 3  # Preamble / stray lines tolerated before aborting
+MAX_LINE_CHARS = 200  # A gloss line is short; longer means the model is rambling
+
+STOPPED = "stopped"
+ABORTED = "aborted"
+
+
+class LineStream:
+    """
+    Track which expected keys have arrived as complete lines
+
+    pattern  - regex applied to each stripped line
+    keys     - the set of keys a complete answer contains
+    key      - match -> key (None if the line is not a valid answer line)
+    """
+
+    def __init__(self, pattern, keys, key, max_junk=MAX_JUNK_LINES):
+        self.pattern = pattern
+        self.keys = set(keys)
+        self.key = key
+        self.max_junk = max_junk
+        self.reset()
+
+    def reset(self):
+        """Start over (the client calls this before every attempt)"""
+        self.seen = set()
+        self.junk = 0
+        self._partial = ""
+
+    def feed(self, text):
+        """Consume streamed text; returns STOPPED, ABORTED or None to keep reading"""
+        self._partial += text
+        *lines, self._partial = self._partial.split('\n')
+        for line in lines:
+            state = self._line(line)
+            if state:
+                return state
+        if len(self._partial) > MAX_LINE_CHARS:
+            return ABORTED
+        return None
+
+    def finish(self):
+        """The stream ended: account for a last line without a newline"""
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+
+    def complete(self):
+        return self.keys <= self.seen
+
+    def _line(self, line):
+        line = line.strip()
+        if not line:
+            return None
+        match = self.pattern.match(line)
+        key = self.key(match) if match else None
+        if key is None or key not in self.keys or key in self.seen:
+            self.junk += 1
+            return ABORTED if self.junk > self.max_junk else None
+        self.seen.add(key)
+        return STOPPED if self.complete() else None
+
+
+def numbered(count):
+    """Stream parser for "1. gloss" ... "count. gloss" answers"""
+    return LineStream(NUMBERED_LINE, range(1, count + 1),
+                      key=lambda m: int(m.group(1)))
+
+
+def plain(count):
+    """
+    Stream parser for unlabelled answers: the first `count` lines that are
+    not just punctuation, in order (how the plain prompts are parsed)
+    """
+    stream = LineStream(PLAIN_LINE, range(1, count + 1),
+                        key=lambda m: len(stream.seen) + 1 if m.group(1).strip('"\'.,!?') else None)
+    return stream
+
+
+def labelled(word_counts):
+    """Stream parser for packed "A1. gloss" answers (see request_packing)"""
+    keys = {
+        (section_label(i), n)
+        for i, count in enumerate(word_counts)
+        for n in range(1, count + 1)
+    }
+    return LineStream(LABEL_LINE, keys,
+                      key=lambda m: (m.group(1), int(m.group(2))) if m.group(3).strip() else None)
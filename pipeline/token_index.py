@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Precomputed word offsets for every verse of the unified source text
+
+The scanners and repair scripts re-split the same Arabic verses over and
+over just to learn how many words a verse should have mappings for, and
+where those words are. The source text only changes when the corpus is
+re-imported, so this tokenizes bible-translations/unified once and keeps
+the result in cache/token_index.npz:
+
+    keys         "BOOK|chapter|verse" per verse
+    lengths      character count of each verse's Arabic text
+    hashes       64-bit blake2b of each verse's Arabic text
+    first        index of the verse's first word in starts/ends
+    words        word count per verse (all words)
+    long_words   word count per verse that get a mapping (>= MIN_WORD_LENGTH)
+    starts/ends  character offsets of every word, in verse order
+    folded       per word: its normalization.fold() key, as an index into vocab
+    vocab        the distinct folded keys
+    files        per chapter file: mtime_ns, size, sha1
+    source_hash  sha1 over all chapter files' sha1s
+
+On load every source file is stat'ed; a changed stat re-hashes that file,
+and if any content hash differs (or files were added or removed) the index
+is rebuilt. Lookups are then O(1) dict/array accesses.
+
+A lookup also takes the text the caller is holding: if it is not the
+indexed verse (a mapping file written from another revision of the source,
+even one of the same length), it falls back to tokenizing that text, so
+callers never get offsets for a different string.
+
+Usage:
+    python3 -m pipeline.token_index           # Build/refresh and show stats
+    python3 -m pipeline.token_index --rebuild
+
+    index = token_index.get_token_index()
+    expected = index.expected_count(book, chapter, verse, ar_text)
+    words = index.mapped_words(book, chapter, verse, ar_text)   # [(word, start, end)]
+    keys = index.folded_keys(book, chapter, verse, ar_text)     # fold(word) for each
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from pipeline import normalization, tokenizer
+
+INDEX_PATH = os.environ.get("TOKEN_INDEX", "cache/token_index.npz")
+SOURCE_DIR = "bible-translations/unified"
+
+# Bump when the tokenizer rules or the file layout change
+INDEX_VERSION = 3
+
+
+def _key(book, chapter, verse):
+    return f"{book}|{chapter}|{verse}"
+
+
+def _text_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _source_files(source_dir):
+    """{relative path: Path} for every chapter file, in book/chapter order"""
+    files = {}
+    root = Path(source_dir)
+    if not root.exists():
+        return files
+    for book_dir in sorted(root.iterdir()):
+        if not book_dir.is_dir():
+            continue
+        chapter_files = [f for f in book_dir.glob("*.json") if f.stem.isdigit()]
+        for chapter_file in sorted(chapter_files, key=lambda f: int(f.stem)):
+            files[f"{book_dir.name}/{chapter_file.name}"] = chapter_file
+    return files
+
+
+def _source_hash(file_entries):
+    digest = hashlib.sha1()
+    for name in sorted(file_entries):
+        digest.update(f"{name}:{file_entries[name]['sha1']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TokenIndex:
+    """Word offsets of the unified source text, rebuilt when the source changes"""
+
+    def __init__(self, source_dir=SOURCE_DIR, path=INDEX_PATH):
+        self.source_dir = source_dir
+        self.path = Path(path)
+        self.source_hash = None
+        self.rebuilt = False
+        self.rehashed = 0
+        self._files = {}
+        self._rows = {}
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    # Build / load
+    # ------------------------------------------------------------------
+
+    def refresh(self, rebuild=False):
+        """Load the saved index, rebuilding it if the source text changed"""
+        saved = None if rebuild else self._load()
+        current = self._file_entries(saved["files"] if saved else {})
+        source_hash = _source_hash(current)
+
+        if saved is not None and saved["source_hash"] == source_hash:
+            arrays = saved
+            if current != saved["files"]:
+                # Only stats changed (files touched, same content): keep the index
+                self._save(dict(saved, files=current))
+        else:
+            arrays = self._build(current, source_hash)
+            self._save(arrays)
+            self.rebuilt = True
+
+        self._set(arrays)
+        return self
+
+    def _file_entries(self, known):
+        """Current {path: {mtime_ns, size, sha1}}, re-hashing only files whose stat changed"""
+        entries = {}
+        for name, chapter_file in _source_files(self.source_dir).items():
+            stat = chapter_file.stat()
+            entry = known.get(name)
+            if not entry or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                         "sha1": hashlib.sha1(chapter_file.read_bytes()).hexdigest()}
+                self.rehashed += 1
+            entries[name] = entry
+        return entries
+
+    def _build(self, file_entries, source_hash):
+        import numpy as np
+
+        keys = []
+        texts = []
+        for name, chapter_file in _source_files(self.source_dir).items():
+            book, chapter = name[:-len(".json")].split('/')
+            with open(chapter_file, 'r', encoding='utf-8') as f:
+                verses = json.load(f)
+            for verse_num, verse in verses.items():
+                keys.append(_key(book, chapter, verse_num))
+                texts.append(verse.get("ar") or "")
+
+        tokens = tokenizer.tokenize(texts)
+        words = tokens.counts()
+        first = np.concatenate(([0], np.cumsum(words)[:-1])) if len(words) else words
+
+        # Fold each distinct spelling once and store keys as vocab indexes
+        vocab = {}
+        spellings = {}
+        folded = np.empty(len(tokens.starts), dtype=np.int32)
+        starts, ends = tokens.starts.tolist(), tokens.ends.tolist()
+        word = 0
+        for text, count in zip(texts, words.tolist()):
+            for s, e in zip(starts[word:word + count], ends[word:word + count]):
+                spelling = text[s:e]
+                key = spellings.get(spelling)
+                if key is None:
+                    key = spellings[spelling] = vocab.setdefault(normalization.fold(spelling), len(vocab))
+                folded[word] = key
+                word += 1
+        return {
+            "version": INDEX_VERSION,
+            "source_hash": source_hash,
+            "files": file_entries,
+            "keys": keys,
+            "lengths": np.fromiter((len(t) for t in texts), dtype=np.int32, count=len(texts)),
+            "hashes": np.fromiter((_text_hash(t) for t in texts), dtype=np.uint64, count=len(texts)),
+            "first": first.astype(np.int32),
+            "words": words.astype(np.int32),
+            "long_words": tokens.long_words().counts().astype(np.int32),
+            "starts": tokens.starts,
+            "ends": tokens.ends,
+            "folded": folded,
+            "vocab": list(vocab),
+        }
+
+    def _save(self, arrays):
+        import numpy as np
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {key: arrays[key] for key in ("version", "source_hash", "files", "keys", "vocab")}
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp.npz")
+        columns = ("lengths", "hashes", "first", "words", "long_words", "starts", "ends", "folded")
+        np.savez(tmp_path, meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                 **{key: arrays[key] for key in columns})
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        import numpy as np
+
+        if not self.path.exists():
+            return None
+        try:
+            with np.load(self.path) as saved:
+                arrays = {key: saved[key] for key in saved.files}
+            meta = json.loads(str(arrays.pop("meta")))
+        except (OSError, ValueError, KeyError):
+            return None
+        if meta.get("version") != INDEX_VERSION:
+            return None
+        arrays.update(meta)
+        return arrays
+
+    def _set(self, arrays):
+        self.source_hash = arrays["source_hash"]
+        self._files = arrays["files"]
+        self._rows = {key: i for i, key in enumerate(arrays["keys"])}
+        # Plain lists: per-item lookups on them are cheaper than on NumPy arrays
+        self._lengths = arrays["lengths"].tolist()
+        self._hashes = arrays["hashes"].tolist()
+        self._first = arrays["first"].tolist()
+        self._words = arrays["words"].tolist()
+        self._long_words = arrays["long_words"].tolist()
+        self._starts = arrays["starts"].tolist()
+        self._ends = arrays["ends"].tolist()
+        vocab = arrays["vocab"]
+        self._folded = [vocab[k] for k in arrays["folded"].tolist()]
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def word_count(self):
+        return len(self._starts)
+
+    def _row(self, book, chapter, verse, text):
+        row = self._rows.get(_key(book, chapter, verse))
+        if row is None or text is None:
+            return row
+        # Length first: it rejects most stale texts without hashing them
+        if len(text) != self._lengths[row] or _text_hash(text) != self._hashes[row]:
+            return None
+        return row
+
+    def expected_count(self, book, chapter, verse, text=None):
+        """Words that get a mapping (the count misalignment checks use); None if unknown"""
+        row = self._row(book, chapter, verse, text)
+        if row is None:
+            return tokenizer.count_arabic_words(text) if text is not None else None
+        return self._long_words[row]
+
+    def spans(self, book, chapter, verse, min_length=tokenizer.MIN_WORD_LENGTH):
+        """[(start, end)] of the verse's words of at least min_length characters"""
+        row = self._row(book, chapter, verse, None)
+        if row is None:
+            return None
+        lo = self._first[row]
+        hi = lo + self._words[row]
+        return [(s, e) for s, e in zip(self._starts[lo:hi], self._ends[lo:hi]) if e - s >= min_length]
+
+    def mapped_words(self, book, chapter, verse, text, min_length=tokenizer.MIN_WORD_LENGTH):
+        """tokenizer.mapped_words(text), from the index when text is the indexed verse"""
+        row = self._row(book, chapter, verse, text)
+        if row is None:
+            return tokenizer.mapped_words(text, min_length)
+        return [(text[s:e], s, e) for s, e in self.spans(book, chapter, verse, min_length)]
+
+    def folded_keys(self, book, chapter, verse, text, min_length=tokenizer.MIN_WORD_LENGTH):
+        """normalization.fold() of each word mapped_words() returns, precomputed when indexed"""
+        row = self._row(book, chapter, verse, text)
+        if row is None:
+            return normalization.fold_all(w for w, _, _ in tokenizer.mapped_words(text, min_length))
+        lo = self._first[row]
+        hi = lo + self._words[row]
+        return [key for s, e, key in zip(self._starts[lo:hi], self._ends[lo:hi], self._folded[lo:hi])
+                if e - s >= min_length]
+
+
+# ----------------------------------------------------------------------
+# Shared per-process index
+# ----------------------------------------------------------------------
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def get_token_index():
+    """Return the process-wide index (a forked worker loads its own)"""
+    global _index, _index_pid
+    pid = os.getpid()
+    if _index is None or _index_pid != pid:
+        with _index_lock:
+            if _index is None or _index_pid != pid:
+                _index = TokenIndex()
+                _index_pid = pid
+    return _index
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Build the word offset index of the unified source text')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild even if the source is unchanged')
+    args = parser.parse_args()
+
+    start = time.time()
+    index = TokenIndex()
+    if args.rebuild:
+        index.refresh(rebuild=True)
+    elapsed = time.time() - start
+
+    status = "rebuilt" if index.rebuilt else "up to date"
+    print(f"📇 {index.path}: {status} in {elapsed:.2f}s ({index.rehashed} files hashed)")
+    print(f"  Source:  {index.source_dir} ({len(index._files)} chapters, sha1 {index.source_hash[:12]})")
+    print(f"  Verses:  {len(index)}")
+    print(f"  Words:   {index.word_count} ({sum(index._long_words)} get a mapping)")
+    print(f"  Folded:  {len(set(index._folded))} distinct keys")
+
+
+if __name__ == "__main__":
+    main()
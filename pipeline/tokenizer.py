@@ -0,0 +1,149 @@
+"""
+Shared Arabic word tokenizer: per verse, or a whole chapter/book at once
+
+Every script used to carry its own extract_words_from_arabic (a
+re.split(r'(\s+)') loop building tuples) and its own count_arabic_words,
+and process_old_testament_mappings inlined the same loop twice. They all
+split on Unicode whitespace, keep character offsets into the verse
+string, and treat words shorter than MIN_WORD_LENGTH as particles that
+get no mapping. This module is now the one definition:
+
+- extract_words_from_arabic / mapped_words / count_arabic_words: per-verse
+  helpers with the old return shapes, on one compiled regex
+- tokenize(texts): every word of many verses in one pass, as NumPy arrays
+  (text index, start, end, length) - predicates such as the length filter
+  are array operations, so corpus-wide counts need no per-word Python
+
+Offsets are str (code point) indexes, exactly as before, so existing
+mapping start/end values line up.
+
+Usage:
+    words = extract_words_from_arabic(verse["ar"])            # [(word, start, end)]
+    tokens = tokenize([v["ar"] for v in verses.values()])
+    counts = tokens.long_words().counts()                     # Mappable words per verse
+"""
+
+import re
+
+MIN_WORD_LENGTH = 3  # Shorter tokens are particles and get no mapping
+
+WORD = re.compile(r'\S+')
+
+# Code points re's \s matches (identical to str.isspace()); all are below U+3001
+WHITESPACE_LIMIT = 0x3001
+WHITESPACE = [c for c in range(WHITESPACE_LIMIT) if chr(c).isspace()]
+
+
+def extract_words_from_arabic(arabic_text):
+    """
+    Extract individual words from Arabic text, preserving positions
+    Returns list of (word, start_pos, end_pos) tuples
+    """
+    return [(m.group(), m.start(), m.end()) for m in WORD.finditer(arabic_text)]
+
+
+def mapped_words(arabic_text, min_length=MIN_WORD_LENGTH):
+    """(word, start, end) for every word that gets a mapping (skip very short particles)"""
+    return [(m.group(), m.start(), m.end()) for m in WORD.finditer(arabic_text)
+            if m.end() - m.start() >= min_length]
+
+
+def count_arabic_words(text, min_length=MIN_WORD_LENGTH):
+    """Number of words that get a mapping (the count misalignment checks use)"""
+    return sum(1 for m in WORD.finditer(text) if m.end() - m.start() >= min_length)
+
+
+# ----------------------------------------------------------------------
+# Batch tokenization
+# ----------------------------------------------------------------------
+
+_whitespace_table = None
+
+
+def _table():
+    global _whitespace_table
+    if _whitespace_table is None:
+        import numpy as np
+        table = np.zeros(WHITESPACE_LIMIT + 1, dtype=bool)
+        table[WHITESPACE] = True
+        _whitespace_table = table
+    return _whitespace_table
+
+
+def space_mask(codes):
+    """Boolean array: which code points (a uint32 array) are whitespace"""
+    import numpy as np
+    # Code points past the table all map to its last (non-space) entry
+    return _table()[np.minimum(codes, WHITESPACE_LIMIT)]
+
+
+class TokenArrays:
+    """
+    Words of many texts, one array entry per word (in text order):
+        text_ids  - index of the text the word belongs to
+        starts    - start offset within that text
+        ends      - end offset within that text
+    """
+
+    def __init__(self, texts, text_ids, starts, ends):
+        self.texts = texts
+        self.text_ids = text_ids
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def lengths(self):
+        return self.ends - self.starts
+
+    def select(self, mask):
+        """Keep the words where mask (a boolean array) is True"""
+        return TokenArrays(self.texts, self.text_ids[mask], self.starts[mask], self.ends[mask])
+
+    def long_words(self, min_length=MIN_WORD_LENGTH):
+        """Only the words that get a mapping"""
+        return self.select(self.lengths >= min_length)
+
+    def counts(self):
+        """Number of words per text"""
+        import numpy as np
+        return np.bincount(self.text_ids, minlength=len(self.texts))
+
+    def words(self, index):
+        """(word, start, end) tuples for one text, like extract_words_from_arabic"""
+        import numpy as np
+        lo, hi = np.searchsorted(self.text_ids, [index, index + 1])
+        text = self.texts[index]
+        return [(text[s:e], s, e) for s, e in zip(self.starts[lo:hi].tolist(), self.ends[lo:hi].tolist())]
+
+
+def tokenize(texts):
+    """
+    Tokenize many texts (the verses of a chapter, a book, ...) in one pass
+    Returns TokenArrays; offsets match extract_words_from_arabic exactly
+    """
+    import numpy as np
+
+    texts = list(texts)
+    if not texts:
+        empty = np.zeros(0, dtype=np.int32)
+        return TokenArrays(texts, empty, empty, empty)
+
+    # One buffer of code points; the joining newline keeps words from
+    # running across texts
+    joined = "\n".join(texts)
+    codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32)
+    is_space = space_mask(codes)
+
+    edges = np.diff(np.concatenate(([True], is_space, [True])).view(np.int8))
+    starts = np.flatnonzero(edges == -1).astype(np.int32)
+    ends = np.flatnonzero(edges == 1).astype(np.int32)
+
+    lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=len(texts))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int32)
+    text_ids = (np.searchsorted(offsets, starts, side='right') - 1).astype(np.int32)
+
+    base = offsets[text_ids]
+    return TokenArrays(texts, text_ids, starts - base, ends - base)
@@ -0,0 +1,252 @@
+"""
+Persistent on-disk cache for model word translations
+
+Every regenerate/repair/fill pass used to send the same words in the same
+verses back to Gemma. Translations are now stored in a SQLite file keyed by
+
+    (Arabic word, verse context hash, model, prompt version)
+
+so a re-run after a crash (or another repair pass over the same verses)
+only pays for cache misses. Bump a script's *_PROMPT_VERSION constant when
+its prompt changes and old entries stop matching automatically.
+
+The cache is bounded: once it holds more than max_entries rows the least
+recently used ~10% are evicted.
+
+Usage:
+    from pipeline.translation_cache import cached_batch
+
+    @cached_batch(MODEL, BATCH_PROMPT_VERSION)
+    def translate_verse_batch(arabic_words, full_verse_ar, full_verse_en):
+        ...
+"""
+
+import atexit
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CACHE_PATH = os.environ.get("TRANSLATION_CACHE", "cache/translations.sqlite3")
+MAX_ENTRIES = 1_000_000  # ~31k verses x ~12 words, with room for several prompts
+EVICT_FRACTION = 0.1  # Share of entries dropped when the cache is full
+
+
+def context_hash(*parts):
+    """Short stable hash of the verse context a word was translated in"""
+    digest = hashlib.sha1("\x1f".join(parts).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class TranslationCache:
+    """
+    SQLite-backed translation cache with hit/miss counters and LRU eviction
+    Safe to share between threads; each process opens its own connection
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                word TEXT NOT NULL,
+                context TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                UNIQUE (word, context, model, prompt_version)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def __len__(self):
+        return self._size
+
+    def get_many(self, words, context, model, prompt_version):
+        """Return {word: translation} for the words that are cached"""
+        words = list(dict.fromkeys(words))
+        if not words:
+            return {}
+
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's host-parameter limit
+            for i in range(0, len(words), 500):
+                chunk = words[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT word, translation FROM translations "
+                    f"WHERE context = ? AND model = ? AND prompt_version = ? "
+                    f"AND word IN ({placeholders})",
+                    [context, model, prompt_version, *chunk]
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE translations SET last_used = ? "
+                        "WHERE word = ? AND context = ? AND model = ? AND prompt_version = ?",
+                        [(now, w, context, model, prompt_version) for w in found]
+                    )
+
+            self.hits += len(found)
+            self.misses += len(words) - len(found)
+
+        return found
+
+    def get(self, word, context, model, prompt_version):
+        """Return the cached translation for one word, or None"""
+        return self.get_many([word], context, model, prompt_version).get(word)
+
+    def put_many(self, translations, context, model, prompt_version):
+        """Store {word: translation}; None/empty translations are skipped"""
+        now = time.time()
+        rows = [(w, context, model, prompt_version, t, now)
+                for w, t in translations.items() if t]
+        if not rows:
+            return
+
+        with self._lock:
+            with self._conn:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT INTO translations "
+                    "(word, context, model, prompt_version, translation, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (word, context, model, prompt_version) "
+                    "DO UPDATE SET translation = excluded.translation, "
+                    "last_used = excluded.last_used",
+                    rows
+                )
+                # Upserts of existing keys also count as changes, so this
+                # over-estimates; _evict() re-counts before deleting anything
+                self._size += self._conn.total_changes - before
+
+            if self._size > self.max_entries:
+                self._evict()
+
+    def put(self, word, translation, context, model, prompt_version):
+        """Store a single word translation"""
+        self.put_many({word: translation}, context, model, prompt_version)
+
+    def _evict(self):
+        """Drop the least recently used entries (caller holds the lock)"""
+        self._size = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if self._size <= self.max_entries:
+            return
+
+        excess = self._size - self.max_entries
+        to_drop = excess + int(self.max_entries * EVICT_FRACTION)
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM translations WHERE rowid IN "
+                "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                (to_drop,)
+            )
+        self.evictions += to_drop
+        self._size -= to_drop
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        """One-line stats for end-of-run reports"""
+        return (f"{self.hits} hits, {self.misses} misses "
+                f"({self.hit_rate() * 100:.1f}% hit rate), "
+                f"{self.evictions} evicted, {self._size} entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ----------------------------------------------------------------------
+# Shared per-process cache
+# ----------------------------------------------------------------------
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache (a forked worker opens its own)"""
+    global _cache, _cache_pid
+    pid = os.getpid()
+    if _cache is None or _cache_pid != pid:
+        with _cache_lock:
+            if _cache is None or _cache_pid != pid:
+                _cache = TranslationCache()
+                _cache_pid = pid
+                atexit.register(_cache.close)
+    return _cache
+
+
+def cached_batch(model, prompt_version, returns_count=False):
+    """
+    Decorator for batch translators with the signature
+        fn(arabic_words, full_verse_ar, full_verse_en, *extra)
+    returning {word: translation}, or ({word: translation}, success_count)
+    when returns_count=True.
+
+    Cached words are filled in directly; only the misses are passed to fn.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(arabic_words, full_verse_ar, full_verse_en, *extra):
+            cache = get_cache()
+            context = context_hash(full_verse_ar, full_verse_en)
+            result_map = cache.get_many(arabic_words, context, model, prompt_version)
+            misses = [w for w in dict.fromkeys(arabic_words) if w not in result_map]
+
+            if misses:
+                fresh = fn(misses, full_verse_ar, full_verse_en, *extra)
+                if returns_count:
+                    fresh = fresh[0]
+                cache.put_many(fresh, context, model, prompt_version)
+                result_map.update(fresh)
+
+            result_map = {w: result_map.get(w) for w in arabic_words}
+            if returns_count:
+                return result_map, sum(1 for v in result_map.values() if v is not None)
+            return result_map
+        return wrapper
+    return decorator
+
+
+def cached_word(model, prompt_version):
+    """
+    Decorator for single-word translators with the signature
+        fn(arabic_word, full_verse_ar, full_verse_en) -> translation or None
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(arabic_word, full_verse_ar, full_verse_en):
+            cache = get_cache()
+            context = context_hash(full_verse_ar, full_verse_en)
+            translation = cache.get(arabic_word, context, model, prompt_version)
+            if translation is None:
+                translation = fn(arabic_word, full_verse_ar, full_verse_en)
+                cache.put(arabic_word, translation, context, model, prompt_version)
+            return translation
+        return wrapper
+    return decorator
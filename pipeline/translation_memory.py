@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Cross-verse translation memory built from the existing mapping files
+
+The corpus repeats a small vocabulary heavily (اللهِ, الرَّبِّ, فِي, مِنْ, ...).
+This index records, for every exact vocalized Arabic form, the English
+glosses it has been given across all mapping files and how often. Forms
+that are frequent AND almost always glossed the same way are treated as
+context-independent and resolved without asking the model; everything
+else is still sent to the LLM.
+
+Glosses are grouped case-insensitively after stripping model noise such as
+a leading "TRANSLATION." and trailing punctuation; the most common surface
+spelling of the winning group is what gets reused.
+
+Usage:
+    python3 -m pipeline.translation_memory            # Build (or rebuild) the index
+    python3 -m pipeline.translation_memory --show 20  # Top forms and coverage
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+
+MAPPING_DIRS = [
+    "bible-maps-word-gemma3/mappings",
+    "bible-translations/mappings",
+]
+INDEX_PATH = os.environ.get("TRANSLATION_MEMORY", "cache/translation_memory.json")
+
+MIN_OCCURRENCES = 5  # Form must be seen at least this often...
+MIN_SHARE = 0.7  # ...with its top gloss covering this share of sightings
+MAX_GLOSSES = 5  # Glosses kept per form in the saved index
+
+GLOSS_PREFIX = re.compile(r'^(translation[.:]?\s*)+', re.IGNORECASE)
+
+
+def clean_gloss(gloss):
+    """Strip model noise from a gloss; returns '' for unusable glosses"""
+    gloss = GLOSS_PREFIX.sub('', gloss.strip()).strip(' "\'.,!?;:')
+    if not gloss or '�' in gloss:
+        return ''
+    if gloss.startswith('[') or 'translate' in gloss.lower():
+        return ''  # Placeholders such as [NEEDS_TRANSLATION]
+    return gloss
+
+
+def build_index(mapping_dirs=MAPPING_DIRS):
+    """
+    Walk every mapping file and count glosses per exact Arabic form
+    Returns {form: [[gloss, count], ...]} sorted by count, most common first
+    """
+    # form -> normalized gloss -> Counter of surface spellings
+    counts = defaultdict(lambda: defaultdict(Counter))
+
+    for mapping_dir in mapping_dirs:
+        for chapter_file in sorted(Path(mapping_dir).glob("*/*.json")):
+            try:
+                with open(chapter_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, ValueError, OSError):
+                continue
+
+            for verse_data in data.get("verses", {}).values():
+                for m in verse_data.get("mappings", []):
+                    gloss = clean_gloss(m.get("en", ""))
+                    if gloss and m.get("ar"):
+                        counts[m["ar"]][gloss.lower()][gloss] += 1
+
+    forms = {}
+    for form, groups in counts.items():
+        glosses = []
+        for spellings in groups.values():
+            display, _ = spellings.most_common(1)[0]
+            glosses.append([display, sum(spellings.values())])
+        glosses.sort(key=lambda g: -g[1])
+        # Keep the total so the share stays correct after truncation
+        total = sum(c for _, c in glosses)
+        forms[form] = {"total": total, "glosses": glosses[:MAX_GLOSSES]}
+
+    return forms
+
+
+def save_index(forms, path=INDEX_PATH, mapping_dirs=MAPPING_DIRS):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"sources": list(mapping_dirs), "forms": forms}, f, ensure_ascii=False)
+
+
+class TranslationMemory:
+    """
+    Frequency-ranked gloss lookup for exact Arabic forms
+
+    resolve() splits a word list into confidently known glosses and the
+    ambiguous/unseen words that still need the model.
+    """
+
+    def __init__(self, forms, min_occurrences=MIN_OCCURRENCES, min_share=MIN_SHARE):
+        self.forms = forms
+        self.min_occurrences = min_occurrences
+        self.min_share = min_share
+        self.resolved = 0
+        self.deferred = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, **kwargs):
+        """Load the saved index, building it first if it does not exist"""
+        if not os.path.exists(path):
+            save_index(build_index(), path)
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)["forms"], **kwargs)
+
+    def lookup(self, word):
+        """Return the dominant gloss for a form, or None if not confident"""
+        entry = self.forms.get(word)
+        if not entry or entry["total"] < self.min_occurrences:
+            return None
+        gloss, count = entry["glosses"][0]
+        if count / entry["total"] < self.min_share:
+            return None
+        return gloss
+
+    def resolve(self, words):
+        """
+        Returns (known, ambiguous):
+            known     - {word: gloss} for context-independent forms
+            ambiguous - words (in order) that still need the model
+        """
+        known = {}
+        ambiguous = []
+        for word in words:
+            gloss = self.lookup(word)
+            if gloss:
+                known[word] = gloss
+            else:
+                ambiguous.append(word)
+
+        with self._lock:
+            self.resolved += len(words) - len(ambiguous)
+            self.deferred += len(ambiguous)
+        return known, ambiguous
+
+    def summary(self):
+        """One-line stats for end-of-run reports"""
+        total = self.resolved + self.deferred
+        share = self.resolved / total * 100 if total else 0
+        return f"{self.resolved}/{total} words from memory ({share:.1f}%), {self.deferred} sent to model"
+
+
+_memory = None
+_memory_pid = None
+_memory_lock = threading.Lock()
+
+
+def get_memory():
+    """Return the process-wide translation memory (a forked worker loads its own)"""
+    global _memory, _memory_pid
+    pid = os.getpid()
+    if _memory is None or _memory_pid != pid:
+        with _memory_lock:
+            if _memory is None or _memory_pid != pid:
+                _memory = TranslationMemory.load()
+                _memory_pid = pid
+    return _memory
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Build the cross-verse translation memory')
+    parser.add_argument('--show', type=int, default=0,
+                        help='Print the N most frequent forms after building')
+    parser.add_argument('--no-rebuild', action='store_true',
+                        help='Load the existing index instead of rebuilding it')
+    args = parser.parse_args()
+
+    if args.no_rebuild and os.path.exists(INDEX_PATH):
+        with open(INDEX_PATH, 'r', encoding='utf-8') as f:
+            forms = json.load(f)["forms"]
+    else:
+        print(f"🔍 Indexing mappings in: {', '.join(MAPPING_DIRS)}")
+        forms = build_index()
+        save_index(forms)
+        print(f"💾 Saved {len(forms)} forms to {INDEX_PATH}")
+
+    memory = TranslationMemory(forms)
+    total = sum(e["total"] for e in forms.values())
+    covered = sum(e["total"] for form, e in forms.items() if memory.lookup(form))
+    confident = sum(1 for form in forms if memory.lookup(form))
+
+    print(f"\nConfident forms: {confident}/{len(forms)} "
+          f"(>= {MIN_OCCURRENCES} sightings, top gloss >= {MIN_SHARE:.0%})")
+    print(f"Word occurrences covered: {covered}/{total} ({covered / total * 100 if total else 0:.1f}%)")
+
+    if args.show:
+        print()
+        ranked = sorted(forms.items(), key=lambda item: -item[1]["total"])
+        for form, entry in ranked[:args.show]:
+            gloss, count = entry["glosses"][0]
+            mark = "✓" if memory.lookup(form) else "?"
+            print(f"  {mark} {form:15} {entry['total']:6d}  → {gloss} ({count / entry['total']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Array-based mapping validation with a machine-readable issue table
+
+scripts/validate_mappings.py checks every mapping in nested Python loops
+(one dict per issue, one chapter at a time) and only prints a summary, so
+each repair script scans the tree again to find its work. Here a book's
+mappings are loaded once into flat NumPy arrays:
+
+    codes        every verse's Arabic text as code points, back to back
+    verse/start/end/word_len   one entry per mapping
+
+and every check is an array expression over the whole book:
+
+    position_mismatch  ar[start:end] != mapping["ar"] (gathered code point compare)
+    overlap            start < end of the previous mapping (in start order)
+    unmapped_gap       text between two mappings that is not space/punctuation
+                       (prefix sums of a "content character" mask)
+    unmapped_end       same, after the last mapping of the verse
+    out_of_order       start < start of the mapping before it (file order)
+    empty_translation  en is blank
+    suspicious_length  ar shorter than 3 characters mapped to over 4 English words
+
+Books are validated by a pool of worker processes, and the result is one
+compact issue table (cache/validation_issues.json, or .parquet when
+pyarrow is installed), one row per issue:
+
+    book, chapter, verse, type, index, start, end, ar, detail
+
+index is the mapping's index within its verse (for unmapped_gap, the
+mapping the gap precedes). The table records the corpus store signature
+of the tree, so consumers can tell whether it is still current.
+
+Usage:
+    python3 -m pipeline.validation                          # All books
+    python3 -m pipeline.validation --books MAT,ROM --output /tmp/issues.parquet
+
+    table = validation.load_issue_table()
+    chapters = validation.issue_chapters(table, ["position_mismatch"])
+"""
+
+import json
+import os
+from pathlib import Path
+
+from pipeline import tokenizer
+from pipeline.corpus_store import get_store, synced_store
+
+ISSUES_PATH = os.environ.get("VALIDATION_ISSUES", "cache/validation_issues.json")
+DEFAULT_TREE = "bible-translations/mappings"
+
+# Bump when a check or the row layout changes
+TABLE_VERSION = 1
+
+COLUMNS = ["book", "chapter", "verse", "type", "index", "start", "end", "ar", "detail"]
+ISSUE_TYPES = ["position_mismatch", "overlap", "unmapped_gap", "unmapped_end",
+               "out_of_order", "empty_translation", "suspicious_length"]
+
+# Gap characters that do not need a mapping (besides whitespace)
+PUNCTUATION = ' ،.؟!:«»؛'
+
+
+def _codes(text):
+    import numpy as np
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+def _offsets(lengths):
+    """Start offset of each item given item lengths"""
+    import numpy as np
+    offsets = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    return offsets
+
+
+class BookArrays:
+    """One book's verses and mappings as flat arrays (see module docstring)"""
+
+    def __init__(self, book, verse_rows, mapping_rows):
+        """
+        verse_rows:   (chapter, verse, ar) in verse order
+        mapping_rows: (chapter, verse, idx, ar, en, start, end), each verse's in mapping order
+        """
+        import numpy as np
+
+        self.book = book
+        self.keys = [(chapter, verse) for chapter, verse, _ in verse_rows]
+        texts = [ar or "" for _, _, ar in verse_rows]
+        rows = {key: v for v, key in enumerate(self.keys)}
+
+        count = len(mapping_rows)
+        columns = list(zip(*mapping_rows)) if count else [()] * 7
+        chapters, verses, index, words, english, starts, ends = columns
+        verse_of = [rows[key] for key in zip(chapters, verses)]
+        spanned = [isinstance(s, int) and isinstance(e, int) for s, e in zip(starts, ends)]
+        self.index = list(index)
+        self.words = [w or "" for w in words]
+        self.english = [str(e or "") for e in english]
+
+        self.texts = texts
+        self.text_len = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        self.text_base = _offsets(self.text_len)
+        self.codes = _codes("".join(texts))
+
+        self.verse = np.array(verse_of, dtype=np.int64)
+        self.spanned = np.array(spanned, dtype=bool)
+        self.start = np.array([s if ok else 0 for s, ok in zip(starts, spanned)], dtype=np.int64)
+        self.end = np.array([e if ok else 0 for e, ok in zip(ends, spanned)], dtype=np.int64)
+        self.word_len = np.fromiter((len(w) for w in self.words), dtype=np.int64, count=count)
+        self.word_base = _offsets(self.word_len)
+        self.word_codes = _codes("".join(self.words))
+        self.english_blank = np.fromiter((not e.strip() for e in self.english), dtype=bool, count=count)
+        self.english_words = np.fromiter((len(e.split()) for e in self.english), dtype=np.int64, count=count)
+
+        # Prefix sums of characters a mapping should cover: content(v, a, b)
+        # is the number of such characters in verse v's text[a:b]
+        content = ~(tokenizer.space_mask(self.codes) | np.isin(self.codes, _codes(PUNCTUATION)))
+        self.content_sums = np.concatenate(([0], np.cumsum(content)))
+
+    def content(self, verses, lo, hi):
+        import numpy as np
+        n = self.text_len[verses]
+        base = self.text_base[verses]
+        lo = np.clip(lo, 0, n)
+        hi = np.clip(hi, lo, n)
+        return self.content_sums[base + hi] - self.content_sums[base + lo]
+
+
+def _slice_bounds(start, end, n):
+    """Python slice semantics for text[start:end] on arrays (negative and out-of-range values)"""
+    import numpy as np
+    lo = np.where(start < 0, np.maximum(start + n, 0), np.minimum(start, n))
+    hi = np.where(end < 0, np.maximum(end + n, 0), np.minimum(end, n))
+    return lo, np.maximum(hi, lo)
+
+
+def position_mismatches(arrays):
+    """Mapping indexes where text[start:end] != mapping ar (or start/end is missing)"""
+    import numpy as np
+
+    a = arrays
+    lo, hi = _slice_bounds(a.start, a.end, a.text_len[a.verse])
+    bad = ~a.spanned | (hi - lo != a.word_len)
+
+    # Same length: compare the code points of every candidate in one gather
+    candidates = np.flatnonzero(~bad & (a.word_len > 0))
+    lengths = a.word_len[candidates]
+    if lengths.sum():
+        owner = np.repeat(np.arange(len(candidates)), lengths)
+        within = np.arange(lengths.sum()) - np.repeat(_offsets(lengths), lengths)
+        text_pos = a.text_base[a.verse[candidates]][owner] + lo[candidates][owner] + within
+        word_pos = a.word_base[candidates][owner] + within
+        differs = a.codes[text_pos] != a.word_codes[word_pos]
+        bad[candidates[np.bincount(owner, weights=differs, minlength=len(candidates)) > 0]] = True
+
+    return np.flatnonzero(bad), lo, hi
+
+
+def validate_arrays(arrays):
+    """All issue rows of one book (see COLUMNS)"""
+    import numpy as np
+
+    a = arrays
+    rows = []
+
+    def row(m, issue_type, start, end, ar, detail=None):
+        chapter, verse = a.keys[a.verse[m]]
+        rows.append([a.book, chapter, verse, issue_type, a.index[m], start, end, ar, detail])
+
+    # Position accuracy
+    bad, lo, hi = position_mismatches(a)
+    for m in bad.tolist():
+        if a.spanned[m]:
+            actual = a.texts[a.verse[m]][lo[m]:hi[m]]
+            row(m, "position_mismatch", int(a.start[m]), int(a.end[m]), a.words[m], actual)
+        else:
+            row(m, "position_mismatch", None, None, a.words[m])
+
+    # Coverage: mappings with a span, by verse then start (stable, like sorted())
+    spanned = np.flatnonzero(a.spanned)
+    by_start = spanned[np.lexsort((a.start[spanned], a.verse[spanned]))]
+    verse, start, end = a.verse[by_start], a.start[by_start], a.end[by_start]
+    first = np.ones(len(by_start), dtype=bool)
+    first[1:] = verse[1:] != verse[:-1]
+    prev_end = np.where(first, 0, np.roll(end, 1))
+
+    for k in np.flatnonzero(start < prev_end).tolist():
+        m = by_start[k]
+        row(m, "overlap", int(start[k]), int(end[k]), a.words[m], int(prev_end[k]))
+
+    gaps = np.flatnonzero((start > prev_end) & (a.content(verse, prev_end, start) > 0))
+    for k in gaps.tolist():
+        m = by_start[k]
+        gap_start, gap_end = int(prev_end[k]), int(start[k])
+        row(m, "unmapped_gap", gap_start, gap_end, a.texts[verse[k]][gap_start:gap_end])
+
+    last_end = np.zeros(len(a.keys), dtype=np.int64)
+    last = np.ones(len(by_start), dtype=bool)
+    last[:-1] = verse[1:] != verse[:-1]
+    last_end[verse[last]] = end[last]
+    all_verses = np.arange(len(a.keys))
+    unmapped = np.flatnonzero((last_end < a.text_len)
+                              & (a.content(all_verses, last_end, a.text_len) > 0))
+    for v in unmapped.tolist():
+        chapter, verse_num = a.keys[v]
+        rows.append([a.book, chapter, verse_num, "unmapped_end", None, int(last_end[v]),
+                     int(a.text_len[v]), a.texts[v][last_end[v]:], None])
+
+    # Order: each mapping against the previous spanned mapping of its verse, in file order
+    same_verse = a.verse[spanned[1:]] == a.verse[spanned[:-1]]
+    backwards = same_verse & (a.start[spanned[1:]] < a.start[spanned[:-1]])
+    for k in np.flatnonzero(backwards).tolist():
+        m, prev = spanned[k + 1], spanned[k]
+        row(m, "out_of_order", int(a.start[m]), int(a.end[m]), a.words[m], int(a.start[prev]))
+
+    # Translation heuristics
+    for m in np.flatnonzero(a.english_blank).tolist():
+        row(m, "empty_translation", _span(a, m, 0), _span(a, m, 1), a.words[m])
+    suspicious = (a.word_len < 3) & (a.english_words > 4)
+    for m in np.flatnonzero(suspicious).tolist():
+        row(m, "suspicious_length", _span(a, m, 0), _span(a, m, 1), a.words[m], a.english[m])
+
+    rows.sort(key=lambda r: (r[1], _verse_order(r[2]), ISSUE_TYPES.index(r[3]), r[4] if r[4] is not None else -1))
+    return rows
+
+
+def _span(arrays, m, which):
+    if not arrays.spanned[m]:
+        return None
+    return int(arrays.start[m] if which == 0 else arrays.end[m])
+
+
+def _verse_order(verse):
+    return (0, int(verse), "") if str(verse).isdigit() else (1, 0, str(verse))
+
+
+def validate_book(args):
+    """Pool worker: (tree, book) -> (book, verse count, mapping count, rows)"""
+    tree, book = args
+    store = get_store()
+    arrays = BookArrays(book, [row[1:] for row in store.verse_texts(tree, [book])],
+                        [row[1:] for row in store.mapping_rows(tree, [book])])
+    return book, len(arrays.keys), len(arrays.words), validate_arrays(arrays)
+
+
+def validate_tree(tree=DEFAULT_TREE, books=None, workers=1):
+    """Validate books of a tree (in parallel with workers > 1); returns the issue table dict"""
+    store = synced_store(tree, books)
+    book_list = sorted({book for book, _ in store.chapters(tree, books)})
+    tasks = [(tree, book) for book in book_list]
+
+    if workers > 1 and len(tasks) > 1:
+        from multiprocessing import Pool
+        with Pool(processes=min(workers, len(tasks))) as pool:
+            results = pool.map(validate_book, tasks)
+    else:
+        results = [validate_book(task) for task in tasks]
+
+    rows = []
+    verses = mappings = 0
+    for _, verse_count, mapping_count, book_rows in results:
+        verses += verse_count
+        mappings += mapping_count
+        rows.extend(book_rows)
+
+    return {
+        "version": TABLE_VERSION,
+        "tree": str(tree),
+        "signature": store.signature(tree),
+        "books": book_list,
+        "verses": verses,
+        "mappings": mappings,
+        "counts": {t: sum(1 for r in rows if r[3] == t) for t in ISSUE_TYPES},
+        "columns": COLUMNS,
+        "rows": rows,
+    }
+
+
+# ----------------------------------------------------------------------
+# Issue table files
+# ----------------------------------------------------------------------
+
+def _meta(table):
+    return {key: value for key, value in table.items() if key != "rows"}
+
+
+def write_issue_table(table, path=ISSUES_PATH):
+    """Write the table as compact JSON, or Parquet for a .parquet path (needs pyarrow)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp{path.suffix}")
+
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Writing a .parquet issue table needs pyarrow (pip install pyarrow)") from e
+        columns = {name: [r[i] for r in table["rows"]] for i, name in enumerate(COLUMNS)}
+        columns["detail"] = [None if d is None else str(d) for d in columns["detail"]]
+        arrow_table = pa.table(columns).replace_schema_metadata(
+            {"validation": json.dumps(_meta(table), ensure_ascii=False)})
+        pq.write_table(arrow_table, tmp_path)
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(_meta(table), ensure_ascii=False, separators=(',', ':'))[:-1])
+            f.write(',"rows":[\n')
+            f.write(",\n".join(json.dumps(r, ensure_ascii=False, separators=(',', ':'))
+                               for r in table["rows"]))
+            f.write("\n]}\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_issue_table(path=ISSUES_PATH):
+    """Read a table written by write_issue_table() (rows as lists in COLUMNS order)"""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        arrow_table = pq.read_table(path)
+        table = json.loads(arrow_table.schema.metadata[b"validation"])
+        columns = arrow_table.to_pydict()
+        table["rows"] = [list(r) for r in zip(*(columns[name] for name in COLUMNS))]
+        return table
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_current(table, tree=None):
+    """True if the tree has not changed since the table was written"""
+    tree = tree or table["tree"]
+    return str(tree) == table["tree"] and synced_store(tree).signature(tree) == table["signature"]
+
+
+def issue_chapters(table, types=None, books=None):
+    """{(book, chapter)} with at least one issue of the given types"""
+    return {(r[0], r[1]) for r in table["rows"]
+            if (not types or r[3] in types) and (not books or r[0] in books)}
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Validate a mapping tree into an issue table')
+    parser.add_argument('--tree', default=DEFAULT_TREE, help=f'Mapping tree (default: {DEFAULT_TREE})')
+    parser.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1),
+                        help='Worker processes (default: CPU count, max 8)')
+    parser.add_argument('--output', default=ISSUES_PATH, help=f'Issue table, .json or .parquet (default: {ISSUES_PATH})')
+    args = parser.parse_args()
+
+    books = [b.strip().upper() for b in args.books.split(',')] if args.books else None
+
+    start = time.time()
+    table = validate_tree(args.tree, books, args.workers)
+    path = write_issue_table(table, args.output)
+    elapsed = time.time() - start
+
+    print(f"📋 {args.tree}: {len(table['books'])} books, {table['verses']} verses, "
+          f"{table['mappings']} mappings in {elapsed:.2f}s")
+    for issue_type in ISSUE_TYPES:
+        print(f"  {issue_type:<18} {table['counts'][issue_type]:>7}")
+    print(f"💾 {len(table['rows'])} issues written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,33 +4,57 @@ GPU-Optimized Bible Word Mapping Generation
 Uses parallel processing with Apple M4 GPU acceleration via native Ollama
 
 Key optimizations:
-- Parallel chapter processing (4 workers)
+- Verse-level, longest-job-first scheduling (4 workers, pipeline/scheduler.py)
 - GPU-accelerated Gemma 3 translations
-- Automatic resume capability
+- Pooled keep-alive Ollama connections (pipeline/ollama_client.py)
+- Frequent unambiguous words reused from existing mappings (pipeline/translation_memory.py)
+- Short verses packed several to a request (pipeline/request_packing.py)
+- Automatic resume capability (append-only per-verse journal, pipeline/mapping_journal.py)
 - Progress tracking and ETA estimation
 """
 
 import json
 import os
-import requests
 import re
 import sys
+import threading
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
+from pipeline import ollama_client, output_budget, streaming
+from pipeline.mapping_journal import ChapterJournal
+from pipeline.request_packing import demultiplex, estimate_tokens, pack, section_label
+from pipeline.scheduler import JobScheduler
+from pipeline.tokenizer import mapped_words
+from pipeline.translation_cache import cached_batch, context_hash, get_cache
+from pipeline.translation_memory import get_memory
+
 # Force unbuffered output for real-time progress updates
 sys.stdout.reconfigure(line_buffering=True)
 
-OLLAMA_API = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
+# Bump when a prompt changes so cached translations are not reused
+BATCH_PROMPT_VERSION = "verse-batch-v1"
+
 # GPU-optimized settings for M4
-MAX_WORKERS = 4  # Parallel chapter translations
-TIMEOUT = 20  # Per-batch timeout (fast with 20-word batches)
-NUM_PREDICT = 100  # Tokens for 20-word batches (50 needed + 50 buffer)
+MAX_WORKERS = 8  # Ceiling for in-flight requests; the shared AIMD controller finds the sustainable level
+TIMEOUT = 20  # Minimum per-batch timeout; stretched automatically when the server is slow
+
+BATCH_SIZE = 20  # Translate 20 words at a time max
+
+# Resolve frequent, unambiguous forms from existing mappings (--no-memory disables)
+USE_TRANSLATION_MEMORY = True
 
+# Pack several short verses into one request (--no-pack disables)
+USE_PACKING = True
+PACKED_PROMPT_VERSION = "packed-verses-v1"
+PACK_TOKEN_BUDGET = 1500  # Estimated prompt tokens per packed request
+PACK_STATS = {"requests": 0, "verses": 0, "fallbacks": 0}
+STATS_LOCK = threading.Lock()
 
+
+@cached_batch(MODEL, BATCH_PROMPT_VERSION)
 def translate_verse_batch(arabic_words, full_verse_ar, full_verse_en):
     """
     Translate ALL words in a verse at once using GPU-accelerated Gemma 3
@@ -49,22 +73,16 @@ Words to translate:
 
 Provide ONLY the English translation for each word (one per line, no labels, no explanations):"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": NUM_PREDICT,
-            "num_gpu": 99  # Use all GPU layers
-        }
+    # num_predict is sized per batch by output_budget
+    options = {
+        "temperature": 0.1,
+        "num_gpu": 99  # Use all GPU layers
     }
 
     try:
-        response = requests.post(OLLAMA_API, json=payload, timeout=TIMEOUT)
-        response.raise_for_status()
-        result = response.json()
-        response_text = result.get("response", "").strip()
+        response_text = ollama_client.generate(MODEL, prompt, options, timeout=TIMEOUT,
+                                               stream=streaming.plain(len(arabic_words)),
+                                               budget=output_budget.plan(MODEL, len(arabic_words), "plain"))
 
         # Parse the response - expect one translation per line
         translations = []
@@ -92,154 +110,285 @@ Provide ONLY the English translation for each word (one per line, no labels, no
         return {word: None for word in arabic_words}
 
 
-def extract_words_from_arabic(arabic_text):
+def resolve_verse_words(verse_data):
     """
-    Extract individual words from Arabic text, preserving positions
-    Returns list of (word, start_pos, end_pos) tuples
+    Returns (filtered_words, translation_map, ambiguous): context-independent
+    forms come from the translation memory, only `ambiguous` needs the model
     """
-    words = []
-    current_pos = 0
+    filtered_words = mapped_words(verse_data['ar'])
+    words_only = [w for w, s, e in filtered_words]
+
+    if USE_TRANSLATION_MEMORY:
+        translation_map, ambiguous = get_memory().resolve(words_only)
+    else:
+        translation_map, ambiguous = {}, words_only
+    return filtered_words, translation_map, ambiguous
+
+
+def assemble_verse(verse_data, filtered_words, translation_map):
+    """Output entry {"ar", "en", "mappings": [{"ar", "en", "start", "end"}, ...]}"""
+    mappings = []
+    for word, start, end in filtered_words:
+        translation = translation_map.get(word)
+        if translation:
+            mappings.append({
+                "ar": word,
+                "en": translation,
+                "start": start,
+                "end": end
+            })
 
-    # Split by whitespace
-    tokens = re.split(r'(\s+)', arabic_text)
+    return {
+        "ar": verse_data['ar'],
+        "en": verse_data['en'],
+        "mappings": mappings
+    }
 
-    for token in tokens:
-        if token.strip():  # Not whitespace
-            start = current_pos
-            end = current_pos + len(token)
-            words.append((token, start, end))
-        current_pos += len(token)
 
-    return words
+def translate_ambiguous(verse_data, translation_map, ambiguous):
+    """Fill translation_map for one verse with single-verse batch requests"""
+    # Smart batching: split large verses into chunks for faster processing
+    for i in range(0, len(ambiguous), BATCH_SIZE):
+        batch = ambiguous[i:i+BATCH_SIZE]
+        batch_translations = translate_verse_batch(batch, verse_data['ar'], verse_data['en'])
+        translation_map.update(batch_translations)
 
 
-def regenerate_chapter_mappings(book, chapter):
+def build_verse_mapping(verse_data):
+    """
+    Translate one source verse and return its output entry
+    {"ar", "en", "mappings": [{"ar", "en", "start", "end"}, ...]}
     """
-    Regenerate word mappings for a single Bible chapter using GPU-accelerated Gemma 3
-    Supports resume: If partially complete, picks up where it left off
+    filtered_words, translation_map, ambiguous = resolve_verse_words(verse_data)
+    translate_ambiguous(verse_data, translation_map, ambiguous)
+    return assemble_verse(verse_data, filtered_words, translation_map)
 
-    Returns: (success, verses_completed, total_verses)
+
+def translate_packed_verses(sections):
+    """
+    Translate several short verses in ONE request
+    sections: [(arabic_words, full_verse_ar, full_verse_en), ...]
+    Returns, per section, {word: translation} - or None where the model's
+    numbering for that verse did not validate (caller falls back)
     """
-    # Read the source chapter
+    blocks = []
+    for i, (words, verse_ar, verse_en) in enumerate(sections):
+        label = section_label(i)
+        word_list = "\n".join(f"{label}{n+1}. {word}" for n, word in enumerate(words))
+        blocks.append(f"Verse {label}\nArabic: {verse_ar}\nWords:\n{word_list}")
+
+    prompt = f"""Translate Arabic words to English using each verse's context. Each Arabic word may include articles (الْ), prepositions, or conjunctions - translate the COMPLETE word meaning, not just prefixes.
+
+{chr(10).join(blocks)}
+
+Answer with one line per word, keeping its label exactly (for example "A1. translation"). No explanations:"""
+
+    # num_predict is sized per pack by output_budget (labels cost a few extra tokens per line)
+    options = {
+        "temperature": 0.1,
+        "num_gpu": 99  # Use all GPU layers
+    }
+
+    word_counts = [len(words) for words, _, _ in sections]
+    try:
+        response_text = ollama_client.generate(MODEL, prompt, options, timeout=TIMEOUT * 2,
+                                               stream=streaming.labelled(word_counts),
+                                               budget=output_budget.plan(MODEL, sum(word_counts), "labelled"))
+    except Exception:
+        return [None] * len(sections)
+
+    glosses = demultiplex(response_text, word_counts, clean=lambda g: g.strip('"\'.,!?'))
+    return [
+        dict(zip(words, section_glosses)) if section_glosses else None
+        for (words, _, _), section_glosses in zip(sections, glosses)
+    ]
+
+
+def build_packed_verse_mappings(verse_items):
+    """
+    Translate a pack of short verses [(verse_num, verse_data), ...] and
+    return {verse_num: output entry}. Cached words are filled in first; the
+    remaining words of all verses go out in packed requests, and any verse
+    whose packed answer fails numbering validation is retried on its own.
+    """
+    cache = get_cache()
+    pending = []
+    resolved = {}
+
+    for verse_num, verse_data in verse_items:
+        filtered_words, translation_map, ambiguous = resolve_verse_words(verse_data)
+        context = context_hash(verse_data['ar'], verse_data['en'])
+        for version in (BATCH_PROMPT_VERSION, PACKED_PROMPT_VERSION):
+            if ambiguous:
+                translation_map.update(cache.get_many(ambiguous, context, MODEL, version))
+                ambiguous = [w for w in dict.fromkeys(ambiguous) if w not in translation_map]
+        resolved[verse_num] = (verse_data, filtered_words, translation_map)
+        if ambiguous:
+            pending.append((verse_num, ambiguous))
+
+    def size(item):
+        verse_num, words = item
+        verse_data = resolved[verse_num][0]
+        return estimate_tokens(verse_data['ar']) + sum(estimate_tokens(w) + 2 for w in words)
+
+    for group in pack(pending, size, PACK_TOKEN_BUDGET):
+        sections = [(words, resolved[v][0]['ar'], resolved[v][0]['en']) for v, words in group]
+        answers = translate_packed_verses(sections)
+        with STATS_LOCK:
+            PACK_STATS["requests"] += 1
+            PACK_STATS["verses"] += len(group)
+
+        for (verse_num, words), answer in zip(group, answers):
+            verse_data, _, translation_map = resolved[verse_num]
+            if answer is None:
+                with STATS_LOCK:
+                    PACK_STATS["fallbacks"] += 1
+                translate_ambiguous(verse_data, translation_map, words)
+                continue
+            cache.put_many(answer, context_hash(verse_data['ar'], verse_data['en']),
+                           MODEL, PACKED_PROMPT_VERSION)
+            translation_map.update(answer)
+
+    return {
+        verse_num: assemble_verse(verse_data, filtered_words, translation_map)
+        for verse_num, (verse_data, filtered_words, translation_map) in resolved.items()
+    }
+
+
+def pack_summary():
+    """One-line packing stats for end-of-run reports"""
+    return (f"{PACK_STATS['verses']} verses in {PACK_STATS['requests']} packed requests, "
+            f"{PACK_STATS['fallbacks']} fell back to single-verse")
+
+
+class ChapterOutput:
+    """In-progress output for one chapter while its verses run as separate jobs"""
+
+    def __init__(self, book, chapter, source_verses):
+        self.book = book
+        self.chapter = chapter
+        self.source_verses = source_verses
+        self.output_file = f"bible-maps-word-gemma3/mappings/{book}/{chapter}.json"
+        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        self.journal = ChapterJournal(self.output_file)
+        self.output = self.journal.load(book, chapter)
+        self.initial_completed = len(self.output["verses"])
+        self.start_time = None
+
+    def missing_verses(self):
+        return [v for v in self.source_verses if v not in self.output["verses"]]
+
+    def commit(self, verse_num, verse_output):
+        """Journal one finished verse (the scheduler serializes calls per chapter)"""
+        self.output["verses"][verse_num] = verse_output
+        self.journal.append(verse_num, verse_output)
+        # Many chapters are open at once under verse-level scheduling
+        self.journal.close()
+
+    def compact(self):
+        """Write the chapter JSON in source verse order and drop the journal"""
+        done = self.output["verses"]
+        ordered = {v: done[v] for v in self.source_verses if v in done}
+        ordered.update((v, data) for v, data in done.items() if v not in ordered)
+        self.output["verses"] = ordered
+        self.journal.compact(self.output)
+
+
+def load_chapter_output(book, chapter):
+    """ChapterOutput for a chapter, or None if the source chapter does not exist"""
     source_file = f"bible-translations/unified/{book}/{chapter}.json"
     if not os.path.exists(source_file):
-        return (False, 0, 0)
-
+        return None
     with open(source_file, 'r', encoding='utf-8') as f:
         verses = json.load(f)
+    return ChapterOutput(book, str(chapter), verses)
 
-    # Check if we have a partial output file (for resume)
-    output_dir = f"bible-maps-word-gemma3/mappings/{book}"
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = f"{output_dir}/{chapter}.json"
-
-    # Try to load existing progress
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                output = json.load(f)
-        except (json.JSONDecodeError, ValueError):
-            # Corrupted file - start fresh
-            output = {
-                "book": book,
-                "chapter": int(chapter),
-                "verses": {}
-            }
-    else:
-        # Create new output structure
-        output = {
-            "book": book,
-            "chapter": int(chapter),
-            "verses": {}
-        }
-
-    total_verses = len(verses)
-    initial_completed = len(output["verses"])
-
-    # Process each verse
-    for verse_num, verse_data in verses.items():
-        # Skip if already completed
-        if verse_num in output["verses"]:
+
+def generate_verses_job(chapter_output, verse_nums):
+    """
+    Scheduler job: translate one verse, or a pack of short verses
+    Returns {verse_num: output entry}; timing starts with the chapter's first job
+    """
+    if chapter_output.start_time is None:
+        chapter_output.start_time = time.time()
+    if len(verse_nums) == 1:
+        verse_num = verse_nums[0]
+        return {verse_num: build_verse_mapping(chapter_output.source_verses[verse_num])}
+    return build_packed_verse_mappings(
+        [(v, chapter_output.source_verses[v]) for v in verse_nums])
+
+
+def plan_chapter_jobs(chapter_output, verse_nums):
+    """
+    Split a chapter's missing verses into jobs: [(weight, [verse_num, ...]), ...]
+    With packing on, consecutive short verses share a job (and a request)
+    up to PACK_TOKEN_BUDGET; long verses are always their own job.
+    """
+    sizes = {}
+    for verse_num in verse_nums:
+        verse_data = chapter_output.source_verses[verse_num]
+        words = mapped_words(verse_data['ar'])
+        sizes[verse_num] = (len(words), estimate_tokens(verse_data['ar']) +
+                            sum(estimate_tokens(w) + 2 for w, _, _ in words))
+
+    if not USE_PACKING:
+        return [(sizes[v][0], [v]) for v in verse_nums]
+
+    jobs = []
+    short = [v for v in verse_nums if sizes[v][0] <= BATCH_SIZE]
+    jobs.extend((sizes[v][0], [v]) for v in verse_nums if sizes[v][0] > BATCH_SIZE)
+    for group in pack(short, lambda v: sizes[v][1], PACK_TOKEN_BUDGET):
+        jobs.append((sum(sizes[v][0] for v in group), group))
+    return jobs
+
+
+def run_generation(chapters, workers, on_chapter_done=None):
+    """
+    Generate mappings for [(book, chapter), ...] with verse-level,
+    longest-job-first scheduling (weight = words in the job)
+
+    on_chapter_done(chapter_output) is called after each chapter is compacted.
+    Returns the JobScheduler (for its summary).
+    """
+    scheduler = JobScheduler(workers)
+    outputs = {}
+    report_lock = threading.Lock()
+
+    for book, chapter in chapters:
+        chapter_output = load_chapter_output(book, chapter)
+        if chapter_output is None:
+            print(f"❌ {book} {chapter} - Source file not found")
             continue
 
-        arabic = verse_data['ar']
-        english = verse_data['en']
-
-        # Extract Arabic words with positions
-        arabic_words_with_pos = extract_words_from_arabic(arabic)
-
-        # Filter words (skip very short words - likely particles)
-        filtered_words = [(w, s, e) for w, s, e in arabic_words_with_pos if len(w) >= 3]
-
-        # Smart batching: split large verses into chunks for faster processing
-        BATCH_SIZE = 20  # Translate 20 words at a time max
-        words_only = [w for w, s, e in filtered_words]
-
-        translation_map = {}
-        for i in range(0, len(words_only), BATCH_SIZE):
-            batch = words_only[i:i+BATCH_SIZE]
-            batch_translations = translate_verse_batch(batch, arabic, english)
-            translation_map.update(batch_translations)
-
-        # Build mappings with positions
-        mappings = []
-        for word, start, end in filtered_words:
-            translation = translation_map.get(word)
-            if translation:
-                mappings.append({
-                    "ar": word,
-                    "en": translation,
-                    "start": start,
-                    "end": end
-                })
-
-        # Add verse to output
-        output["verses"][verse_num] = {
-            "ar": arabic,
-            "en": english,
-            "mappings": mappings
-        }
-
-        # SAVE AFTER EACH VERSE (checkpoint for resume)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
-
-    final_completed = len(output["verses"])
-    verses_processed = final_completed - initial_completed
-
-    return (True, verses_processed, total_verses)
-
-
-def process_chapter_wrapper(args):
-    """Wrapper for parallel processing"""
-    book, chapter, chapter_idx, total_chapters = args
-
-    # Stagger first API calls to avoid overwhelming Ollama
-    import random
-    import time as time_module
-    if chapter_idx < 4:  # Only for first batch
-        delay = chapter_idx * 2  # 0s, 2s, 4s, 6s delays
-        time_module.sleep(delay)
-
-    # Debug output
-    print(f"[Worker] Starting {book} {chapter}...")
-    sys.stdout.flush()
+        missing = chapter_output.missing_verses()
+        if not missing:
+            chapter_output.compact()
+            if on_chapter_done:
+                on_chapter_done(chapter_output)
+            continue
 
-    start_time = time.time()
-    success, verses_done, verses_total = regenerate_chapter_mappings(book, str(chapter))
+        outputs[(book, str(chapter))] = chapter_output
+        for weight, verse_nums in plan_chapter_jobs(chapter_output, missing):
+            scheduler.add(weight, (book, str(chapter)), generate_verses_job, chapter_output, verse_nums)
 
-    elapsed = time.time() - start_time
+    def commit(group, args, result, error):
+        chapter_output, verse_nums = args
+        if error is None:
+            for verse_num in verse_nums:
+                chapter_output.commit(verse_num, result[verse_num])
+        else:
+            print(f"❌ {group[0]} {group[1]}:{','.join(verse_nums)} - {error}")
 
-    return {
-        'success': success,
-        'book': book,
-        'chapter': chapter,
-        'chapter_idx': chapter_idx,
-        'total_chapters': total_chapters,
-        'verses_done': verses_done,
-        'verses_total': verses_total,
-        'elapsed': elapsed
-    }
+    def chapter_done(group):
+        chapter_output = outputs.pop(group)
+        chapter_output.compact()
+        if on_chapter_done:
+            # Chapters finish concurrently; keep progress reporting serial
+            with report_lock:
+                on_chapter_done(chapter_output)
+
+    scheduler.run(on_result=commit, on_group_done=chapter_done)
+    return scheduler
 
 
 def get_all_bible_chapters():
@@ -266,13 +415,24 @@ def main():
     import argparse
     parser = argparse.ArgumentParser(description='GPU-Optimized Bible word mapping generation')
     parser.add_argument('--workers', type=int, default=MAX_WORKERS,
-                       help=f'Number of parallel workers (default: {MAX_WORKERS})')
+                       help=f'Maximum parallel requests, adapted down as needed (default: {MAX_WORKERS})')
     parser.add_argument('--books', type=str,
                        help='Comma-separated list of book codes to process (default: all)')
     parser.add_argument('--resume', action='store_true',
                        help='Resume from where we left off (skips completed chapters)')
+    parser.add_argument('--no-memory', action='store_true',
+                       help='Send every word to the model instead of reusing known glosses')
+    parser.add_argument('--no-pack', action='store_true',
+                       help='One request per verse instead of packing short verses together')
     args = parser.parse_args()
 
+    global USE_TRANSLATION_MEMORY, USE_PACKING
+    USE_TRANSLATION_MEMORY = not args.no_memory
+    USE_PACKING = not args.no_pack
+
+    # --workers caps the shared client's adaptive in-flight limit
+    ollama_client.configure(max_in_flight=args.workers)
+
     # Get all available books
     all_books = get_all_bible_chapters()
 
@@ -317,7 +477,8 @@ def main():
         skipped = 0
         for book, chapter, idx, total in tasks:
             output_file = f"bible-maps-word-gemma3/mappings/{book}/{chapter}.json"
-            if os.path.exists(output_file):
+            # A pending journal means the chapter was interrupted mid-way
+            if os.path.exists(output_file) and not ChapterJournal(output_file).exists():
                 try:
                     with open(output_file, 'r') as f:
                         data = json.load(f)
@@ -340,50 +501,44 @@ def main():
         return
 
     # Track progress
-    completed_chapters = 0
     start_time = time.time()
-    chapter_times = []
+    progress = {"completed": 0, "chapter_times": []}
+
+    def report_chapter(chapter_output):
+        progress["completed"] += 1
+        completed_chapters = progress["completed"]
+        elapsed = time.time() - (chapter_output.start_time or time.time())
+        progress["chapter_times"].append(elapsed)
+
+        # Calculate progress and ETA (verse-level jobs overlap, so use overall throughput)
+        percent = (completed_chapters / total_chapters) * 100
+        rate = (time.time() - start_time) / completed_chapters
+        remaining = total_chapters - completed_chapters
+        eta_seconds = remaining * rate
+        eta_minutes = eta_seconds / 60
+        eta_hours = eta_minutes / 60
+
+        # Format ETA
+        if eta_hours >= 1:
+            eta_str = f"{eta_hours:.1f}h"
+        else:
+            eta_str = f"{eta_minutes:.0f}m"
+
+        # Status message
+        verses_total = len(chapter_output.source_verses)
+        verses_done = len(chapter_output.output["verses"]) - chapter_output.initial_completed
+        status = "✅" if len(chapter_output.output["verses"]) >= verses_total else "⚠️ "
+        print(f"{status} [{completed_chapters}/{total_chapters}] {chapter_output.book} {chapter_output.chapter} "
+              f"({verses_done}/{verses_total} verses) "
+              f"- {elapsed:.1f}s | {percent:.1f}% | ETA: {eta_str}")
 
     print(f"🚀 Starting GPU-accelerated generation with {args.workers} workers...")
-    print(f"📋 Submitting {len(tasks)} tasks to queue...\n")
-
-    # Process chapters in parallel
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        # Submit all tasks immediately - ThreadPoolExecutor handles the queue
-        futures = {executor.submit(process_chapter_wrapper, task): task for task in tasks}
-        print(f"✓ All tasks submitted. Waiting for results...\n")
-
-        for future in as_completed(futures):
-            result = future.result()
-
-            if result['success']:
-                completed_chapters += 1
-                chapter_times.append(result['elapsed'])
-
-                # Calculate progress and ETA
-                percent = (completed_chapters / total_chapters) * 100
-
-                # ETA calculation (based on last 10 chapters)
-                recent_times = chapter_times[-10:]
-                avg_time = sum(recent_times) / len(recent_times)
-                remaining = total_chapters - completed_chapters
-                eta_seconds = remaining * avg_time
-                eta_minutes = eta_seconds / 60
-                eta_hours = eta_minutes / 60
-
-                # Format ETA
-                if eta_hours >= 1:
-                    eta_str = f"{eta_hours:.1f}h"
-                else:
-                    eta_str = f"{eta_minutes:.0f}m"
-
-                # Status message
-                status = "✅" if result['verses_done'] == result['verses_total'] else "⚠️ "
-                print(f"{status} [{completed_chapters}/{total_chapters}] {result['book']} {result['chapter']} "
-                      f"({result['verses_done']}/{result['verses_total']} verses) "
-                      f"- {result['elapsed']:.1f}s | {percent:.1f}% | ETA: {eta_str}")
-            else:
-                print(f"❌ {result['book']} {result['chapter']} - Failed")
+    print(f"📋 Queueing verses of {len(tasks)} chapters (longest first)...\n")
+
+    chapters = [(book, chapter) for book, chapter, _, _ in tasks]
+    scheduler = run_generation(chapters, args.workers, on_chapter_done=report_chapter)
+    completed_chapters = progress["completed"]
+    chapter_times = progress["chapter_times"]
 
     # Final summary
     total_time = time.time() - start_time
@@ -396,6 +551,15 @@ def main():
     print(f"  Total time:         {total_time/60:.1f} minutes ({total_time/3600:.2f} hours)")
     print(f"  Avg per chapter:    {avg_chapter_time:.1f} seconds")
     print(f"  GPU speedup:        ~3-5x faster than CPU")
+    print(f"  Scheduler:          {scheduler.summary()}")
+    if USE_PACKING:
+        print(f"  Request packing:    {pack_summary()}")
+    print(f"  Concurrency:        {ollama_client.controller_summary()}")
+    print(f"  Streaming:          {ollama_client.stream_summary()}")
+    print(f"  Output budget:      {output_budget.summary()}")
+    print(f"  Translation cache:  {get_cache().summary()}")
+    if USE_TRANSLATION_MEMORY:
+        print(f"  Translation memory: {get_memory().summary()}")
     print("="*70)
 
 
@@ -2,6 +2,23 @@
 """
 Regenerate Bible word mappings using Claude Haiku via API
 Uses the same batch translation approach as the Gemma script
+
+Two modes:
+- default: one synchronous messages.create() per verse, checkpointed per verse
+- --batch: every verse still to do goes into one JSONL request file, which is
+  submitted as an asynchronous Message Batch (pipeline/message_batches.py),
+  polled until it ends, and merged into the mapping files by custom_id.
+  Throughput is no longer bound by round trips, and batch requests cost
+  half as much. The batch id is saved in cache/haiku_batches/state.json,
+  so an interrupted run resumes polling instead of resubmitting.
+
+--batch-dir DIR swaps the API for the file-based stand-in (and --mock
+answers it with deterministic glosses), for dry runs without an API key.
+
+Usage:
+    python3 regenerate_mappings_haiku.py                          # Sync, whole NT
+    python3 regenerate_mappings_haiku.py --batch --books PHP,COL
+    python3 regenerate_mappings_haiku.py --batch --batch-dir /tmp/batches --mock --poll 1
 """
 
 import json
@@ -9,23 +26,79 @@ import os
 import re
 import sys
 from pathlib import Path
-from anthropic import Anthropic
+
+from pipeline import message_batches
+from pipeline.mapping_journal import ChapterJournal
+from pipeline.tokenizer import mapped_words
+from pipeline.translation_memory import get_memory
 
 # Force unbuffered output for real-time progress updates
 sys.stdout.reconfigure(line_buffering=True)
 
-# Initialize Anthropic client
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-
-def translate_verse_batch(arabic_words, full_verse_ar, full_verse_en):
-    """
-    Translate ALL words in a verse at once using Claude Haiku (MUCH faster!)
-    Returns dict mapping Arabic words to English translations
-    """
+MODEL = "claude-3-5-haiku-20241022"
+MAX_TOKENS = 1024
+TEMPERATURE = 0.1
+OUTPUT_ROOT = "bible-maps-word-haiku/mappings"
+BATCH_DIR = Path(os.environ.get("HAIKU_BATCH_DIR", "cache/haiku_batches"))
+
+# Complete New Testament - all 27 books (260 chapters total)
+BOOKS_TO_PROCESS = [
+    # Gospels
+    ("MAT", 28),  # Matthew
+    ("MRK", 16),  # Mark
+    ("LUK", 24),  # Luke
+    ("JHN", 21),  # John
+
+    # History
+    ("ACT", 28),  # Acts
+
+    # Paul's Letters
+    ("ROM", 16),  # Romans
+    ("1CO", 16),  # 1 Corinthians
+    ("2CO", 13),  # 2 Corinthians
+    ("GAL", 6),   # Galatians
+    ("EPH", 6),   # Ephesians
+    ("PHP", 4),   # Philippians
+    ("COL", 4),   # Colossians
+    ("1TH", 5),   # 1 Thessalonians
+    ("2TH", 3),   # 2 Thessalonians
+    ("1TI", 6),   # 1 Timothy
+    ("2TI", 4),   # 2 Timothy
+    ("TIT", 3),   # Titus
+    ("PHM", 1),   # Philemon
+
+    # General Epistles
+    ("HEB", 13),  # Hebrews
+    ("JAS", 5),   # James
+    ("1PE", 5),   # 1 Peter
+    ("2PE", 3),   # 2 Peter
+    ("1JN", 5),   # 1 John
+    ("2JN", 1),   # 2 John
+    ("3JN", 1),   # 3 John
+    ("JUD", 1),   # Jude
+
+    # Prophecy
+    ("REV", 22),  # Revelation
+]
+
+# Anthropic client, created on first synchronous request (batch mode may not need it)
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        from anthropic import Anthropic
+        _client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    return _client
+
+
+def build_prompt(arabic_words, full_verse_ar, full_verse_en):
+    """The numbered word-list prompt for one verse"""
     # Create numbered list of words to translate
     word_list = "\n".join([f"{i+1}. {word}" for i, word in enumerate(arabic_words)])
 
-    prompt = f"""Translate Arabic words to English using the verse context. Each Arabic word may include articles (الْ), prepositions, or conjunctions - translate the COMPLETE word meaning, not just prefixes.
+    return f"""Translate Arabic words to English using the verse context. Each Arabic word may include articles (الْ), prepositions, or conjunctions - translate the COMPLETE word meaning, not just prefixes.
 
 Context:
 Arabic: {full_verse_ar}
@@ -36,94 +109,107 @@ Words to translate:
 
 Provide ONLY the English translation for each word (one per line, no labels, no explanations):"""
 
-    try:
-        message = client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=1024,
-            temperature=0.1,
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        response_text = message.content[0].text.strip()
-
-        # Parse the response - expect one translation per line
-        translations = []
-        for line in response_text.split('\n'):
-            line = line.strip()
-            # Remove numbering if present (1. 2. etc.)
-            line = re.sub(r'^\d+\.\s*', '', line)
-            # Clean up quotes and punctuation
-            line = line.strip('"\'.,!?')
-            if line:
-                translations.append(line)
-
-        # Map Arabic words to their translations
-        result_map = {}
-        for i, arabic_word in enumerate(arabic_words):
-            if i < len(translations):
-                result_map[arabic_word] = translations[i]
-            else:
-                result_map[arabic_word] = None
 
-        return result_map
-
-    except Exception as e:
-        print(f"  ⚠️  Error in batch translation: {e}")
-        return {word: None for word in arabic_words}
+def message_params(arabic_words, full_verse_ar, full_verse_en):
+    """messages.create() arguments for one verse (also a batch request's params)"""
+    return {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+        "messages": [{"role": "user", "content": build_prompt(arabic_words, full_verse_ar, full_verse_en)}],
+    }
+
+
+def parse_translations(response_text, arabic_words):
+    """Map Arabic words to the response's lines, in order (None where a line is missing)"""
+    # Parse the response - expect one translation per line
+    translations = []
+    for line in response_text.strip().split('\n'):
+        line = line.strip()
+        # Remove numbering if present (1. 2. etc.)
+        line = re.sub(r'^\d+\.\s*', '', line)
+        # Clean up quotes and punctuation
+        line = line.strip('"\'.,!?')
+        if line:
+            translations.append(line)
+
+    # Map Arabic words to their translations
+    result_map = {}
+    for i, arabic_word in enumerate(arabic_words):
+        if i < len(translations):
+            result_map[arabic_word] = translations[i]
+        else:
+            result_map[arabic_word] = None
+
+    return result_map
 
 
-def extract_words_from_arabic(arabic_text):
+def translate_verse_batch(arabic_words, full_verse_ar, full_verse_en):
     """
-    Extract individual words from Arabic text, preserving positions
-    Returns list of (word, start_pos, end_pos) tuples
+    Translate ALL words in a verse at once using Claude Haiku (MUCH faster!)
+    Returns dict mapping Arabic words to English translations
     """
-    # Split by whitespace but track positions
-    words = []
-    current_pos = 0
-
-    # Split by whitespace
-    tokens = re.split(r'(\s+)', arabic_text)
-
-    for token in tokens:
-        if token.strip():  # Not whitespace
-            start = current_pos
-            end = current_pos + len(token)
-            words.append((token, start, end))
-        current_pos += len(token)
+    try:
+        message = get_client().messages.create(**message_params(arabic_words, full_verse_ar, full_verse_en))
+        return parse_translations(message.content[0].text, arabic_words)
 
-    return words
+    except Exception as e:
+        print(f"  ⚠️  Error in batch translation: {e}")
+        return {word: None for word in arabic_words}
 
 
-def regenerate_chapter_mappings(book, chapter):
-    """
-    Regenerate word mappings for a single Bible chapter using Claude Haiku
-    Supports resume: If partially complete, picks up where it left off
-    """
+def load_chapter(book, chapter):
+    """(source verses, journal, output so far) for a chapter, or None without a source file"""
     # Read the source chapter
     source_file = f"bible-translations/unified/{book}/{chapter}.json"
     if not os.path.exists(source_file):
         print(f"❌ Source file not found: {source_file}")
-        return False
+        return None
 
     with open(source_file, 'r', encoding='utf-8') as f:
         verses = json.load(f)
 
     # Check if we have a partial output file (for resume)
-    output_dir = f"bible-maps-word-haiku/mappings/{book}"
+    output_dir = f"{OUTPUT_ROOT}/{book}"
     os.makedirs(output_dir, exist_ok=True)
     output_file = f"{output_dir}/{chapter}.json"
 
-    # Try to load existing progress
-    if os.path.exists(output_file):
-        with open(output_file, 'r', encoding='utf-8') as f:
-            output = json.load(f)
-    else:
-        # Create new output structure
-        output = {
-            "book": book,
-            "chapter": int(chapter),
-            "verses": {}
-        }
+    # Load existing progress: compacted chapter file + checkpoint journal
+    journal = ChapterJournal(output_file)
+    output = journal.load(book, chapter)
+    return verses, journal, output
+
+
+def build_verse(verse_data, filtered_words, translation_map):
+    """Output entry {"ar", "en", "mappings": [{"ar", "en", "start", "end"}, ...]}"""
+    # Build mappings with positions
+    mappings = []
+    for word, start, end in filtered_words:
+        translation = translation_map.get(word)
+        if translation:
+            mappings.append({
+                "ar": word,
+                "en": translation,
+                "start": start,
+                "end": end
+            })
+
+    return {
+        "ar": verse_data['ar'],
+        "en": verse_data['en'],
+        "mappings": mappings
+    }
+
+
+def regenerate_chapter_mappings(book, chapter):
+    """
+    Regenerate word mappings for a single Bible chapter using Claude Haiku
+    Supports resume: If partially complete, picks up where it left off
+    """
+    loaded = load_chapter(book, chapter)
+    if loaded is None:
+        return False
+    verses, journal, output = loaded
 
     total_verses = len(verses)
     completed_verses = len(output["verses"])
@@ -137,86 +223,203 @@ def regenerate_chapter_mappings(book, chapter):
         arabic = verse_data['ar']
         english = verse_data['en']
 
-        # Extract Arabic words with positions
-        arabic_words_with_pos = extract_words_from_arabic(arabic)
-
-        # Filter words (skip very short words - likely particles)
-        filtered_words = [(w, s, e) for w, s, e in arabic_words_with_pos if len(w) >= 3]
+        # Arabic words with positions, minus very short words (likely particles)
+        filtered_words = mapped_words(arabic)
 
         # Batch translate all words in this verse
         words_only = [w for w, s, e in filtered_words]
-        translation_map = translate_verse_batch(words_only, arabic, english)
-
-        # Build mappings with positions
-        mappings = []
-        for word, start, end in filtered_words:
-            translation = translation_map.get(word)
-            if translation:
-                mappings.append({
-                    "ar": word,
-                    "en": translation,
-                    "start": start,
-                    "end": end
-                })
+
+        # Context-independent forms come from the translation memory;
+        # only the ambiguous words are sent to the model
+        translation_map, ambiguous = get_memory().resolve(words_only)
+        if ambiguous:
+            translation_map.update(translate_verse_batch(ambiguous, arabic, english))
 
         # Add verse to output
-        output["verses"][verse_num] = {
-            "ar": arabic,
-            "en": english,
-            "mappings": mappings
-        }
+        output["verses"][verse_num] = build_verse(verse_data, filtered_words, translation_map)
 
-        # SAVE AFTER EACH VERSE (checkpoint for resume)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        # CHECKPOINT AFTER EACH VERSE (one fsync'd journal line, for resume)
+        journal.append(verse_num, output["verses"][verse_num])
 
         completed_verses += 1
         percent = (completed_verses / total_verses) * 100
         print(f"{book} {chapter}:{verse_num} - {completed_verses}/{total_verses} ({percent:.1f}%)")
 
+    # Write the chapter JSON once and drop the journal
+    journal.compact(output)
+
     return True
 
 
+# ----------------------------------------------------------------------
+# Batch mode
+# ----------------------------------------------------------------------
+
+def custom_id(book, chapter, verse_num):
+    """Batch request id for a verse (the API allows [a-zA-Z0-9_-])"""
+    return re.sub(r'[^a-zA-Z0-9_-]', '-', f"{book}_{chapter}_{verse_num}")
+
+
+def prepare_batch_requests(books):
+    """
+    Walk the chapters and collect one request per verse that still needs the model
+    Verses the translation memory covers completely are written right away
+    Returns (requests, pending): pending[custom_id] holds what merging needs
+    """
+    requests = []
+    pending = {}
+    for book, num_chapters in books:
+        for chapter in map(str, range(1, num_chapters + 1)):
+            loaded = load_chapter(book, chapter)
+            if loaded is None:
+                continue
+            verses, journal, output = loaded
+
+            for verse_num, verse_data in verses.items():
+                if verse_num in output["verses"]:
+                    continue
+                filtered_words = mapped_words(verse_data['ar'])
+                translation_map, ambiguous = get_memory().resolve([w for w, s, e in filtered_words])
+                if not ambiguous:
+                    output["verses"][verse_num] = build_verse(verse_data, filtered_words, translation_map)
+                    journal.append(verse_num, output["verses"][verse_num])
+                    continue
+
+                request_id = custom_id(book, chapter, verse_num)
+                requests.append({
+                    "custom_id": request_id,
+                    "params": message_params(ambiguous, verse_data['ar'], verse_data['en']),
+                })
+                # The memory may be rebuilt before the batch ends: keep its answers
+                pending[request_id] = {"book": book, "chapter": chapter, "verse": verse_num,
+                                       "words": ambiguous, "known": translation_map}
+
+            if len(output["verses"]) == len(verses):
+                journal.compact(output)
+            else:
+                journal.close()
+
+    return requests, pending
+
+
+def merge_batch_results(results, pending):
+    """
+    Write succeeded results into the mapping files by custom_id
+    Failed requests are left out, so the next run asks for those verses again
+    Returns {"merged", "failed", "chapters"}
+    """
+    by_chapter = {}
+    failed = 0
+    for result in results:
+        entry = pending.get(result["custom_id"])
+        if entry is None:
+            continue
+        if result["type"] != "succeeded":
+            failed += 1
+            continue
+        by_chapter.setdefault((entry["book"], entry["chapter"]), []).append((entry, result["text"]))
+
+    merged = 0
+    for (book, chapter), answers in sorted(by_chapter.items()):
+        loaded = load_chapter(book, chapter)
+        if loaded is None:
+            continue
+        verses, journal, output = loaded
+        for entry, text in answers:
+            verse_data = verses[entry["verse"]]
+            translation_map = dict(entry["known"])
+            translation_map.update(parse_translations(text, entry["words"]))
+            output["verses"][entry["verse"]] = build_verse(verse_data, mapped_words(verse_data['ar']),
+                                                           translation_map)
+            journal.append(entry["verse"], output["verses"][entry["verse"]])
+            merged += 1
+
+        if len(output["verses"]) == len(verses):
+            journal.compact(output)
+        else:
+            journal.close()
+
+    return {"merged": merged, "failed": failed, "chapters": len(by_chapter)}
+
+
+def load_batch_state():
+    state_file = BATCH_DIR / "state.json"
+    if not state_file.exists():
+        return None
+    with open(state_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_batch_state(state):
+    BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    state_file = BATCH_DIR / "state.json"
+    tmp_file = state_file.with_suffix(".json.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_file, state_file)
+
+
+def run_batch(books, backend, poll_interval=message_batches.POLL_INTERVAL):
+    """Prepare, submit, poll and merge; resumes a batch a previous run left in flight"""
+    state = load_batch_state()
+    if state:
+        print(f"\n⏯️  Resuming {len(state['batches'])} submitted batch(es) from {BATCH_DIR / 'state.json'}")
+    else:
+        requests, pending = prepare_batch_requests(books)
+        if not requests:
+            print("\n✅ Nothing to request: every verse is mapped")
+            return {"merged": 0, "failed": 0, "chapters": 0}
+
+        state = {"batches": []}
+        for n, start in enumerate(range(0, len(requests), message_batches.MAX_REQUESTS)):
+            chunk = requests[start:start + message_batches.MAX_REQUESTS]
+            requests_file = message_batches.write_requests(BATCH_DIR / f"requests-{n}.jsonl", chunk)
+            batch_id = backend.submit(message_batches.read_jsonl(requests_file))
+            state["batches"].append({
+                "id": batch_id,
+                "requests": str(requests_file),
+                "pending": {r["custom_id"]: pending[r["custom_id"]] for r in chunk},
+            })
+            print(f"\n📤 Submitted {len(chunk)} verse requests as {batch_id} ({requests_file})")
+        save_batch_state(state)
+
+    totals = {"merged": 0, "failed": 0, "chapters": 0}
+    for batch in state["batches"]:
+        def progress(status):
+            counts = ", ".join(f"{count} {name}" for name, count in status["counts"].items() if count)
+            print(f"  ⏳ {batch['id']}: {status['status']} ({counts})")
+
+        message_batches.wait(backend, batch["id"], interval=poll_interval, on_progress=progress)
+        stats = merge_batch_results(backend.results(batch["id"]), batch["pending"])
+        for key, value in stats.items():
+            totals[key] += value
+        print(f"  📥 {batch['id']}: merged {stats['merged']} verses into {stats['chapters']} chapters, "
+              f"{stats['failed']} failed")
+
+    (BATCH_DIR / "state.json").unlink()
+    return totals
+
+
 def main():
-    # Complete New Testament - all 27 books (260 chapters total)
-    books_to_process = [
-        # Gospels
-        ("MAT", 28),  # Matthew
-        ("MRK", 16),  # Mark
-        ("LUK", 24),  # Luke
-        ("JHN", 21),  # John
-
-        # History
-        ("ACT", 28),  # Acts
-
-        # Paul's Letters
-        ("ROM", 16),  # Romans
-        ("1CO", 16),  # 1 Corinthians
-        ("2CO", 13),  # 2 Corinthians
-        ("GAL", 6),   # Galatians
-        ("EPH", 6),   # Ephesians
-        ("PHP", 4),   # Philippians
-        ("COL", 4),   # Colossians
-        ("1TH", 5),   # 1 Thessalonians
-        ("2TH", 3),   # 2 Thessalonians
-        ("1TI", 6),   # 1 Timothy
-        ("2TI", 4),   # 2 Timothy
-        ("TIT", 3),   # Titus
-        ("PHM", 1),   # Philemon
-
-        # General Epistles
-        ("HEB", 13),  # Hebrews
-        ("JAS", 5),   # James
-        ("1PE", 5),   # 1 Peter
-        ("2PE", 3),   # 2 Peter
-        ("1JN", 5),   # 1 John
-        ("2JN", 1),   # 2 John
-        ("3JN", 1),   # 3 John
-        ("JUD", 1),   # Jude
-
-        # Prophecy
-        ("REV", 22),  # Revelation
-    ]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bible word mapping generation with Claude Haiku')
+    parser.add_argument('--books', type=str,
+                        help='Comma-separated book codes (default: the whole New Testament)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Submit all verses as one asynchronous Message Batch instead of per-verse calls')
+    parser.add_argument('--batch-dir', type=str,
+                        help='Use the file-based batch stand-in in this directory instead of the API')
+    parser.add_argument('--mock', action='store_true',
+                        help='With --batch-dir: answer batches with deterministic mock glosses')
+    parser.add_argument('--poll', type=float, default=message_batches.POLL_INTERVAL,
+                        help=f'Seconds between batch status checks (default: {message_batches.POLL_INTERVAL})')
+    args = parser.parse_args()
+
+    books_to_process = BOOKS_TO_PROCESS
+    if args.books:
+        codes = [b.strip().upper() for b in args.books.split(',')]
+        books_to_process = [(book, n) for book, n in BOOKS_TO_PROCESS if book in codes]
 
     total_chapters = sum(chapters for _, chapters in books_to_process)
     completed_chapters = 0
@@ -224,8 +427,25 @@ def main():
     print("="*70)
     print(f"NEW TESTAMENT WORD MAPPING WITH CLAUDE HAIKU")
     print(f"Total: {len(books_to_process)} books, {total_chapters} chapters")
+    if args.batch:
+        print(f"Mode: message batch ({f'file stand-in {args.batch_dir}' if args.batch_dir else 'Anthropic API'})")
     print("="*70)
 
+    if args.batch:
+        if args.batch_dir:
+            responder = message_batches.mock_responder if args.mock else None
+            backend = message_batches.FileBatches(args.batch_dir, responder=responder)
+        else:
+            backend = message_batches.AnthropicBatches()
+        totals = run_batch(books_to_process, backend, args.poll)
+
+        print("\n" + "="*70)
+        print(f"✅ Merged {totals['merged']} verses into {totals['chapters']} chapters, "
+              f"{totals['failed']} requests failed (rerun to retry them)")
+        print(f"  Translation memory: {get_memory().summary()}")
+        print("="*70)
+        return
+
     for book, num_chapters in books_to_process:
         print(f"\n📖 Starting {book} ({num_chapters} chapters)...")
 
@@ -6,17 +6,26 @@ OLD TESTAMENT - 39 books, 929 chapters
 
 import json
 import os
-import requests
 import re
 import sys
 from pathlib import Path
 
+from pipeline import ollama_client, output_budget, streaming
+from pipeline.mapping_journal import ChapterJournal
+from pipeline.tokenizer import mapped_words
+from pipeline.translation_cache import cached_batch
+from pipeline.translation_memory import get_memory
+
 # Force unbuffered output for real-time progress updates
 sys.stdout.reconfigure(line_buffering=True)
 
-OLLAMA_API = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
+# Bump when a prompt changes so cached translations are not reused
+BATCH_PROMPT_VERSION = "verse-batch-v1"
+NUMBERED_PROMPT_VERSION = "numbered-v1"
+
+@cached_batch(MODEL, BATCH_PROMPT_VERSION)
 def translate_verse_batch(arabic_words, full_verse_ar, full_verse_en):
     """
     Translate ALL words in a verse at once using Gemma 3 (MUCH faster!)
@@ -35,21 +44,14 @@ Words to translate:
 
 Provide ONLY the English translation for each word (one per line, no labels, no explanations):"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 200  # More tokens for batch response
-        }
+    options = {
+        "temperature": 0.1  # num_predict is sized per batch by output_budget
     }
 
     try:
-        response = requests.post(OLLAMA_API, json=payload, timeout=120)
-        response.raise_for_status()
-        result = response.json()
-        response_text = result.get("response", "").strip()
+        response_text = ollama_client.generate(MODEL, prompt, options, timeout=120,
+                                               stream=streaming.plain(len(arabic_words)),
+                                               budget=output_budget.plan(MODEL, len(arabic_words), "plain"))
 
         # Parse the response - expect one translation per line
         translations = []
@@ -77,6 +79,7 @@ Provide ONLY the English translation for each word (one per line, no labels, no
         return {word: None for word in arabic_words}
 
 
+@cached_batch(MODEL, NUMBERED_PROMPT_VERSION, returns_count=True)
 def translate_chunk(arabic_words, full_verse_ar, full_verse_en, chunk_idx):
     """
     Translate a chunk of words (helper for long verses)
@@ -98,23 +101,16 @@ Format: NUMBER. TRANSLATION
 
 Your {num_words} translations:"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 300
-        }
+    options = {
+        "temperature": 0.1  # num_predict is sized per chunk by output_budget
     }
 
     max_retries = 2
     for attempt in range(max_retries):
         try:
-            response = requests.post(OLLAMA_API, json=payload, timeout=120)
-            response.raise_for_status()
-            result = response.json()
-            response_text = result.get("response", "").strip()
+            response_text = ollama_client.generate(MODEL, prompt, options, timeout=120,
+                                                   stream=streaming.numbered(num_words),
+                                                   budget=output_budget.plan(MODEL, num_words))
 
             translations = {}
             for line in response_text.split('\n'):
@@ -153,6 +149,7 @@ Your {num_words} translations:"""
     return result_map, success_count
 
 
+@cached_batch(MODEL, NUMBERED_PROMPT_VERSION, returns_count=True)
 def translate_verse_batch_robust(arabic_words, full_verse_ar, full_verse_en):
     """
     ROBUST translation using NUMBERED format for validation
@@ -193,23 +190,16 @@ Format: NUMBER. TRANSLATION
 
 Your {num_words} translations:"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 400
-        }
+    options = {
+        "temperature": 0.1  # num_predict is sized per batch by output_budget
     }
 
     max_retries = 2
     for attempt in range(max_retries):
         try:
-            response = requests.post(OLLAMA_API, json=payload, timeout=120)
-            response.raise_for_status()
-            result = response.json()
-            response_text = result.get("response", "").strip()
+            response_text = ollama_client.generate(MODEL, prompt, options, timeout=120,
+                                                   stream=streaming.numbered(num_words),
+                                                   budget=output_budget.plan(MODEL, num_words))
 
             # Parse numbered responses
             translations = {}
@@ -253,28 +243,6 @@ Your {num_words} translations:"""
     return result_map, success_count
 
 
-def extract_words_from_arabic(arabic_text):
-    """
-    Extract individual words from Arabic text, preserving positions
-    Returns list of (word, start_pos, end_pos) tuples
-    """
-    # Split by whitespace but track positions
-    words = []
-    current_pos = 0
-
-    # Split by whitespace
-    tokens = re.split(r'(\s+)', arabic_text)
-
-    for token in tokens:
-        if token.strip():  # Not whitespace
-            start = current_pos
-            end = current_pos + len(token)
-            words.append((token, start, end))
-        current_pos += len(token)
-
-    return words
-
-
 def regenerate_chapter_mappings(book, chapter):
     """
     Regenerate word mappings for a single Bible chapter using Gemma 3
@@ -294,26 +262,9 @@ def regenerate_chapter_mappings(book, chapter):
     os.makedirs(output_dir, exist_ok=True)
     output_file = f"{output_dir}/{chapter}.json"
 
-    # Try to load existing progress
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                output = json.load(f)
-        except (json.JSONDecodeError, ValueError):
-            # Corrupted file - start fresh
-            print(f"  ⚠️  Corrupted output file, starting fresh...")
-            output = {
-                "book": book,
-                "chapter": int(chapter),
-                "verses": {}
-            }
-    else:
-        # Create new output structure
-        output = {
-            "book": book,
-            "chapter": int(chapter),
-            "verses": {}
-        }
+    # Load existing progress: compacted chapter file + checkpoint journal
+    journal = ChapterJournal(output_file)
+    output = journal.load(book, chapter)
 
     total_verses = len(verses)
     completed_verses = len(output["verses"])
@@ -327,16 +278,18 @@ def regenerate_chapter_mappings(book, chapter):
         arabic = verse_data['ar']
         english = verse_data['en']
 
-        # Extract Arabic words with positions
-        arabic_words_with_pos = extract_words_from_arabic(arabic)
-
-        # Filter words (skip very short words - likely particles)
-        filtered_words = [(w, s, e) for w, s, e in arabic_words_with_pos if len(w) >= 3]
+        # Arabic words with positions, minus very short words (likely particles)
+        filtered_words = mapped_words(arabic)
         words_only = [w for w, s, e in filtered_words]
         expected_count = len(words_only)
 
+        # Context-independent forms come from the translation memory;
+        # only the ambiguous words are sent to the model
+        known, ambiguous = get_memory().resolve(words_only)
+
         # TRY FAST METHOD FIRST (works ~75% of time)
-        translation_map = translate_verse_batch(words_only, arabic, english)
+        translation_map = dict(known)
+        translation_map.update(translate_verse_batch(ambiguous, arabic, english))
 
         # Build mappings with positions
         mappings = []
@@ -357,7 +310,9 @@ def regenerate_chapter_mappings(book, chapter):
             print(f"  ⚠️  Misalignment detected ({actual_count}/{expected_count}), using robust method...")
 
             # FALLBACK TO ROBUST CHUNKED METHOD
-            translation_map, success_count = translate_verse_batch_robust(words_only, arabic, english)
+            robust_map, success_count = translate_verse_batch_robust(ambiguous, arabic, english)
+            translation_map = dict(known)
+            translation_map.update(robust_map)
 
             # Rebuild mappings with robust results
             mappings = []
@@ -381,14 +336,16 @@ def regenerate_chapter_mappings(book, chapter):
             "mappings": mappings
         }
 
-        # SAVE AFTER EACH VERSE (checkpoint for resume)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        # CHECKPOINT AFTER EACH VERSE (one fsync'd journal line, for resume)
+        journal.append(verse_num, output["verses"][verse_num])
 
         completed_verses += 1
         percent = (completed_verses / total_verses) * 100
         print(f"{book} {chapter}:{verse_num} - {completed_verses}/{total_verses} ({percent:.1f}%)")
 
+    # Write the chapter JSON once and drop the journal
+    journal.compact(output)
+
     return True
 
 
@@ -469,6 +426,8 @@ def main():
 
     print("\n" + "="*70)
     print(f"✅ ALL COMPLETE! {completed_chapters}/{total_chapters} chapters")
+    print(f"Streaming: {ollama_client.stream_summary()}")
+    print(f"Output budget: {output_budget.summary()}")
     print("="*70)
 
 
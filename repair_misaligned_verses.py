@@ -1,28 +1,34 @@
 #!/usr/bin/env python3
 """
 Repair misaligned verses in Bible word mappings
-Finds verses with missing translations and re-processes them with robust method
+Finds verses with missing translations, aligns their existing mappings
+against the source words and sends only the missing words to the model
+(robust numbered method)
 """
 
 import json
 import os
-import requests
 import re
 import sys
-from pathlib import Path
+import threading
+
+from pipeline import ollama_client, output_budget, scan_manifest, streaming
+from pipeline.alignment import align
+from pipeline.scheduler import JobScheduler
+from pipeline.token_index import get_token_index
+from pipeline.translation_cache import cached_batch
 
 # Force unbuffered output
 sys.stdout.reconfigure(line_buffering=True)
 
-OLLAMA_API = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
-def count_arabic_words(text):
-    """Count words >= 3 chars (same filter as original script)"""
-    tokens = re.split(r'\s+', text)
-    return len([t for t in tokens if len(t.strip()) >= 3])
+# Bump when a prompt changes so cached translations are not reused
+NUMBERED_PROMPT_VERSION = "numbered-v1"
 
+MAX_WORKERS = 4  # Parallel verse repairs (ceiling for the adaptive in-flight limit)
 
+@cached_batch(MODEL, NUMBERED_PROMPT_VERSION, returns_count=True)
 def translate_chunk(arabic_words, full_verse_ar, full_verse_en, chunk_idx):
     """
     Translate a chunk of words (helper for long verses)
@@ -43,23 +49,16 @@ Format: NUMBER. TRANSLATION
 
 Your {num_words} translations:"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 300
-        }
+    options = {
+        "temperature": 0.1  # num_predict is sized per chunk by output_budget
     }
 
     max_retries = 2
     for attempt in range(max_retries):
         try:
-            response = requests.post(OLLAMA_API, json=payload, timeout=120)
-            response.raise_for_status()
-            result = response.json()
-            response_text = result.get("response", "").strip()
+            response_text = ollama_client.generate(MODEL, prompt, options, timeout=120,
+                                                   stream=streaming.numbered(num_words),
+                                                   budget=output_budget.plan(MODEL, num_words))
 
             translations = {}
             for line in response_text.split('\n'):
@@ -98,6 +97,7 @@ Your {num_words} translations:"""
     return result_map, success_count
 
 
+@cached_batch(MODEL, NUMBERED_PROMPT_VERSION, returns_count=True)
 def translate_verse_batch_robust(arabic_words, full_verse_ar, full_verse_en):
     """
     Translate words using NUMBERED format for validation
@@ -144,23 +144,16 @@ Example:
 
 Your {num_words} translations:"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 400
-        }
+    options = {
+        "temperature": 0.1  # num_predict is sized per batch by output_budget
     }
 
     max_retries = 2  # Try twice max
     for attempt in range(max_retries):
         try:
-            response = requests.post(OLLAMA_API, json=payload, timeout=120)
-            response.raise_for_status()
-            result = response.json()
-            response_text = result.get("response", "").strip()
+            response_text = ollama_client.generate(MODEL, prompt, options, timeout=120,
+                                                   stream=streaming.numbered(num_words),
+                                                   budget=output_budget.plan(MODEL, num_words))
 
             # Parse numbered responses
             translations = {}
@@ -212,25 +205,6 @@ Your {num_words} translations:"""
     return result_map, success_count
 
 
-def extract_words_from_arabic(arabic_text):
-    """
-    Extract individual words from Arabic text, preserving positions
-    Returns list of (word, start_pos, end_pos) tuples
-    """
-    words = []
-    current_pos = 0
-    tokens = re.split(r'(\s+)', arabic_text)
-
-    for token in tokens:
-        if token.strip():
-            start = current_pos
-            end = current_pos + len(token)
-            words.append((token, start, end))
-        current_pos += len(token)
-
-    return words
-
-
 def find_misaligned_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
     """
     Find all verses with missing mappings (misalignment)
@@ -238,93 +212,128 @@ def find_misaligned_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
     """
     misaligned = []
 
-    for book_dir in sorted(Path(mapping_dir).iterdir()):
-        if not book_dir.is_dir():
-            continue
-
-        for chapter_file in sorted(book_dir.glob("*.json")):
-            try:
-                with open(chapter_file, 'r') as f:
-                    data = json.load(f)
-
-                book = data.get("book", book_dir.name)
-                chapter = data.get("chapter", chapter_file.stem)
+    # The manifest re-parses only chapters changed since the last scan
+    for book, chapter, results in scan_manifest.scan(mapping_dir):
+        for verse_num, expected, actual in results["misaligned"]:
+            misaligned.append((book, chapter, verse_num, expected, actual, expected - actual))
 
-                for verse_num, verse_data in data.get("verses", {}).items():
-                    ar_text = verse_data.get("ar", "")
-                    mappings = verse_data.get("mappings", [])
-
-                    expected = count_arabic_words(ar_text)
-                    actual = len(mappings)
-                    diff = expected - actual
+    return misaligned
 
-                    # Flag any verse with missing mappings
-                    if diff > 0:
-                        misaligned.append((book, chapter, verse_num, expected, actual, diff))
-            except Exception as e:
-                print(f"Error reading {chapter_file}: {e}")
 
-    return misaligned
+def read_existing_mappings(book, chapter, verse_num, mapping_dir="bible-maps-word-gemma3/mappings"):
+    """The verse's current mappings ([] if the chapter or verse is not there yet)"""
+    mapping_file = f"{mapping_dir}/{book}/{chapter}.json"
+    if not os.path.exists(mapping_file):
+        return []
+    with open(mapping_file, 'r') as f:
+        output = json.load(f)
+    return output.get("verses", {}).get(verse_num, {}).get("mappings", [])
 
 
-def repair_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-gemma3/mappings"):
+def build_repaired_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-gemma3/mappings"):
     """
-    Repair a single verse by regenerating its mappings
+    Rebuild a single verse's mappings from the source text, keeping every
+    existing translation the alignment can place and translating only the
+    missing words
+    Returns (success, message, verse_data) - verse_data is None on failure
     """
     # Read source verse
     source_file = f"bible-translations/unified/{book}/{chapter}.json"
     if not os.path.exists(source_file):
-        return False, "Source file not found"
+        return False, "Source file not found", None
 
     with open(source_file, 'r') as f:
         source_verses = json.load(f)
 
     if verse_num not in source_verses:
-        return False, "Verse not in source"
+        return False, "Verse not in source", None
 
     verse_data = source_verses[verse_num]
     arabic = verse_data['ar']
     english = verse_data['en']
 
     # Extract words
-    arabic_words_with_pos = extract_words_from_arabic(arabic)
-    filtered_words = [(w, s, e) for w, s, e in arabic_words_with_pos if len(w) >= 3]
+    index = get_token_index()
+    filtered_words = index.mapped_words(book, chapter, verse_num, arabic)
     words_only = [w for w, s, e in filtered_words]
 
-    # Translate with robust method
-    translation_map, success_count = translate_verse_batch_robust(words_only, arabic, english)
-
-    # Build mappings
-    mappings = []
-    for word, start, end in filtered_words:
-        translation = translation_map.get(word)
-        if translation:
-            mappings.append({
-                "ar": word,
-                "en": translation,
-                "start": start,
-                "end": end
-            })
+    # Align against the existing mappings: only the missing words go to the model
+    alignment = align(filtered_words, read_existing_mappings(book, chapter, verse_num, mapping_dir),
+                      keys=index.folded_keys(book, chapter, verse_num, arabic))
+    missing = alignment.missing_words()
+    translation_map = {}
+    if missing:
+        translation_map, success_count = translate_verse_batch_robust(missing, arabic, english)
+
+    mappings = alignment.rebuild(translation_map)
 
     # Validate we got most mappings
     if len(mappings) < len(words_only) * 0.85:
-        return False, f"Only got {len(mappings)}/{len(words_only)} mappings"
-
-    # Update the mapping file
-    mapping_file = f"{mapping_dir}/{book}/{chapter}.json"
-    with open(mapping_file, 'r') as f:
-        output = json.load(f)
+        return False, f"Only got {len(mappings)}/{len(words_only)} mappings ({alignment.summary()})", None
 
-    output["verses"][verse_num] = {
+    verse_output = {
         "ar": arabic,
         "en": english,
         "mappings": mappings
     }
+    return True, f"Repaired {len(mappings)}/{len(words_only)} mappings ({alignment.summary()})", verse_output
 
-    with open(mapping_file, 'w', encoding='utf-8') as f:
+
+def write_repaired_verse(book, chapter, verse_num, verse_output, mapping_dir="bible-maps-word-gemma3/mappings"):
+    """Store one repaired verse in its chapter file"""
+    mapping_file = f"{mapping_dir}/{book}/{chapter}.json"
+    with open(mapping_file, 'r') as f:
+        output = json.load(f)
+
+    output["verses"][verse_num] = verse_output
+
+    # Atomic replace: other verses of this chapter are read while it is written
+    tmp_file = f"{mapping_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, mapping_file)
+
+
+def repair_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-gemma3/mappings"):
+    """
+    Repair a single verse by regenerating its mappings
+    """
+    success, msg, verse_output = build_repaired_verse(book, chapter, verse_num, mapping_dir)
+    if success:
+        write_repaired_verse(book, chapter, verse_num, verse_output, mapping_dir)
+    return success, msg
+
+
+def run_repairs(misaligned, workers=MAX_WORKERS, on_verse=None, mapping_dir="bible-maps-word-gemma3/mappings"):
+    """
+    Repair [(book, chapter, verse_num, expected, actual, diff), ...] as
+    verse-level jobs, most missing words first. Chapter file writes are
+    serialized per chapter by the scheduler.
 
-    return True, f"Repaired {len(mappings)}/{len(words_only)} mappings"
+    on_verse(book, chapter, verse_num, success, msg) is called per verse.
+    Returns the JobScheduler (for its summary).
+    """
+    scheduler = JobScheduler(workers)
+    report_lock = threading.Lock()
+    for book, chapter, verse_num, expected, actual, diff in misaligned:
+        # Weighted by the words that will actually go to the model
+        scheduler.add(diff, (book, str(chapter)), build_repaired_verse, book, str(chapter), verse_num, mapping_dir)
+
+    def commit(group, args, result, error):
+        book, chapter, verse_num, _ = args
+        if error is not None:
+            success, msg = False, str(error)
+        else:
+            success, msg, verse_output = result
+            if success:
+                write_repaired_verse(book, chapter, verse_num, verse_output, mapping_dir)
+        if on_verse:
+            # Commits of different chapters run concurrently
+            with report_lock:
+                on_verse(book, chapter, verse_num, success, msg)
+
+    scheduler.run(on_result=commit)
+    return scheduler
 
 
 def main():
@@ -332,8 +341,12 @@ def main():
     parser = argparse.ArgumentParser(description='Repair misaligned verses')
     parser.add_argument('--test', action='store_true', help='Test mode: only repair first 10 verses')
     parser.add_argument('--min-diff', type=int, default=1, help='Minimum difference to repair (default: 1)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Parallel verse repairs (default: {MAX_WORKERS})')
     args = parser.parse_args()
 
+    # --workers caps the shared client's adaptive in-flight limit
+    ollama_client.configure(max_in_flight=args.workers)
+
     print("="*70)
     print("VERSE ALIGNMENT REPAIR TOOL")
     print("="*70)
@@ -372,28 +385,32 @@ def main():
             return
 
     # Repair verses
-    print(f"\n🔧 Repairing {len(misaligned)} verses...\n")
-
-    success_count = 0
-    fail_count = 0
+    print(f"\n🔧 Repairing {len(misaligned)} verses with {args.workers} workers (most missing words first)...\n")
 
-    for i, (book, chapter, verse_num, expected, actual, diff) in enumerate(misaligned, 1):
-        ref = f"{book} {chapter}:{verse_num}"
-        print(f"[{i}/{len(misaligned)}] {ref} ({actual}/{expected} mappings, {diff} missing)")
-
-        success, msg = repair_verse(book, str(chapter), verse_num)
+    counts = {"done": 0, "success": 0, "fail": 0}
 
+    def report(book, chapter, verse_num, success, msg):
+        counts["done"] += 1
+        print(f"[{counts['done']}/{len(misaligned)}] {book} {chapter}:{verse_num}")
         if success:
-            success_count += 1
+            counts["success"] += 1
             print(f"    ✅ {msg}")
         else:
-            fail_count += 1
+            counts["fail"] += 1
             print(f"    ❌ {msg}")
 
+    scheduler = run_repairs(misaligned, args.workers, on_verse=report)
+    success_count = counts["success"]
+    fail_count = counts["fail"]
+
     print("\n" + "="*70)
     print(f"REPAIR COMPLETE!")
     print(f"  Successful: {success_count}")
     print(f"  Failed:     {fail_count}")
+    print(f"  Scheduler:  {scheduler.summary()}")
+    print(f"  Concurrency: {ollama_client.controller_summary()}")
+    print(f"  Streaming:   {ollama_client.stream_summary()}")
+    print(f"  Output:      {output_budget.summary()}")
     print("="*70)
 
 
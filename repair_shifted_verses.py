@@ -6,38 +6,23 @@ Instead of re-translating everything, find which word is missing and translate o
 
 import json
 import os
-import requests
 import re
 import sys
 from pathlib import Path
 
+from pipeline import ollama_client
+from pipeline.alignment import align
+from pipeline.token_index import get_token_index
+from pipeline.translation_cache import cached_word
+
 sys.stdout.reconfigure(line_buffering=True)
 
-OLLAMA_API = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
-def count_arabic_words(text):
-    """Count words >= 3 chars (same filter as original script)"""
-    tokens = re.split(r'\s+', text)
-    return len([t for t in tokens if len(t.strip()) >= 3])
-
-
-def extract_words_from_arabic(arabic_text):
-    """Extract individual words from Arabic text, preserving positions"""
-    words = []
-    current_pos = 0
-    tokens = re.split(r'(\s+)', arabic_text)
-
-    for token in tokens:
-        if token.strip():
-            start = current_pos
-            end = current_pos + len(token)
-            words.append((token, start, end))
-        current_pos += len(token)
-
-    return words
-
+# Bump when a prompt changes so cached translations are not reused
+WORD_PROMPT_VERSION = "single-word-v1"
 
+@cached_word(MODEL, WORD_PROMPT_VERSION)
 def translate_single_word(arabic_word, full_verse_ar, full_verse_en):
     """Translate a single Arabic word using verse context"""
     prompt = f"""Translate this Arabic word to English using the verse context.
@@ -49,21 +34,13 @@ Word to translate: {arabic_word}
 
 Provide ONLY the English translation (no explanations, no extra text):"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 50  # Single word needs few tokens
-        }
+    options = {
+        "temperature": 0.1,
+        "num_predict": 50  # Single word needs few tokens
     }
 
     try:
-        response = requests.post(OLLAMA_API, json=payload, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        translation = result.get("response", "").strip()
+        translation = ollama_client.generate(MODEL, prompt, options, timeout=30)
 
         # Clean up the translation
         translation = translation.strip('"\'.,!?')
@@ -78,29 +55,6 @@ Provide ONLY the English translation (no explanations, no extra text):"""
         return None
 
 
-def find_missing_word_position(expected_words, existing_mappings):
-    """
-    Find which word position is missing by comparing expected words with existing mappings
-    Returns the index of the missing word, or None if can't determine
-    """
-    if len(existing_mappings) >= len(expected_words):
-        return None  # No missing word
-
-    # Try to find where the shift happened by comparing Arabic words
-    for i in range(len(expected_words)):
-        if i >= len(existing_mappings):
-            return i  # Missing word is at the end
-
-        expected_word = expected_words[i][0]  # (word, start, end)
-        mapping_word = existing_mappings[i]['ar']
-
-        if expected_word != mapping_word:
-            # Found the mismatch - this is likely where the missing word is
-            return i
-
-    return len(existing_mappings)  # Default to end
-
-
 def repair_shifted_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-gemma3/mappings"):
     """
     Fast repair for verses missing exactly 1 word
@@ -122,8 +76,8 @@ def repair_shifted_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-
     english = verse_data['en']
 
     # Extract expected words
-    arabic_words_with_pos = extract_words_from_arabic(arabic)
-    filtered_words = [(w, s, e) for w, s, e in arabic_words_with_pos if len(w) >= 3]
+    index = get_token_index()
+    filtered_words = index.mapped_words(book, chapter, verse_num, arabic)
 
     # Read existing mappings
     mapping_file = f"{mapping_dir}/{book}/{chapter}.json"
@@ -133,46 +87,23 @@ def repair_shifted_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-
     existing_mappings = output["verses"][verse_num]["mappings"]
 
     expected_count = len(filtered_words)
-    actual_count = len(existing_mappings)
-    diff = expected_count - actual_count
 
-    if diff != 1:
-        return False, f"Not a single-word shift (diff={diff})"
+    # Align the existing mappings against the source words
+    alignment = align(filtered_words, existing_mappings,
+                      keys=index.folded_keys(book, chapter, verse_num, arabic))
+    if len(alignment.missing) != 1:
+        return False, f"Not a single missing word ({alignment.summary()})"
 
-    # Find which word is missing
-    missing_pos = find_missing_word_position(filtered_words, existing_mappings)
-    if missing_pos is None:
-        return False, "Could not determine missing word position"
-
-    missing_word, missing_start, missing_end = filtered_words[missing_pos]
+    missing_pos = alignment.missing[0]
+    missing_word = filtered_words[missing_pos][0]
 
     # Translate only the missing word
     translation = translate_single_word(missing_word, arabic, english)
     if not translation:
         return False, "Failed to translate missing word"
 
-    # Build new mappings by inserting the missing word
-    new_mappings = []
-    for i, (word, start, end) in enumerate(filtered_words):
-        if i == missing_pos:
-            # Insert the newly translated word
-            new_mappings.append({
-                "ar": missing_word,
-                "en": translation,
-                "start": missing_start,
-                "end": missing_end
-            })
-        else:
-            # Use existing mapping (might be shifted)
-            existing_idx = i if i < missing_pos else i - 1
-            if existing_idx < len(existing_mappings):
-                # Keep existing translation but update positions
-                new_mappings.append({
-                    "ar": word,
-                    "en": existing_mappings[existing_idx]['en'],
-                    "start": start,
-                    "end": end
-                })
+    # Existing translations are kept (re-positioned); the new word fills its slot
+    new_mappings = alignment.rebuild({missing_word: translation})
 
     # Validate we got all words
     if len(new_mappings) != expected_count:
@@ -188,11 +119,12 @@ def repair_shifted_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-
     with open(mapping_file, 'w', encoding='utf-8') as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
 
-    return True, f"Fixed shift at position {missing_pos}, added: {missing_word} → {translation}"
+    return True, f"Fixed position {missing_pos} ({alignment.summary()}), added: {missing_word} → {translation}"
 
 
 def find_single_shift_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
     """Find verses missing exactly 1 word (candidates for fast repair)"""
+    index = get_token_index()
     single_shifts = []
 
     for book_dir in sorted(Path(mapping_dir).iterdir()):
@@ -211,7 +143,7 @@ def find_single_shift_verses(mapping_dir="bible-maps-word-gemma3/mappings"):
                     ar_text = verse_data.get("ar", "")
                     mappings = verse_data.get("mappings", [])
 
-                    expected = count_arabic_words(ar_text)
+                    expected = index.expected_count(book, chapter, verse_num, ar_text)
                     actual = len(mappings)
                     diff = expected - actual
 
@@ -2,49 +2,47 @@
 """
 GPU-Optimized fast repair for shifted verses (missing exactly 1 word)
 Optimized for Apple M4 with native Ollama GPU acceleration
+
+Verses are repaired a chapter at a time: the missing words of all its
+verses go to the model in packed requests (pipeline/gap_filling.py)
 """
 
 import json
 import os
-import requests
 import re
 import sys
-from pathlib import Path
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
+from pipeline import ollama_client, scan_manifest
+from pipeline.alignment import align
+from pipeline.gap_filling import GapFiller
+from pipeline.token_index import get_token_index
+from pipeline.translation_cache import cached_word, get_cache
+
 sys.stdout.reconfigure(line_buffering=True)
 
-OLLAMA_API = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
+# Bump when a prompt changes so cached translations are not reused
+WORD_PROMPT_VERSION = "single-word-v1"
+
 # GPU-optimized settings for M4 (balanced for 16GB unified memory)
-MAX_WORKERS = 4  # Parallel translations for M4 GPU
-TIMEOUT = 20  # Shorter timeout with GPU acceleration
+MAX_WORKERS = 4  # Ceiling for in-flight requests; the shared AIMD controller adapts below it
+TIMEOUT = 20  # Minimum timeout; stretched automatically when the server is slow
 NUM_PREDICT = 50  # Single word translation
 
-def count_arabic_words(text):
-    """Count words >= 3 chars (same filter as original script)"""
-    tokens = re.split(r'\s+', text)
-    return len([t for t in tokens if len(t.strip()) >= 3])
-
-
-def extract_words_from_arabic(arabic_text):
-    """Extract individual words from Arabic text, preserving positions"""
-    words = []
-    current_pos = 0
-    tokens = re.split(r'(\s+)', arabic_text)
+# Workers repairing verses of the same chapter must not overwrite each other's file
+CHAPTER_LOCKS = {}
+CHAPTER_LOCKS_LOCK = threading.Lock()
 
-    for token in tokens:
-        if token.strip():
-            start = current_pos
-            end = current_pos + len(token)
-            words.append((token, start, end))
-        current_pos += len(token)
-
-    return words
 
+def chapter_lock(mapping_file):
+    with CHAPTER_LOCKS_LOCK:
+        return CHAPTER_LOCKS.setdefault(mapping_file, threading.Lock())
 
+@cached_word(MODEL, WORD_PROMPT_VERSION)
 def translate_single_word(arabic_word, full_verse_ar, full_verse_en):
     """Translate a single Arabic word using verse context - GPU accelerated"""
     prompt = f"""Translate this Arabic word to English using the verse context.
@@ -56,22 +54,14 @@ Word to translate: {arabic_word}
 
 Provide ONLY the English translation (no explanations, no extra text):"""
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": NUM_PREDICT,
-            "num_gpu": 99  # Use all GPU layers
-        }
+    options = {
+        "temperature": 0.1,
+        "num_predict": NUM_PREDICT,
+        "num_gpu": 99  # Use all GPU layers
     }
 
     try:
-        response = requests.post(OLLAMA_API, json=payload, timeout=TIMEOUT)
-        response.raise_for_status()
-        result = response.json()
-        translation = result.get("response", "").strip()
+        translation = ollama_client.generate(MODEL, prompt, options, timeout=TIMEOUT)
 
         # Clean up the translation
         translation = translation.strip('"\'.,!?')
@@ -84,108 +74,93 @@ Provide ONLY the English translation (no explanations, no extra text):"""
         return None
 
 
-def find_missing_word_position(expected_words, existing_mappings):
-    """Find which word position is missing"""
-    if len(existing_mappings) >= len(expected_words):
-        return None
-
-    for i in range(len(expected_words)):
-        if i >= len(existing_mappings):
-            return i
-
-        expected_word = expected_words[i][0]
-        mapping_word = existing_mappings[i]['ar']
+# Missing words of a chapter go out in packed requests (after the translation
+# memory's confident forms); a verse whose packed answer does not validate
+# falls back to translate_single_word per word
+GAP_FILLER = GapFiller(MODEL, fallback=translate_single_word, timeout=TIMEOUT * 2,
+                       options={"temperature": 0.1, "num_gpu": 99}, use_memory=True)
 
-        if expected_word != mapping_word:
-            return i
 
-    return len(existing_mappings)
-
-
-def repair_shifted_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-gemma3/mappings"):
+def repair_chapter_shifts(book, chapter, verse_nums, mapping_dir="bible-maps-word-gemma3/mappings"):
     """
-    Fast repair for verses missing exactly 1 word - GPU accelerated
+    Repair several verses of one chapter - GPU accelerated
+    Every verse is aligned against its source words; the missing words of
+    all of them go to the model together (packed gap filling) and the
+    chapter file is written once.
+    Returns {verse_num: (success, message)}
     """
-    # Read source verse
+    # Read source verses
     source_file = f"bible-translations/unified/{book}/{chapter}.json"
     if not os.path.exists(source_file):
-        return False, "Source file not found"
+        return {v: (False, "Source file not found") for v in verse_nums}
 
     with open(source_file, 'r') as f:
         source_verses = json.load(f)
 
-    if verse_num not in source_verses:
-        return False, "Verse not in source"
-
-    verse_data = source_verses[verse_num]
-    arabic = verse_data['ar']
-    english = verse_data['en']
-
-    # Extract expected words
-    arabic_words_with_pos = extract_words_from_arabic(arabic)
-    filtered_words = [(w, s, e) for w, s, e in arabic_words_with_pos if len(w) >= 3]
-
     # Read existing mappings
     mapping_file = f"{mapping_dir}/{book}/{chapter}.json"
     with open(mapping_file, 'r') as f:
         output = json.load(f)
 
-    existing_mappings = output["verses"][verse_num]["mappings"]
-
-    expected_count = len(filtered_words)
-    actual_count = len(existing_mappings)
-    diff = expected_count - actual_count
-
-    if diff != 1:
-        return False, f"Not a single-word shift (diff={diff})"
-
-    # Find which word is missing
-    missing_pos = find_missing_word_position(filtered_words, existing_mappings)
-    if missing_pos is None:
-        return False, "Could not determine missing word position"
-
-    missing_word, missing_start, missing_end = filtered_words[missing_pos]
-
-    # Translate only the missing word (GPU accelerated)
-    translation = translate_single_word(missing_word, arabic, english)
-    if not translation:
-        return False, "Failed to translate missing word"
-
-    # Build new mappings by inserting the missing word
-    new_mappings = []
-    for i, (word, start, end) in enumerate(filtered_words):
-        if i == missing_pos:
-            new_mappings.append({
-                "ar": missing_word,
-                "en": translation,
-                "start": missing_start,
-                "end": missing_end
-            })
-        else:
-            existing_idx = i if i < missing_pos else i - 1
-            if existing_idx < len(existing_mappings):
-                new_mappings.append({
-                    "ar": word,
-                    "en": existing_mappings[existing_idx]['en'],
-                    "start": start,
-                    "end": end
-                })
-
-    # Validate we got all words
-    if len(new_mappings) != expected_count:
-        return False, f"Mapping count mismatch: {len(new_mappings)}/{expected_count}"
-
-    # Update the mapping file
-    output["verses"][verse_num] = {
-        "ar": arabic,
-        "en": english,
-        "mappings": new_mappings
-    }
+    results = {}
+    alignments = {}
+    gaps = []
+    index = get_token_index()
+    for verse_num in verse_nums:
+        if verse_num not in source_verses:
+            results[verse_num] = (False, "Verse not in source")
+            continue
+        verse_data = source_verses[verse_num]
+
+        # Align the existing mappings against the expected source words
+        filtered_words = index.mapped_words(book, chapter, verse_num, verse_data['ar'])
+        alignment = align(filtered_words, output["verses"][verse_num]["mappings"],
+                          keys=index.folded_keys(book, chapter, verse_num, verse_data['ar']))
+        alignments[verse_num] = alignment
+        if alignment.missing:
+            gaps.append((verse_num, alignment.missing_words(), verse_data['ar'], verse_data['en']))
+
+    # Translate only the missing words, all verses at once
+    translations = GAP_FILLER.fill(gaps)
+
+    repaired = {}
+    for verse_num, alignment in alignments.items():
+        new_mappings = alignment.rebuild(translations.get(verse_num))
+        expected_count = len(alignment.words)
+        if len(new_mappings) != expected_count:
+            results[verse_num] = (False, f"Mapping count mismatch: {len(new_mappings)}/{expected_count} "
+                                         f"({alignment.summary()})")
+            continue
+        repaired[verse_num] = new_mappings
+        added = ", ".join(f"{w} → {translations[verse_num][w]}" for w in alignment.missing_words())
+        results[verse_num] = (True, f"Fixed ({alignment.summary()}), added: {added or 'nothing'}")
+
+    if repaired:
+        # Update the mapping file (re-read under the lock: another job may
+        # have written this chapter while the words were being translated)
+        with chapter_lock(mapping_file):
+            with open(mapping_file, 'r') as f:
+                output = json.load(f)
+
+            for verse_num, new_mappings in repaired.items():
+                output["verses"][verse_num] = {
+                    "ar": source_verses[verse_num]['ar'],
+                    "en": source_verses[verse_num]['en'],
+                    "mappings": new_mappings
+                }
 
-    with open(mapping_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+            # Atomic replace: workers reading the chapter never see a half-written file
+            tmp_file = f"{mapping_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(output, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, mapping_file)
 
-    return True, f"Fixed shift at position {missing_pos}, added: {missing_word} → {translation}"
+    return results
+
+
+def repair_shifted_verse(book, chapter, verse_num, mapping_dir="bible-maps-word-gemma3/mappings"):
+    """Repair a single verse (see repair_chapter_shifts)"""
+    return repair_chapter_shifts(book, chapter, [verse_num], mapping_dir)[verse_num]
 
 
 def find_single_shift_verses(mapping_dir="bible-maps-word-gemma3/mappings", nt_only=False):
@@ -200,48 +175,34 @@ def find_single_shift_verses(mapping_dir="bible-maps-word-gemma3/mappings", nt_o
 
     single_shifts = []
 
-    for book_dir in sorted(Path(mapping_dir).iterdir()):
-        if not book_dir.is_dir():
-            continue
-
-        # Skip OT books if nt_only is True
-        if nt_only and book_dir.name not in nt_books:
-            continue
+    # The manifest re-parses only chapters changed since the last scan
+    books = nt_books if nt_only else None
+    for book, chapter, results in scan_manifest.scan(mapping_dir, books):
+        for verse_num, expected, actual in results["misaligned"]:
+            if expected - actual == 1:
+                single_shifts.append((book, chapter, verse_num, expected, actual))
 
-        for chapter_file in sorted(book_dir.glob("*.json")):
-            try:
-                with open(chapter_file, 'r') as f:
-                    data = json.load(f)
-
-                book = data.get("book", book_dir.name)
-                chapter = data.get("chapter", chapter_file.stem)
-
-                for verse_num, verse_data in data.get("verses", {}).items():
-                    ar_text = verse_data.get("ar", "")
-                    mappings = verse_data.get("mappings", [])
-
-                    expected = count_arabic_words(ar_text)
-                    actual = len(mappings)
-                    diff = expected - actual
+    return single_shifts
 
-                    if diff == 1:
-                        single_shifts.append((book, chapter, verse_num, expected, actual))
-            except Exception as e:
-                print(f"Error reading {chapter_file}: {e}")
 
-    return single_shifts
+def group_by_chapter(verses):
+    """[(book, chapter, verse_num, expected, actual), ...] -> {(book, chapter): [...]}, in order"""
+    chapters = {}
+    for verse in verses:
+        chapters.setdefault((verse[0], str(verse[1])), []).append(verse)
+    return chapters
 
 
-def process_verse_parallel(args):
-    """Wrapper for parallel processing"""
-    i, total, book, chapter, verse_num, expected, actual = args
-    ref = f"{book} {chapter}:{verse_num}"
+def process_chapter_parallel(args):
+    """Wrapper for parallel processing: one chapter's verses in one job"""
+    book, chapter, verses = args
 
     start_time = time.time()
-    success, msg = repair_shifted_verse(book, str(chapter), verse_num)
+    results = repair_chapter_shifts(book, chapter, [verse_num for _, _, verse_num, _, _ in verses])
     elapsed = time.time() - start_time
 
-    return (i, ref, success, msg, elapsed, actual, expected)
+    return [(f"{book} {chapter}:{verse_num}", *results[verse_num], elapsed, actual, expected)
+            for _, _, verse_num, expected, actual in verses]
 
 
 def main():
@@ -252,13 +213,16 @@ def main():
     parser.add_argument('--all', action='store_true', help='Process ALL books (OT + NT). Default: NT only')
     args = parser.parse_args()
 
+    # --workers caps the shared client's adaptive in-flight limit
+    ollama_client.configure(max_in_flight=args.workers)
+
     nt_only = not args.all
 
     print("="*70)
     print("GPU-OPTIMIZED FAST SHIFT REPAIR (Apple M4)")
     print("="*70)
     print(f"Parallel workers: {args.workers}")
-    print(f"Timeout: {TIMEOUT}s")
+    print(f"Timeout: {TIMEOUT}s minimum (adaptive)")
     print(f"Scope: {'New Testament only' if nt_only else 'ALL books (OT + NT)'}")
     print("="*70)
 
@@ -282,33 +246,33 @@ def main():
             print("Cancelled.")
             return
 
-    print(f"\n🔧 Repairing {len(single_shifts)} verses with {args.workers} parallel workers...\n")
+    print(f"\n🔧 Repairing {len(single_shifts)} verses in {len(group_by_chapter(single_shifts))} chapters "
+          f"with {args.workers} parallel workers...\n")
 
     start_total = time.time()
     success_count = 0
     fail_count = 0
 
-    # Prepare tasks
-    tasks = [
-        (i+1, len(single_shifts), book, chapter, verse_num, expected, actual)
-        for i, (book, chapter, verse_num, expected, actual) in enumerate(single_shifts)
-    ]
+    # One job per chapter: its verses' missing words share packed requests
+    chapters = group_by_chapter(single_shifts)
+    tasks = [(book, chapter, verses) for (book, chapter), verses in chapters.items()]
+    done = 0
 
     # Process in parallel
     with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        futures = {executor.submit(process_verse_parallel, task): task for task in tasks}
+        futures = {executor.submit(process_chapter_parallel, task): task for task in tasks}
 
         for future in as_completed(futures):
-            i, ref, success, msg, elapsed, actual, expected = future.result()
-
-            print(f"[{i}/{len(single_shifts)}] {ref} ({actual}/{expected} mappings) - {elapsed:.1f}s")
+            for ref, success, msg, elapsed, actual, expected in future.result():
+                done += 1
+                print(f"[{done}/{len(single_shifts)}] {ref} ({actual}/{expected} mappings) - chapter {elapsed:.1f}s")
 
-            if success:
-                success_count += 1
-                print(f"    ✅ {msg}")
-            else:
-                fail_count += 1
-                print(f"    ❌ {msg}")
+                if success:
+                    success_count += 1
+                    print(f"    ✅ {msg}")
+                else:
+                    fail_count += 1
+                    print(f"    ❌ {msg}")
 
     total_time = time.time() - start_total
     avg_time = total_time / len(single_shifts) if single_shifts else 0
@@ -320,6 +284,9 @@ def main():
     print(f"  Total time: {total_time:.1f}s")
     print(f"  Avg time per verse: {avg_time:.1f}s")
     print(f"  Speed improvement: ~3-5x faster than CPU version!")
+    print(f"  Gap filling: {GAP_FILLER.summary()}")
+    print(f"  Concurrency: {ollama_client.controller_summary()}")
+    print(f"  Translation cache: {get_cache().summary()}")
     print("="*70)
 
 
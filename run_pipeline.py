@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+One entry point for the mapping pipeline: generate, repair, validate
+
+generate and repair queue verse-level jobs on the shared longest-job-first
+scheduler (pipeline/scheduler.py), so a few huge chapters (PSA 119, the
+1CH genealogies) no longer leave workers idle at the end of a run.
+Chapter files are still written one verse at a time per chapter.
+
+Usage:
+    python3 run_pipeline.py generate --books PSA,1CH --workers 4
+    python3 run_pipeline.py repair --min-diff 1 --workers 4
+    python3 run_pipeline.py validate --tree bible-maps-word-gemma3/mappings
+"""
+
+import sys
+import time
+
+from pipeline import ollama_client, output_budget, scan_manifest
+from pipeline.translation_cache import get_cache
+
+# Force unbuffered output for real-time progress updates
+sys.stdout.reconfigure(line_buffering=True)
+
+MAPPING_DIR = "bible-maps-word-gemma3/mappings"
+MAX_WORKERS = 4
+
+
+def parse_books(value):
+    return [b.strip().upper() for b in value.split(',')] if value else None
+
+
+def cmd_generate(args):
+    import regenerate_mappings_gpu as generate
+
+    generate.USE_TRANSLATION_MEMORY = not args.no_memory
+    generate.USE_PACKING = not args.no_pack
+
+    books = parse_books(args.books)
+    chapters = [
+        (book, chapter)
+        for book, num_chapters in generate.get_all_bible_chapters()
+        if not books or book in books
+        for chapter in range(1, num_chapters + 1)
+    ]
+    if not chapters:
+        print("❌ No books found to process")
+        return 1
+
+    print(f"🚀 Generating {len(chapters)} chapters with {args.workers} workers (longest verse first)...\n")
+    done = [0]
+
+    def report(chapter_output):
+        done[0] += 1
+        print(f"✅ [{done[0]}/{len(chapters)}] {chapter_output.book} {chapter_output.chapter} "
+              f"({len(chapter_output.output['verses'])}/{len(chapter_output.source_verses)} verses)")
+
+    scheduler = generate.run_generation(chapters, args.workers, on_chapter_done=report)
+    print(f"\nScheduler: {scheduler.summary()}")
+    if generate.USE_PACKING:
+        print(f"Request packing: {generate.pack_summary()}")
+    return 0
+
+
+def cmd_repair(args):
+    import repair_misaligned_verses as repair
+
+    books = parse_books(args.books)
+    misaligned = [
+        m for m in repair.find_misaligned_verses(args.tree)
+        if m[5] >= args.min_diff and (not books or m[0] in books)
+    ]
+    if not misaligned:
+        print("✅ No misaligned verses found!")
+        return 0
+
+    print(f"🔧 Repairing {len(misaligned)} verses with {args.workers} workers (longest first)...\n")
+    counts = {"done": 0, "success": 0}
+
+    def report(book, chapter, verse_num, success, msg):
+        counts["done"] += 1
+        counts["success"] += success
+        print(f"{'✅' if success else '❌'} [{counts['done']}/{len(misaligned)}] {book} {chapter}:{verse_num} - {msg}")
+
+    scheduler = repair.run_repairs(misaligned, args.workers, on_verse=report, mapping_dir=args.tree)
+    print(f"\nRepaired {counts['success']}/{len(misaligned)} verses")
+    print(f"Scheduler: {scheduler.summary()}")
+    return 0 if counts["success"] == len(misaligned) else 1
+
+
+def cmd_validate(args):
+    books = parse_books(args.books)
+    manifest = scan_manifest.ScanManifest()
+    chapters = list(manifest.scan(args.tree, books))
+
+    totals = {"misaligned": 0, "empty_translations": 0, "position_mismatches": 0, "corrupted": 0}
+    for book, chapter, results in chapters:
+        for field in ("misaligned", "empty_translations", "position_mismatches"):
+            totals[field] += len(results[field])
+        totals["corrupted"] += results["corrupted"]
+
+    print(f"🔍 {args.tree}: {len(chapters)} chapters ({manifest.summary()})")
+    print(f"  Misaligned verses:   {totals['misaligned']}")
+    print(f"  Empty translations:  {totals['empty_translations']}")
+    print(f"  Position mismatches: {totals['position_mismatches']}")
+    print(f"  Corrupted chapters:  {totals['corrupted']}")
+    return 1 if any(totals.values()) else 0
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Bible word mapping pipeline')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help='Generate missing mappings')
+    generate.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    generate.add_argument('--workers', type=int, default=MAX_WORKERS,
+                          help=f'Parallel verse jobs (default: {MAX_WORKERS})')
+    generate.add_argument('--no-memory', action='store_true',
+                          help='Send every word to the model instead of reusing known glosses')
+    generate.add_argument('--no-pack', action='store_true',
+                          help='One request per verse instead of packing short verses together')
+
+    repair = subparsers.add_parser('repair', help='Regenerate verses with missing mappings')
+    repair.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    repair.add_argument('--tree', default=MAPPING_DIR, help=f'Mapping tree (default: {MAPPING_DIR})')
+    repair.add_argument('--min-diff', type=int, default=1, help='Minimum missing mappings (default: 1)')
+    repair.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Parallel verse jobs (default: {MAX_WORKERS})')
+
+    validate = subparsers.add_parser('validate', help='Report mapping issues (incremental scan)')
+    validate.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    validate.add_argument('--tree', default=MAPPING_DIR, help=f'Mapping tree (default: {MAPPING_DIR})')
+
+    args = parser.parse_args()
+
+    if hasattr(args, 'workers'):
+        # --workers caps the shared client's adaptive in-flight limit
+        ollama_client.configure(max_in_flight=args.workers)
+
+    start = time.time()
+    status = {"generate": cmd_generate, "repair": cmd_repair, "validate": cmd_validate}[args.command](args)
+    print(f"\n⏱️  {time.time() - start:.1f}s")
+    if args.command != "validate":
+        print(f"Concurrency: {ollama_client.controller_summary()}")
+        print(f"Streaming: {ollama_client.stream_summary()}")
+        print(f"Output budget: {output_budget.summary()}")
+        print(f"Translation cache: {get_cache().summary()}")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,16 +17,21 @@ Usage:
 import json
 import re
 import sys
-import requests
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import ollama_client
+from pipeline.translation_cache import cached_word
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
+# Bump when a prompt changes so cached translations are not reused
+WORD_PROMPT_VERSION = "single-word-short-v1"
+
 NT_BOOKS = [
     "MAT", "MRK", "LUK", "JHN", "ACT", "ROM", "1CO", "2CO",
     "GAL", "EPH", "PHP", "COL", "1TH", "2TH", "1TI", "2TI",
@@ -121,6 +126,7 @@ def detect_issues(verse_data):
 # FIX FUNCTIONS
 # ============================================================================
 
+@cached_word(MODEL, WORD_PROMPT_VERSION)
 def translate_word_with_ollama(arabic_word, verse_ar, verse_en):
     """Use Ollama to translate a single word with verse context."""
     prompt = f"""Translate this Arabic word to English using verse context.
@@ -133,17 +139,10 @@ Arabic word: {arabic_word}
 Reply with ONLY the English translation (1-3 words), nothing else:"""
 
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0,
-                "num_predict": 50
-            }
+        translation = ollama_client.generate(MODEL, prompt, {
+            "temperature": 0,
+            "num_predict": 50
         }, timeout=60)
-
-        translation = response.json().get("response", "").strip()
         # Clean up response
         translation = translation.strip('"\'.,!?')
         translation = re.sub(r'^(Translation:\s*|TRANSLATION:\s*)', '', translation, flags=re.IGNORECASE).strip()
@@ -4,19 +4,21 @@ Fetch all 150 chapters of Psalms and create proper chapter files.
 """
 
 import json
-import urllib.request
+import sys
 import urllib.parse
 from pathlib import Path
 
-ARB_BASE = "https://raw.githubusercontent.com/wldeh/bible-api/main/bibles/arb-kehm/books"
-WEB_BASE = "https://raw.githubusercontent.com/wldeh/bible-api/main/bibles/en-web/books"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import source_mirror
+
+ARB_BASE = source_mirror.EDITIONS["arb-kehm"].base_url
+WEB_BASE = f"{source_mirror.WLDEH}/en-web/books"
 UNIFIED_DIR = Path("./bible-translations/unified/PSA")
 
 def fetch_json(url, timeout=30):
     """Fetch JSON from URL."""
     try:
-        with urllib.request.urlopen(url, timeout=timeout) as response:
-            return json.loads(response.read().decode('utf-8'))
+        return source_mirror.fetch_json(url, timeout=timeout)
     except Exception as e:
         print(f"  ERROR: {e}")
         return None
@@ -33,6 +35,14 @@ def main():
     total_chapters = 150
     failed = []
 
+    # Mirror both editions' 150 chapters in one concurrent pass; the loop
+    # below then reads them from disk
+    source_mirror.get_mirror().download([
+        url for chapter in range(1, total_chapters + 1)
+        for url in (f"{ARB_BASE}/{urllib.parse.quote('مزمور')}/chapters/{chapter}.json",
+                    f"{WEB_BASE}/psalms/chapters/{chapter}.json")
+    ])
+
     for chapter in range(1, total_chapters + 1):
         print(f"[{chapter}/{total_chapters}] Fetching Psalm {chapter}...", end=" ", flush=True)
 
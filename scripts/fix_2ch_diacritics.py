@@ -6,27 +6,11 @@ This script strips the final diacritics from mappings to match the source text.
 """
 
 import json
+import sys
 from pathlib import Path
-import re
-
-# Arabic diacritics that appear at the end of words
-FINAL_DIACRITICS = [
-    '\u064E',  # فتحة (fatha) - a
-    '\u064F',  # ضمة (damma) - u
-    '\u0650',  # كسرة (kasra) - i
-    '\u0651',  # شدة (shadda)
-    '\u0652',  # سكون (sukun)
-]
-
-def strip_final_diacritics(text):
-    """Remove final diacritics from Arabic word."""
-    if not text:
-        return text
-
-    # Keep removing final diacritics until we hit a consonant
-    while text and text[-1] in FINAL_DIACRITICS:
-        text = text[:-1]
-    return text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline.normalization import FINAL_DIACRITICS, strip_final_diacritics
 
 def fix_2ch_mappings():
     """Fix all 2CH mapping files."""
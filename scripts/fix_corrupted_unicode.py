@@ -6,82 +6,20 @@ Downloads correct Arabic text from source repository and replaces corrupted text
 
 import json
 import os
-import urllib.request
+import urllib.error
 import urllib.parse
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import source_mirror
+from pipeline.corruption import corrupted_files, has_corruption
+
 # Mapping of English book codes to Arabic folder names in the source repository
-BOOK_MAPPING = {
-    "GEN": "التكوين",
-    "EXO": "الخروج",
-    "LEV": "اللاويين",
-    "NUM": "العدد",
-    "DEU": "التثنية",
-    "JOS": "يشوع",
-    "JDG": "القضاة",
-    "RUT": "راعوث",
-    "1SA": "صموئيلالأول",
-    "2SA": "صموئيلالثاني",
-    "1KI": "ملوكالأول",
-    "2KI": "ملوكالثاني",
-    "1CH": "أخبارالأيامالأول",
-    "2CH": "أخبارالأيامالثاني",
-    "EZR": "عزرا",
-    "NEH": "نحميا",
-    "EST": "أستير",
-    "JOB": "أيوب",
-    "PSA": "مزمور",
-    "PRO": "الأمثال",
-    "ECC": "الجامعة",
-    "SNG": "نشيدالأنشاد",
-    "ISA": "إشعياء",
-    "JER": "إرميا",
-    "LAM": "مراثيإرميا",
-    "EZK": "حزقيال",
-    "DAN": "دانيال",
-    "HOS": "هوشع",
-    "JOL": "يوئيل",
-    "AMO": "عاموس",
-    "OBA": "عوبديا",
-    "JON": "يونان",
-    "MIC": "ميخا",
-    "NAM": "ناحوم",
-    "HAB": "حبقوق",
-    "ZEP": "صفنيا",
-    "HAG": "حجي",
-    "ZEC": "زكريا",
-    "MAL": "ملاخي",
-    "MAT": "إنجيلمتى",
-    "MRK": "إنجيلمرقس",
-    "LUK": "إنجيللوقا",
-    "JHN": "إنجيليوحنا",
-    "ACT": "أعمال",
-    "ROM": "روما",
-    "1CO": "كورنثوسالأولى",
-    "2CO": "كورنثوسالثانية",
-    "GAL": "غلاطية",
-    "EPH": "أفسس",
-    "PHP": "فيلبي",
-    "COL": "كولوسي",
-    "1TH": "تسالونيكيالأولى",
-    "2TH": "تسالونيكيالثانية",
-    "1TI": "تيموثاوسالأولى",
-    "2TI": "تيموثاوسالثانية",
-    "TIT": "تيطس",
-    "PHM": "فليمون",
-    "HEB": "العبرانيين",
-    "JAS": "يعقوب",
-    "1PE": "بطرسالأولى",
-    "2PE": "بطرسالثانية",
-    "1JN": "يوحناالأولى",
-    "2JN": "يوحناالثانية",
-    "3JN": "يوحناالثالثة",
-    "JUD": "يهوذا",
-    "REV": "رؤيايوحنا"
-}
-
-BASE_URL = "https://raw.githubusercontent.com/wldeh/bible-api/main/bibles/arb-kehm/books"
+BOOK_MAPPING = source_mirror.ARABIC_BOOKS
+
+EDITION = source_mirror.EDITIONS["arb-kehm"]
+BASE_URL = EDITION.base_url
 
 def fetch_chapter(book_code, chapter_num):
     """Fetch a chapter from the source repository."""
@@ -95,9 +33,7 @@ def fetch_chapter(book_code, chapter_num):
     url = f"{BASE_URL}/{encoded_book}/chapters/{chapter_num}.json"
 
     try:
-        with urllib.request.urlopen(url, timeout=30) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            return data
+        return source_mirror.fetch_json(url, timeout=30)
     except urllib.error.HTTPError as e:
         print(f"  ERROR: HTTP {e.code} fetching {book_code} chapter {chapter_num}")
         return None
@@ -105,10 +41,6 @@ def fetch_chapter(book_code, chapter_num):
         print(f"  ERROR: {e} fetching {book_code} chapter {chapter_num}")
         return None
 
-def has_corruption(text):
-    """Check if text contains Unicode replacement character."""
-    return '\ufffd' in text or '�' in text
-
 def fix_chapter_file(file_path):
     """Fix corrupted Unicode in a single chapter file."""
     # Extract book code and chapter number from path
@@ -165,6 +97,11 @@ def main():
     # Get all book directories
     book_dirs = sorted([d for d in base_dir.iterdir() if d.is_dir()])
 
+    # One byte-level scan for chapters with damaged Arabic, and one concurrent
+    # mirror of their source chapters (fix_chapter_file then reads from disk)
+    damaged = corrupted_files(base_dir, fields=["ar"])
+    source_mirror.get_mirror().download([EDITION.url(f.parts[-2], f.stem) for f in damaged if f.parts[-2] in BOOK_MAPPING])
+
     total_files_fixed = 0
     total_verses_fixed = 0
     failed_files = []
@@ -175,8 +112,7 @@ def main():
             print(f"Skipping unknown book: {book_code}")
             continue
 
-        # Get all chapter files
-        chapter_files = sorted(book_dir.glob("*.json"), key=lambda x: int(x.stem))
+        chapter_files = [f for f in damaged if f.parts[-2] == book_code]
 
         book_fixes = 0
         for chapter_file in chapter_files:
@@ -4,44 +4,19 @@ Fix corrupted Unicode in English text (curly quotes, apostrophes).
 """
 
 import json
-import urllib.request
+import sys
 import urllib.parse
 from pathlib import Path
 
-BOOK_MAPPING = {
-    "GEN": "Genesis", "EXO": "Exodus", "LEV": "Leviticus", "NUM": "Numbers",
-    "DEU": "Deuteronomy", "JOS": "Joshua", "JDG": "Judges", "RUT": "Ruth",
-    "1SA": "1 Samuel", "2SA": "2 Samuel", "1KI": "1 Kings", "2KI": "2 Kings",
-    "1CH": "1 Chronicles", "2CH": "2 Chronicles", "EZR": "Ezra", "NEH": "Nehemiah",
-    "EST": "Esther", "JOB": "Job", "PSA": "Psalm", "PRO": "Proverbs",
-    "ECC": "Ecclesiastes", "SNG": "Song Of Solomon", "ISA": "Isaiah", "JER": "Jeremiah",
-    "LAM": "Lamentations", "EZK": "Ezekiel", "DAN": "Daniel", "HOS": "Hosea",
-    "JOL": "Joel", "AMO": "Amos", "OBA": "Obadiah", "JON": "Jonah",
-    "MIC": "Micah", "NAM": "Nahum", "HAB": "Habakkuk", "ZEP": "Zephaniah",
-    "HAG": "Haggai", "ZEC": "Zechariah", "MAL": "Malachi", "MAT": "Matthew",
-    "MRK": "Mark", "LUK": "Luke", "JHN": "John", "ACT": "Acts",
-    "ROM": "Romans", "1CO": "1 Corinthians", "2CO": "2 Corinthians", "GAL": "Galatians",
-    "EPH": "Ephesians", "PHP": "Philippians", "COL": "Colossians",
-    "1TH": "1 Thessalonians", "2TH": "2 Thessalonians", "1TI": "1 Timothy",
-    "2TI": "2 Timothy", "TIT": "Titus", "PHM": "Philemon", "HEB": "Hebrews",
-    "JAS": "James", "1PE": "1 Peter", "2PE": "2 Peter", "1JN": "1 John",
-    "2JN": "2 John", "3JN": "3 John", "JUD": "Jude", "REV": "Revelation"
-}
-
-BASE_URL = "https://raw.githubusercontent.com/wldeh/bible-api/main/bibles/en-niv/books"
-UNIFIED_DIR = Path("./bible-translations/unified")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import source_mirror
+from pipeline.corruption import corrupted_files, has_corruption
 
-def has_corruption(text):
-    """Check for corruption in text."""
-    try:
-        encoded = text.encode('utf-8')
-        if b'\xef\xbf\xbd' in encoded:
-            return True
-        if '\ufffd' in text:
-            return True
-    except:
-        pass
-    return False
+BOOK_MAPPING = source_mirror.ENGLISH_BOOKS
+
+EDITION = source_mirror.EDITIONS["en-niv"]
+BASE_URL = EDITION.base_url
+UNIFIED_DIR = Path("./bible-translations/unified")
 
 def fetch_chapter(book_code, chapter_num):
     """Fetch English chapter from NIV source."""
@@ -53,8 +28,7 @@ def fetch_chapter(book_code, chapter_num):
     url = f"{BASE_URL}/{encoded_book}/chapters/{chapter_num}.json"
 
     try:
-        with urllib.request.urlopen(url, timeout=30) as response:
-            return json.loads(response.read().decode('utf-8'))
+        return source_mirror.fetch_json(url, timeout=30)
     except Exception as e:
         print(f"  ERROR fetching {book_code} {chapter_num}: {e}")
         return None
@@ -115,22 +89,20 @@ def fix_chapter(file_path):
 def main():
     print("Fixing corrupted English text...\n")
 
-    # List of known corrupted files from grep output
-    corrupted_files = [
-        "2CO/1.json", "MAT/2.json", "MAT/8.json", "LEV/4.json",
-        "DEU/2.json", "JHN/3.json", "NUM/9.json", "GEN/30.json",
-        "REV/19.json", "GAL/5.json", "2SA/7.json", "2SA/10.json"
-    ]
+    # Chapters with damaged English, from a byte-level scan (was a hard-coded grep list)
+    damaged = corrupted_files(UNIFIED_DIR, fields=["en"])
+
+    # Mirror all their source chapters at once; fix_chapter then reads from disk
+    source_mirror.get_mirror().download([EDITION.url(f.parts[-2], f.stem) for f in damaged if f.parts[-2] in BOOK_MAPPING])
 
     total_fixed = 0
     failed = []
 
-    for i, rel_path in enumerate(corrupted_files, 1):
-        file_path = UNIFIED_DIR / rel_path
-        book_code = rel_path.split('/')[0]
-        chapter_num = rel_path.split('/')[1].replace('.json', '')
+    for i, file_path in enumerate(damaged, 1):
+        book_code = file_path.parts[-2]
+        chapter_num = file_path.stem
 
-        print(f"[{i}/{len(corrupted_files)}] Fixing {book_code} {chapter_num}...", end=" ", flush=True)
+        print(f"[{i}/{len(damaged)}] Fixing {book_code} {chapter_num}...", end=" ", flush=True)
 
         result = fix_chapter(file_path)
         if result > 0:
@@ -143,7 +115,7 @@ def main():
             failed.append(f"{book_code} {chapter_num}")
 
     print(f"\n=== SUMMARY ===")
-    print(f"Total files processed: {len(corrupted_files)}")
+    print(f"Total files processed: {len(damaged)}")
     print(f"Total verses fixed: {total_fixed}")
     if failed:
         print(f"Failed: {', '.join(failed)}")
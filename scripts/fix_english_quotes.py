@@ -5,8 +5,12 @@ Replace corrupted Unicode sequences with straight quotes/apostrophes.
 """
 
 import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline.corruption import corrupted_files, has_corruption
+
 UNIFIED_DIR = Path("./bible-translations/unified")
 
 def fix_corruption(text):
@@ -29,28 +33,19 @@ def fix_corruption(text):
 
     return result
 
-def has_corruption(text):
-    """Check for corruption."""
-    return '\ufffd' in text or '�' in text
-
 def main():
     print("Fixing corrupted English quotes/apostrophes...\n")
 
-    # List of known corrupted files
-    corrupted_files = [
-        "2CO/1.json", "MAT/2.json", "MAT/8.json", "LEV/4.json",
-        "DEU/2.json", "JHN/3.json", "NUM/9.json", "GEN/30.json",
-        "REV/19.json", "GAL/5.json", "2SA/7.json", "2SA/10.json"
-    ]
+    # Chapters with damaged English, from a byte-level scan (was a hard-coded grep list)
+    damaged = corrupted_files(UNIFIED_DIR, fields=["en"])
 
     total_fixed = 0
 
-    for i, rel_path in enumerate(corrupted_files, 1):
-        file_path = UNIFIED_DIR / rel_path
-        book_code = rel_path.split('/')[0]
-        chapter_num = rel_path.split('/')[1].replace('.json', '')
+    for i, file_path in enumerate(damaged, 1):
+        book_code = file_path.parts[-2]
+        chapter_num = file_path.stem
 
-        print(f"[{i}/{len(corrupted_files)}] Fixing {book_code} {chapter_num}...", end=" ", flush=True)
+        print(f"[{i}/{len(damaged)}] Fixing {book_code} {chapter_num}...", end=" ", flush=True)
 
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -79,13 +74,12 @@ def main():
     # Verify
     print("\nVerifying no corruption remains...")
     remaining = 0
-    for rel_path in corrupted_files:
-        file_path = UNIFIED_DIR / rel_path
-        with open(file_path, 'r', encoding='utf-8') as f:
+    for file_path in damaged:
+        with open(file_path, 'rb') as f:
             content = f.read()
         if has_corruption(content):
             remaining += 1
-            print(f"  Still corrupted: {rel_path}")
+            print(f"  Still corrupted: {file_path.relative_to(UNIFIED_DIR)}")
 
     if remaining == 0:
         print("  All corruption fixed!")
@@ -4,15 +4,15 @@ Fix corrupted text in mapping files by pulling from cleaned unified files.
 """
 
 import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline.corruption import corrupted_files, has_corruption
+
 UNIFIED_DIR = Path("./bible-translations/unified")
 MAPPINGS_DIR = Path("./bible-translations/mappings")
 
-def has_corruption(text):
-    """Check for corruption."""
-    return '\ufffd' in text or '�' in text
-
 def fix_mapping_file(mapping_path):
     """Fix a single mapping file by pulling text from unified source."""
     parts = mapping_path.parts
@@ -70,17 +70,8 @@ def fix_mapping_file(mapping_path):
 def main():
     print("Fixing corrupted mapping files...\n")
 
-    # Find all corrupted mapping files
-    corrupted = []
-    for book_dir in sorted(MAPPINGS_DIR.iterdir()):
-        if not book_dir.is_dir():
-            continue
-
-        for mapping_file in sorted([f for f in book_dir.glob("*.json") if f.stem.isdigit()], key=lambda x: int(x.stem)):
-            with open(mapping_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            if has_corruption(content):
-                corrupted.append(mapping_file)
+    # Find all corrupted mapping files (byte-level scan, see pipeline/corruption.py)
+    corrupted = corrupted_files(MAPPINGS_DIR)
 
     print(f"Found {len(corrupted)} mapping files with corruption.\n")
 
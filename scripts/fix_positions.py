@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Recompute mapping start/end positions from the source word offsets
+
+Replaces fix_mapping_positions.py, fix_all_position_mismatches.py,
+fix_nt_positions.py and add_missing_positions.py. Those each walked their
+own list of books one chapter at a time and searched for every word with
+ar_text.find() from a moving cursor. Here every verse is fixed in one
+linear pass over its precomputed word offsets (pipeline/token_index.py):
+mappings and source words are both in verse order, so a single cursor
+advances through the words as the mappings are matched.
+
+A mapping is matched to the next source word with the same folded key
+(pipeline/normalization.py: harakat, hamza forms, tatweel and punctuation
+ignored); the keys of the source words come precomputed from the token
+index, and each verse's keys are grouped into sorted position lists, so
+the next match is one bisect. Fixes are counted per type:
+
+    added      start/end were missing
+    moved      the word was found at a different position
+    respelled  the word only matched once folded: its ar is replaced with
+               the source spelling
+    unfixable  no matching word left in the verse (left unchanged)
+
+Only chapters the mmap corpus reports a position mismatch in are loaded
+(a missing start/end counts as a mismatch), or, with --issues, the
+chapters a current validation issue table (pipeline/validation.py) lists
+position mismatches for. Chapters are processed by a pool of worker
+processes.
+
+Usage:
+    python3 scripts/fix_positions.py                   # All books, bible-translations/mappings
+    python3 scripts/fix_positions.py --books MAT,ROM --dry-run
+    python3 scripts/fix_positions.py --tree bible-maps-word-gemma3/mappings --workers 8
+    python3 scripts/fix_positions.py --issues cache/validation_issues.json
+"""
+
+import bisect
+import json
+import os
+import sys
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import normalization, validation
+from pipeline.mmap_corpus import open_corpus
+from pipeline.token_index import get_token_index
+
+DEFAULT_TREE = "bible-translations/mappings"
+FIX_TYPES = ["added", "moved", "respelled", "unfixable"]
+
+PUNCTUATION = normalization.PUNCTUATION + ' '
+
+
+def same_word(word, ar_word):
+    """ar_word is the source word, possibly without its trailing punctuation"""
+    return word.startswith(ar_word) and not word[len(ar_word):].strip(PUNCTUATION)
+
+
+def fix_verse_positions(mappings, ar_text, words, keys, counts):
+    """
+    Assign start/end (and, for respelled words, ar) to a verse's mappings
+    words: [(word, start, end)] of ar_text, in order; keys: fold() of each word
+    Updates mappings in place and adds to counts; returns the unfixable indexes
+    """
+    starts = [word_start for _, word_start, _ in words]
+    positions = normalization.key_positions(keys)
+    unfixable = []
+    cursor = 0  # Next source word a mapping may claim; never moves back
+
+    for i, m in enumerate(mappings):
+        ar_word = m.get("ar", "")
+        start, end = m.get("start"), m.get("end")
+        has_span = isinstance(start, int) and isinstance(end, int)
+
+        # A correct span at or past the cursor stays (an earlier, unmapped
+        # occurrence of the same word must not capture it)
+        cursor_pos = starts[cursor] if cursor < len(words) else len(ar_text)
+        if has_span and 0 <= start and start >= cursor_pos and ar_text[start:end] == ar_word:
+            cursor = bisect.bisect_left(starts, end)
+            continue
+
+        candidates = positions.get(normalization.fold(ar_word), ())
+        k = bisect.bisect_left(candidates, cursor)
+        if k == len(candidates):
+            unfixable.append(i)
+            counts["unfixable"] += 1
+            continue
+
+        found = candidates[k]
+        word, word_start, _ = words[found]
+        cursor = found + 1
+        if same_word(word, ar_word):
+            new_ar = ar_word
+        else:
+            new_ar = word.rstrip(PUNCTUATION) or word
+        new_start, new_end = word_start, word_start + len(new_ar)
+
+        if not has_span:
+            counts["added"] += 1
+        elif new_ar != ar_word:
+            counts["respelled"] += 1
+        else:
+            counts["moved"] += 1
+        m["ar"], m["start"], m["end"] = new_ar, new_start, new_end
+
+    return unfixable
+
+
+def fix_chapter(args):
+    """Pool worker: fix one chapter file; returns (book, chapter, counts, unfixable)"""
+    tree, book, chapter, dry_run = args
+    chapter_file = Path(tree) / book / f"{chapter}.json"
+    with open(chapter_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    index = get_token_index()
+    counts = dict.fromkeys(FIX_TYPES, 0)
+    unfixable = []
+    for verse_num, verse_data in data.get("verses", {}).items():
+        ar_text = verse_data.get("ar", "")
+        words = index.mapped_words(book, chapter, verse_num, ar_text, min_length=1)
+        keys = index.folded_keys(book, chapter, verse_num, ar_text, min_length=1)
+        for i in fix_verse_positions(verse_data.get("mappings", []), ar_text, words, keys, counts):
+            unfixable.append((verse_num, verse_data["mappings"][i].get("ar", "")))
+
+    fixed = sum(counts[t] for t in FIX_TYPES if t != "unfixable")
+    if fixed and not dry_run:
+        tmp_file = chapter_file.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, chapter_file)
+
+    return book, chapter, counts, unfixable
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Recompute mapping positions from the source word offsets')
+    parser.add_argument('--tree', default=DEFAULT_TREE, help=f'Mapping tree (default: {DEFAULT_TREE})')
+    parser.add_argument('--books', type=str, help='Comma-separated book codes (default: all)')
+    parser.add_argument('--workers', type=int, default=min(8, cpu_count()),
+                        help='Worker processes (default: CPU count, max 8)')
+    parser.add_argument('--dry-run', action='store_true', help='Count fixes without writing')
+    parser.add_argument('--show', type=int, default=10, help='Unfixable mappings to print (default: 10)')
+    parser.add_argument('--issues', type=str,
+                        help='Validation issue table to take chapters from (instead of scanning)')
+    args = parser.parse_args()
+
+    books = [b.strip().upper() for b in args.books.split(',')] if args.books else None
+
+    print("="*70)
+    print("MAPPING POSITION REPAIR")
+    print(f"  Tree:    {args.tree}")
+    print(f"  Books:   {', '.join(books) if books else 'all'}")
+    print(f"  Workers: {args.workers}")
+    if args.dry_run:
+        print("  DRY RUN - nothing is written")
+    print("="*70)
+
+    start = time.time()
+    chapters = None
+    if args.issues:
+        table = validation.load_issue_table(args.issues)
+        if validation.is_current(table, args.tree):
+            chapters = sorted(validation.issue_chapters(table, ["position_mismatch"], books))
+        else:
+            print(f"\n⚠️  {args.issues} is not current for {args.tree} - scanning instead")
+    if chapters is None:
+        with open_corpus(args.tree) as corpus:
+            chapters = sorted(corpus.mismatched_chapters(books))
+    print(f"\n🔍 {len(chapters)} chapters with position mismatches ({time.time() - start:.1f}s)")
+    if not chapters:
+        print("\n✅ All positions are correct")
+        return
+
+    # Build/refresh the token index once before the workers each load it
+    get_token_index()
+
+    totals = dict.fromkeys(FIX_TYPES, 0)
+    by_book = {}
+    unfixable = []
+    tasks = [(args.tree, book, chapter, args.dry_run) for book, chapter in chapters]
+    with Pool(processes=args.workers) as pool:
+        for book, chapter, counts, chapter_unfixable in pool.imap_unordered(fix_chapter, tasks):
+            book_counts = by_book.setdefault(book, dict.fromkeys(FIX_TYPES, 0))
+            for fix_type, count in counts.items():
+                book_counts[fix_type] += count
+                totals[fix_type] += count
+            unfixable.extend((book, chapter, verse, word) for verse, word in chapter_unfixable)
+
+    action = "Would fix" if args.dry_run else "Fixed"
+    print(f"\n{'book':<6} " + " ".join(f"{t:>10}" for t in FIX_TYPES))
+    for book in sorted(by_book):
+        print(f"{book:<6} " + " ".join(f"{by_book[book][t]:>10}" for t in FIX_TYPES))
+    print(f"{'total':<6} " + " ".join(f"{totals[t]:>10}" for t in FIX_TYPES))
+
+    fixed = sum(totals[t] for t in FIX_TYPES if t != "unfixable")
+    print(f"\n{action} {fixed} positions in {len(chapters)} chapters ({time.time() - start:.1f}s)")
+
+    if unfixable:
+        print(f"\n⚠️  Unfixable mappings ({len(unfixable)}):")
+        for book, chapter, verse, word in sorted(unfixable)[:args.show]:
+            print(f"  {book} {chapter}:{verse} - '{word}' not found")
+        if len(unfixable) > args.show:
+            print(f"  ... and {len(unfixable) - args.show} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,64 +5,20 @@ Uses Python for better Unicode handling.
 """
 
 import json
+import sys
 import os
-import urllib.request
 import urllib.parse
 from pathlib import Path
 
-BOOK_MAPPING = {
-    "GEN": "التكوين", "EXO": "الخروج", "LEV": "اللاويين", "NUM": "العدد",
-    "DEU": "التثنية", "JOS": "يشوع", "JDG": "القضاة", "RUT": "راعوث",
-    "1SA": "صموئيلالأول", "2SA": "صموئيلالثاني", "1KI": "ملوكالأول",
-    "2KI": "ملوكالثاني", "1CH": "أخبارالأيامالأول", "2CH": "أخبارالأيامالثاني",
-    "EZR": "عزرا", "NEH": "نحميا", "EST": "أستير", "JOB": "أيوب",
-    "PSA": "مزمور", "PRO": "الأمثال", "ECC": "الجامعة", "SNG": "نشيدالأنشاد",
-    "ISA": "إشعياء", "JER": "إرميا", "LAM": "مراثيإرميا", "EZK": "حزقيال",
-    "DAN": "دانيال", "HOS": "هوشع", "JOL": "يوئيل", "AMO": "عاموس",
-    "OBA": "عوبديا", "JON": "يونان", "MIC": "ميخا", "NAM": "ناحوم",
-    "HAB": "حبقوق", "ZEP": "صفنيا", "HAG": "حجي", "ZEC": "زكريا",
-    "MAL": "ملاخي", "MAT": "إنجيلمتى", "MRK": "إنجيلمرقس", "LUK": "إنجيللوقا",
-    "JHN": "إنجيليوحنا", "ACT": "أعمال", "ROM": "روما", "1CO": "كورنثوسالأولى",
-    "2CO": "كورنثوسالثانية", "GAL": "غلاطية", "EPH": "أفسس", "PHP": "فيلبي",
-    "COL": "كولوسي", "1TH": "تسالونيكيالأولى", "2TH": "تسالونيكيالثانية",
-    "1TI": "تيموثاوسالأولى", "2TI": "تيموثاوسالثانية", "TIT": "تيطس",
-    "PHM": "فليمون", "HEB": "العبرانيين", "JAS": "يعقوب", "1PE": "بطرسالأولى",
-    "2PE": "بطرسالثانية", "1JN": "يوحناالأولى", "2JN": "يوحناالثانية",
-    "3JN": "يوحناالثالثة", "JUD": "يهوذا", "REV": "رؤيايوحنا"
-}
-
-BASE_URL = "https://raw.githubusercontent.com/wldeh/bible-api/main/bibles/arb-kehm/books"
-UNIFIED_DIR = Path("./bible-translations/unified")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import source_mirror
+from pipeline.corruption import corrupted_files, has_corruption
 
-def has_corruption(text):
-    """Check for the actual byte pattern of corruption."""
-    # Check for the actual bytes that represent corruption
-    try:
-        # Encode to bytes and look for the replacement character pattern
-        encoded = text.encode('utf-8')
-        # The corruption shows as EF BF BD (UTF-8 for U+FFFD)
-        if b'\xef\xbf\xbd' in encoded:
-            return True
-        # Also check if '�' character is literally in the string
-        if '\ufffd' in text:
-            return True
-        # Check for incomplete UTF-8 sequences (often show as EF BF followed by something else)
-        if b'\xef\xbf' in encoded:
-            # Check if it's NOT part of a valid character
-            idx = 0
-            while idx < len(encoded):
-                if encoded[idx:idx+2] == b'\xef\xbf':
-                    # This could be part of corruption
-                    if idx + 2 < len(encoded):
-                        third_byte = encoded[idx + 2]
-                        # Valid EF BF XX sequences are limited (e.g., U+FFFx)
-                        # But most corruption shows as EF BF BD or truncated
-                        if third_byte == 0xbd:  # This is the replacement char
-                            return True
-                idx += 1
-    except:
-        pass
-    return False
+BOOK_MAPPING = source_mirror.ARABIC_BOOKS
+
+EDITION = source_mirror.EDITIONS["arb-kehm"]
+BASE_URL = EDITION.base_url
+UNIFIED_DIR = Path("./bible-translations/unified")
 
 def fetch_chapter(book_code, chapter_num):
     """Fetch chapter from source."""
@@ -74,8 +30,7 @@ def fetch_chapter(book_code, chapter_num):
     url = f"{BASE_URL}/{encoded_book}/chapters/{chapter_num}.json"
 
     try:
-        with urllib.request.urlopen(url, timeout=30) as response:
-            return json.loads(response.read().decode('utf-8'))
+        return source_mirror.fetch_json(url, timeout=30)
     except Exception as e:
         print(f"  ERROR fetching {book_code} {chapter_num}: {e}")
         return None
@@ -128,20 +83,9 @@ def fix_chapter(file_path):
 def main():
     print("Scanning for corrupted Unicode (Python version)...\n")
 
-    # Find all corrupted chapters
-    corrupted = []
-    for book_dir in sorted(UNIFIED_DIR.iterdir()):
-        if not book_dir.is_dir():
-            continue
-        book_code = book_dir.name
-        if book_code not in BOOK_MAPPING:
-            continue
-
-        for chapter_file in sorted([f for f in book_dir.glob("*.json") if f.stem.isdigit()], key=lambda x: int(x.stem)):
-            with open(chapter_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            if has_corruption(content):
-                corrupted.append(chapter_file)
+    # Find all corrupted chapters (byte-level scan, see pipeline/corruption.py)
+    corrupted = [f for f in corrupted_files(UNIFIED_DIR, fields=["ar", "json"])
+                 if f.parts[-2] in BOOK_MAPPING]
 
     print(f"Found {len(corrupted)} chapters with corrupted text.\n")
 
@@ -149,6 +93,9 @@ def main():
         print("No corruption found!")
         return
 
+    # Mirror all their source chapters at once; fix_chapter then reads from disk
+    source_mirror.get_mirror().download([EDITION.url(f.parts[-2], f.stem) for f in corrupted if f.parts[-2] in BOOK_MAPPING])
+
     total_fixed = 0
     failed = []
 
@@ -7,6 +7,9 @@ import json
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import validation
+
 def find_gaps(verse_data):
     """Find all unmapped gaps in a verse."""
     ar_text = verse_data['ar']
@@ -152,8 +155,8 @@ def fix_chapter(chapter_path, dry_run=False):
 
     return total_fixed, placeholder_count
 
-def fix_book(book_code, dry_run=False):
-    """Fix all gaps in a book."""
+def fix_book(book_code, dry_run=False, chapters=None):
+    """Fix all gaps in a book (only the given chapter numbers, if any)."""
     mappings_dir = Path("bible-translations/mappings")
     book_path = mappings_dir / book_code
 
@@ -168,6 +171,8 @@ def fix_book(book_code, dry_run=False):
 
     for chapter_file in sorted(book_path.glob("*.json"), key=lambda x: int(x.stem)):
         chapter_num = chapter_file.stem
+        if chapters is not None and int(chapter_num) not in chapters:
+            continue
         fixed, placeholders = fix_chapter(chapter_file, dry_run)
 
         if fixed > 0:
@@ -192,6 +197,7 @@ def main():
         print("  python fix_unmapped_gaps.py <BOOK>           # Fix a book")
         print("  python fix_unmapped_gaps.py <BOOK> --dry-run # Preview fixes")
         print("  python fix_unmapped_gaps.py --all            # Fix all books")
+        print("  python fix_unmapped_gaps.py --issues [PATH]  # Fix the chapters an issue table lists")
         print("\nExample:")
         print("  python fix_unmapped_gaps.py MAT")
         print("  python fix_unmapped_gaps.py --all")
@@ -199,7 +205,21 @@ def main():
 
     dry_run = "--dry-run" in sys.argv
 
-    if sys.argv[1] == "--all":
+    if sys.argv[1] == "--issues":
+        # Chapters from validate_mappings.py --table, instead of rescanning every book
+        path = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else validation.ISSUES_PATH
+        table = validation.load_issue_table(path)
+        if not validation.is_current(table, "bible-translations/mappings"):
+            print(f"Error: {path} is out of date - rerun validate_mappings.py --table")
+            sys.exit(1)
+        by_book = {}
+        for book, chapter in validation.issue_chapters(table, ["unmapped_gap", "unmapped_end"]):
+            by_book.setdefault(book, set()).add(chapter)
+
+        print(f"Fixing gaps in {sum(len(c) for c in by_book.values())} chapters of {len(by_book)} books")
+        for book in sorted(by_book):
+            fix_book(book, dry_run, by_book[book])
+    elif sys.argv[1] == "--all":
         mappings_dir = Path("bible-translations/mappings")
         books = sorted([d.name for d in mappings_dir.iterdir() if d.is_dir()])
         # Exclude LUK and JHN as requested
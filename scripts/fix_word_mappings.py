@@ -4,58 +4,66 @@ Fix corrupted word mappings by matching against clean verse text.
 """
 
 import json
+import sys
 import re
 from pathlib import Path
 
-MAPPINGS_DIR = Path("./bible-translations/mappings")
-
-def has_corruption(text):
-    return '\ufffd' in text or '�' in text
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline.corruption import corrupted_files, has_corruption
+from pipeline.normalization import fold, fold_all
+from pipeline.token_index import get_token_index
 
-def find_matching_word(corrupted_word, verse_text):
-    """Find the word in verse_text that matches the corrupted word pattern."""
-    # Remove the corruption character to get a pattern
-    # e.g., "شَرِك��ةٍ" -> "شَرِك" + "ةٍ"
+MAPPINGS_DIR = Path("./bible-translations/mappings")
 
+def contains_in_order(key, parts):
+    """True if the parts occur in key in order, without overlapping"""
+    pos = 0
+    for part in parts:
+        pos = key.find(part, pos)
+        if pos == -1:
+            return False
+        pos += len(part)
+    return True
+
+def find_matching_word(corrupted_word, words, keys=None):
+    """
+    Find the verse word that matches the corrupted word pattern.
+    e.g., "شَرِك��ةٍ" -> parts "شرك", "ة" -> the verse word folding to "شركة"
+
+    Parts and verse words are compared by folded key (pipeline/normalization.py),
+    so a part whose harakat or hamza differ from the verse spelling still matches.
+    words: the verse's words, in order; keys: their folded keys, if precomputed
+    """
     # Split around the corruption
-    parts = re.split(r'[\ufffd�]+', corrupted_word)
+    parts = fold_all(re.split(r'\ufffd+', corrupted_word))
     parts = [p for p in parts if p]  # Remove empty strings
 
     if not parts:
         return None
 
-    # Build a regex pattern to match the word
-    # Look for a word that contains these parts in order
-    if len(parts) == 1:
-        # Single part - look for word containing this
-        pattern = re.compile(r'\b\S*' + re.escape(parts[0]) + r'\S*\b')
-    else:
-        # Multiple parts - look for word with these parts
-        pattern_str = r'\S*'.join(re.escape(p) for p in parts)
-        pattern = re.compile(r'\b' + pattern_str + r'\b')
+    keys = keys or fold_all(words)
 
-    matches = pattern.findall(verse_text)
+    # A word containing the parts in order; ends that were not corrupted must line up
+    anchored_start = not corrupted_word.startswith('\ufffd')
+    anchored_end = not corrupted_word.endswith('\ufffd')
+    matches = [
+        word for word, key in zip(words, keys)
+        if contains_in_order(key, parts)
+        and (not anchored_start or key.startswith(parts[0]))
+        and (not anchored_end or key.endswith(parts[-1]))
+    ]
 
     if matches:
         # Return the match that's closest in length to the corrupted word
-        corrupted_len = len(corrupted_word)
-        best_match = min(matches, key=lambda x: abs(len(x) - corrupted_len))
-        return best_match
+        corrupted_len = len(fold(corrupted_word))
+        return min(matches, key=lambda w: abs(len(fold(w)) - corrupted_len))
 
-    # Try a more lenient approach - find words with most matching characters
-    verse_words = verse_text.split()
-
-    # Count how many characters from the corrupted word appear in each verse word
+    # Lenient fallback - the word sharing the most characters with the parts
     best_word = None
     best_score = 0
 
-    for word in verse_words:
-        # Simple scoring: count consecutive matching characters
-        score = 0
-        for part in parts:
-            if part in word:
-                score += len(part)
-
+    for word, key in zip(words, keys):
+        score = sum(len(part) for part in parts if part in key)
         if score > best_score:
             best_score = score
             best_word = word
@@ -76,18 +84,27 @@ def fix_mapping_file(mapping_path):
     if 'verses' not in data:
         return 0
 
+    index = get_token_index()
+    book, chapter = Path(mapping_path).parent.name, Path(mapping_path).stem
+
     for verse_num, verse_data in data['verses'].items():
         ar_verse = verse_data.get('ar', '')
 
         if 'mappings' not in verse_data:
             continue
 
+        words = None
         for mapping in verse_data['mappings']:
             ar_word = mapping.get('ar', '')
 
             if has_corruption(ar_word):
+                if words is None:
+                    # Verse words and their folded keys, from the token index when it matches
+                    words = [w for w, _, _ in index.mapped_words(book, chapter, verse_num, ar_verse, min_length=1)]
+                    keys = index.folded_keys(book, chapter, verse_num, ar_verse, min_length=1)
+
                 # Try to find the correct word from the verse
-                fixed_word = find_matching_word(ar_word, ar_verse)
+                fixed_word = find_matching_word(ar_word, words, keys)
 
                 if fixed_word and not has_corruption(fixed_word):
                     mapping['ar'] = fixed_word
@@ -102,29 +119,19 @@ def fix_mapping_file(mapping_path):
 def main():
     print("Fixing corrupted word mappings...\n")
 
-    # Find all files with corruption
-    corrupted_files = []
-    for book_dir in sorted(MAPPINGS_DIR.iterdir()):
-        if not book_dir.is_dir():
-            continue
-
-        for mapping_file in sorted([f for f in book_dir.glob("*.json") if f.stem.isdigit()],
-                                   key=lambda x: int(x.stem)):
-            with open(mapping_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            if has_corruption(content):
-                corrupted_files.append(mapping_file)
+    # Find all files with corruption (byte-level scan, see pipeline/corruption.py)
+    damaged = corrupted_files(MAPPINGS_DIR)
 
-    print(f"Found {len(corrupted_files)} files with corruption.\n")
+    print(f"Found {len(damaged)} files with corruption.\n")
 
     total_fixed = 0
     still_corrupted = []
 
-    for i, file_path in enumerate(corrupted_files, 1):
+    for i, file_path in enumerate(damaged, 1):
         book_code = file_path.parts[-2]
         chapter_num = file_path.stem
 
-        print(f"[{i}/{len(corrupted_files)}] Fixing {book_code} {chapter_num}...", end=" ", flush=True)
+        print(f"[{i}/{len(damaged)}] Fixing {book_code} {chapter_num}...", end=" ", flush=True)
 
         fixed = fix_mapping_file(file_path)
 
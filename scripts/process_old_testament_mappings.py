@@ -6,7 +6,7 @@ This script orchestrates the complete pipeline for creating and validating
 Bible word mappings for the entire Old Testament (39 books).
 
 PHASE-BASED ARCHITECTURE for parallel processing:
-  Phase 1: Create all missing mappings (4 parallel workers)
+  Phase 1: Create all missing mappings (4 parallel workers, verse-level jobs)
   Phase 2: Fix missing word mappings (sequential)
   Phase 3: Fix "translate" placeholders (sequential)
   Phase 4: Quality checks - second-to-last word (sequential)
@@ -16,28 +16,33 @@ Uses direct Ollama GPU API for maximum speed.
 
 import json
 import re
-import requests
 import sys
 import threading
 import termios
 import tty
 import select
 import time
-import warnings
 from pathlib import Path
 from multiprocessing import Pool, cpu_count
 from functools import partial
 
-# Suppress urllib3 OpenSSL warnings from worker processes
-warnings.filterwarnings('ignore', message='.*urllib3.*OpenSSL.*')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import ollama_client, output_budget, streaming
+from pipeline.gap_filling import GapFiller
+from pipeline.scheduler import JobScheduler
+from pipeline.tokenizer import count_arabic_words, mapped_words
+from pipeline.translation_cache import cached_batch, cached_word
 
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
-NUM_WORKERS = 4  # Parallel workers for Phase 1
+
+# Bump when a prompt changes so cached translations are not reused
+NUMBERED_PROMPT_VERSION = "numbered-v1"
+WORD_PROMPT_VERSION = "single-word-short-v1"
+NUM_WORKERS = 4  # Parallel workers (Phase 1 runs verse-level jobs)
 
 # Old Testament books (39 books)
 OT_BOOKS = [
@@ -116,6 +121,7 @@ def check_pause():
 # CORE MAPPING FUNCTIONS
 # ============================================================================
 
+@cached_batch(MODEL, NUMBERED_PROMPT_VERSION)
 def translate_chunk_numbered(arabic_words, full_verse_ar, full_verse_en, chunk_idx):
     """
     Translate a chunk of words using NUMBERED format for alignment.
@@ -138,18 +144,12 @@ Format: NUMBER. TRANSLATION
 Your {num_words} translations:"""
 
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.1,
-                "num_predict": 400,
-                "num_ctx": 4096
-            }
-        }, timeout=180)
-
-        result = response.json().get("response", "").strip()
+        # num_predict is sized per chunk by output_budget
+        result = ollama_client.generate(MODEL, prompt, {
+            "temperature": 0.1,
+            "num_ctx": 4096
+        }, timeout=180, stream=streaming.numbered(num_words),
+            budget=output_budget.plan(MODEL, num_words))
 
         # Parse numbered responses
         translations = {}
@@ -180,17 +180,8 @@ def create_verse_mappings(arabic_verse, english_verse):
     Create mappings for a verse using numbered chunked approach.
     Splits verses >20 words into even chunks for better accuracy.
     """
-    # Extract words with positions
-    words_with_pos = []
-    current_pos = 0
-    for token in re.split(r'(\s+)', arabic_verse):
-        if token.strip():
-            start = current_pos
-            end = current_pos + len(token)
-            # Filter: only words >= 3 chars
-            if len(token) >= 3:
-                words_with_pos.append((token, start, end))
-        current_pos += len(token)
+    # Words >= 3 chars, with positions
+    words_with_pos = mapped_words(arabic_verse)
 
     words_only = [w for w, s, e in words_with_pos]
     num_words = len(words_only)
@@ -234,71 +225,37 @@ def create_verse_mappings(arabic_verse, english_verse):
 # PHASE 1: CREATE MISSING MAPPINGS (PARALLEL)
 # ============================================================================
 
-def create_chapter_mappings_worker(args):
-    """
-    Worker function to create mappings for a single chapter.
-    Designed to run in parallel.
-    """
-    book, chapter = args
-    unified_file = UNIFIED_DIR / book / f"{chapter}.json"
-    mappings_file = MAPPINGS_DIR / book / f"{chapter}.json"
-
-    if not unified_file.exists():
-        return (book, chapter, "ERROR", "Unified file missing")
+def count_mapped_words(arabic_verse):
+    """Words >= 3 chars in a verse - the scheduler's job weight"""
+    return count_arabic_words(arabic_verse)
 
-    if mappings_file.exists():
-        return (book, chapter, "SKIP", "Already exists")
 
-    try:
-        # Load unified chapter
-        with open(unified_file, 'r') as f:
-            verses = json.load(f)
+def create_verse_mappings_job(book, chapter, verse_num, verse):
+    """Scheduler job: mappings for one verse (None if nothing could be mapped)"""
+    return create_verse_mappings(verse['ar'], verse['en'])
 
-        # Create mappings for each verse
-        result_verses = {}
-        verse_count = 0
 
-        for verse_num in sorted(verses.keys(), key=int):
-            verse = verses[verse_num]
-            ar_text = verse['ar']
-            en_text = verse['en']
-
-            mappings = create_verse_mappings(ar_text, en_text)
-
-            if mappings:
-                result_verses[verse_num] = {
-                    "ar": ar_text,
-                    "en": en_text,
-                    "mappings": mappings
-                }
-                verse_count += 1
-
-        # Save chapter
-        if result_verses:
-            MAPPINGS_DIR.mkdir(parents=True, exist_ok=True)
-            (MAPPINGS_DIR / book).mkdir(parents=True, exist_ok=True)
-
-            with open(mappings_file, 'w') as f:
-                json.dump({
-                    "book": book,
-                    "chapter": chapter,
-                    "verses": result_verses
-                }, f, ensure_ascii=False, indent=2)
-
-            return (book, chapter, "SUCCESS", f"{verse_count} verses")
-        else:
-            return (book, chapter, "ERROR", "No mappings created")
+def write_chapter_mappings(book, chapter, result_verses):
+    """Save a finished chapter, verses in numeric order"""
+    mappings_file = MAPPINGS_DIR / book / f"{chapter}.json"
+    (MAPPINGS_DIR / book).mkdir(parents=True, exist_ok=True)
 
-    except Exception as e:
-        return (book, chapter, "ERROR", str(e))
+    with open(mappings_file, 'w') as f:
+        json.dump({
+            "book": book,
+            "chapter": chapter,
+            "verses": {v: result_verses[v] for v in sorted(result_verses, key=int)}
+        }, f, ensure_ascii=False, indent=2)
 
 
 def phase1_create_all_mappings(books_to_process):
     """
-    Phase 1: Create all missing chapter mappings using parallel workers.
+    Phase 1: Create all missing chapter mappings.
+    Every verse is its own job on the longest-job-first scheduler, so long
+    chapters are spread over all workers instead of pinning one.
     """
     print("\n" + "="*70)
-    print("PHASE 1: Creating Missing Mappings (4 parallel workers)")
+    print(f"PHASE 1: Creating Missing Mappings ({NUM_WORKERS} parallel workers, verse-level)")
     print("="*70)
 
     # Build list of (book, chapter) tuples that need creation
@@ -318,28 +275,60 @@ def phase1_create_all_mappings(books_to_process):
 
     print(f"Creating mappings for {len(chapters_to_create)} chapters...\n")
 
-    # Process in parallel
-    with Pool(processes=NUM_WORKERS) as pool:
-        results = []
-        for i, result in enumerate(pool.imap_unordered(create_chapter_mappings_worker, chapters_to_create)):
-            book, chapter, status, message = result
+    scheduler = JobScheduler(NUM_WORKERS)
+    chapter_verses = {}
+    results = []
 
-            # Progress indicator
-            progress = (i + 1) / len(chapters_to_create) * 100
+    for book, chapter in chapters_to_create:
+        unified_file = UNIFIED_DIR / book / f"{chapter}.json"
+        if not unified_file.exists():
+            results.append((book, chapter, "ERROR", "Unified file missing"))
+            print(f"✗ {book} {chapter:3d} - Unified file missing")
+            continue
+
+        with open(unified_file, 'r') as f:
+            verses = json.load(f)
 
-            if status == "SUCCESS":
-                print(f"[{progress:5.1f}%] ✓ {book} {chapter:3d} - {message}")
-            elif status == "ERROR":
-                print(f"[{progress:5.1f}%] ✗ {book} {chapter:3d} - {message}")
-            elif status == "SKIP":
-                print(f"[{progress:5.1f}%] → {book} {chapter:3d} - {message}")
+        chapter_verses[(book, chapter)] = {}
+        for verse_num, verse in verses.items():
+            scheduler.add(count_mapped_words(verse['ar']), (book, chapter),
+                          create_verse_mappings_job, book, chapter, verse_num, verse)
+
+    def commit(group, args, mappings, error):
+        book, chapter, verse_num, verse = args
+        if mappings:
+            chapter_verses[group][verse_num] = {
+                "ar": verse['ar'],
+                "en": verse['en'],
+                "mappings": mappings
+            }
 
+    def chapter_done(group):
+        book, chapter = group
+        result_verses = chapter_verses.pop(group)
+        try:
+            if result_verses:
+                write_chapter_mappings(book, chapter, result_verses)
+                result = (book, chapter, "SUCCESS", f"{len(result_verses)} verses")
+            else:
+                result = (book, chapter, "ERROR", "No mappings created")
+        except Exception as e:
+            result = (book, chapter, "ERROR", str(e))
+
+        with results_lock:
             results.append(result)
+            # Progress indicator
+            progress = len(results) / len(chapters_to_create) * 100
+            marker = "✓" if result[2] == "SUCCESS" else "✗"
+            print(f"[{progress:5.1f}%] {marker} {book} {chapter:3d} - {result[3]}")
+
+    results_lock = threading.Lock()
+    scheduler.run(on_result=commit, on_group_done=chapter_done)
 
     # Summary
     success = sum(1 for _, _, s, _ in results if s == "SUCCESS")
     errors = sum(1 for _, _, s, _ in results if s == "ERROR")
-    print(f"\nPhase 1 Complete: {success} created, {errors} errors")
+    print(f"\nPhase 1 Complete: {success} created, {errors} errors ({scheduler.summary()})")
 
 
 # ============================================================================
@@ -358,80 +347,68 @@ def find_missing_words(verse_data):
             mapped_ranges.add(pos)
 
     # Find unmapped words (>=3 chars)
-    missing = []
-    current_pos = 0
-    for token in re.split(r'(\s+)', ar_text):
-        if token.strip():
-            start = current_pos
-            end = current_pos + len(token)
-
-            is_mapped = any(pos in mapped_ranges for pos in range(start, end))
-
-            if not is_mapped and len(token) >= 3:
-                missing.append((token, start, end))
-
-        current_pos += len(token)
-
-    return missing
+    return [(token, start, end) for token, start, end in mapped_words(ar_text)
+            if not any(pos in mapped_ranges for pos in range(start, end))]
 
 
-def fix_single_missing_word(word, verse_data):
+@cached_word(MODEL, WORD_PROMPT_VERSION)
+def fix_single_missing_word(word, verse_ar, verse_en):
     """Translate a single missing word using context."""
     prompt = f"""Translate this Arabic word to English using verse context.
 
-Arabic verse: {verse_data['ar']}
-English verse: {verse_data['en']}
+Arabic verse: {verse_ar}
+English verse: {verse_en}
 
 Arabic word: {word}
 
 Reply with ONLY the English translation (1-3 words):"""
 
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0, "num_predict": 50}
-        }, timeout=60)
-
-        translation = response.json().get("response", "").strip()
+        translation = ollama_client.generate(MODEL, prompt, {"temperature": 0, "num_predict": 50}, timeout=60)
         translation = translation.strip('"\'.,!?')
         return translation if translation else None
     except:
         return None
 
 
-def fix_missing_mappings_in_verse(verse_data):
-    """Fix missing word mappings in a verse."""
-    missing = find_missing_words(verse_data)
+# Missing words of a whole chapter the translation memory cannot gloss go out
+# in packed requests; a verse whose packed answer does not validate falls back
+# to one request per word
+GAP_FILLER = GapFiller(MODEL, fallback=fix_single_missing_word, timeout=60,
+                       options={"temperature": 0}, use_memory=True)
 
-    if not missing:
-        return 0
 
-    if len(missing) == 1:
-        # Single word: just translate and insert
-        word, start, end = missing[0]
-        translation = fix_single_missing_word(word, verse_data)
+def fix_missing_mappings_in_chapter(verses):
+    """Fix missing word mappings in all verses of a chapter; returns the number of words added"""
+    missing = {}
+    gaps = []
+    for verse_num, verse_data in verses.items():
+        verse_missing = find_missing_words(verse_data)
+        if verse_missing:
+            missing[verse_num] = verse_missing
+            gaps.append((verse_num, [w for w, s, e in verse_missing], verse_data['ar'], verse_data['en']))
 
-        if translation:
-            verse_data['mappings'].append({
-                "ar": word,
-                "en": translation,
-                "start": start,
-                "end": end
-            })
-            verse_data['mappings'].sort(key=lambda x: x['start'])
-            return 1
+    if not gaps:
         return 0
 
-    # Multiple missing: regenerate entire verse
-    new_mappings = create_verse_mappings(verse_data['ar'], verse_data['en'])
+    translations = GAP_FILLER.fill(gaps)
 
-    if new_mappings:
-        verse_data['mappings'] = new_mappings
-        return len(missing)
+    fixed = 0
+    for verse_num, verse_missing in missing.items():
+        verse_data = verses[verse_num]
+        for word, start, end in verse_missing:
+            translation = translations[verse_num].get(word)
+            if translation:
+                verse_data['mappings'].append({
+                    "ar": word,
+                    "en": translation,
+                    "start": start,
+                    "end": end
+                })
+                fixed += 1
+        verse_data['mappings'].sort(key=lambda x: x['start'])
 
-    return 0
+    return fixed
 
 
 def fix_missing_words_worker(args):
@@ -446,11 +423,7 @@ def fix_missing_words_worker(args):
         with open(mappings_file, 'r') as f:
             data = json.load(f)
 
-        chapter_fixed = 0
-        for verse_num in sorted(data.get('verses', {}).keys(), key=int):
-            verse_data = data['verses'][verse_num]
-            fixed = fix_missing_mappings_in_verse(verse_data)
-            chapter_fixed += fixed
+        chapter_fixed = fix_missing_mappings_in_chapter(data.get('verses', {}))
 
         if chapter_fixed > 0:
             with open(mappings_file, 'w') as f:
@@ -589,14 +562,7 @@ English: {english_translation}
 Answer ONLY "YES" or "NO". YES if the translation is valid or close. NO only if it's clearly wrong."""
 
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0}
-        }, timeout=60)
-
-        result = response.json().get("response", "").strip().upper()
+        result = ollama_client.generate(MODEL, prompt, {"temperature": 0}, timeout=60).upper()
         return "YES" in result
     except Exception as e:
         return None
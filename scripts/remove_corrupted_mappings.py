@@ -4,27 +4,19 @@ Remove mapping files that still have corruption so they can be regenerated.
 """
 
 import json
+import sys
 from pathlib import Path
 
-MAPPINGS_DIR = Path("./bible-translations/mappings")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline.corruption import corrupted_files
 
-def has_corruption(text):
-    """Check for corruption."""
-    return '\ufffd' in text or '�' in text
+MAPPINGS_DIR = Path("./bible-translations/mappings")
 
 def main():
     print("Finding mapping files with remaining corruption...\n")
 
-    corrupted = []
-    for book_dir in sorted(MAPPINGS_DIR.iterdir()):
-        if not book_dir.is_dir():
-            continue
-
-        for mapping_file in sorted([f for f in book_dir.glob("*.json") if f.stem.isdigit()], key=lambda x: int(x.stem)):
-            with open(mapping_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            if has_corruption(content):
-                corrupted.append(mapping_file)
+    # Byte-level scan, see pipeline/corruption.py
+    corrupted = corrupted_files(MAPPINGS_DIR)
 
     print(f"Found {len(corrupted)} mapping files with corruption:\n")
 
@@ -4,39 +4,25 @@ Replace English text with NIV from jadenzaleski/bible-translations repo.
 """
 
 import json
-import urllib.request
+import sys
+import urllib.parse
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import source_mirror
+
 UNIFIED_DIR = Path("./bible-translations/unified")
-BASE_URL = "https://raw.githubusercontent.com/jadenzaleski/bible-translations/master/NIV/NIV_books"
+EDITION = source_mirror.EDITIONS["niv-books"]
+BASE_URL = EDITION.base_url
 
 # Map our book codes to NIV file names
-BOOK_MAPPING = {
-    "GEN": "Genesis", "EXO": "Exodus", "LEV": "Leviticus", "NUM": "Numbers",
-    "DEU": "Deuteronomy", "JOS": "Joshua", "JDG": "Judges", "RUT": "Ruth",
-    "1SA": "1 Samuel", "2SA": "2 Samuel", "1KI": "1 Kings", "2KI": "2 Kings",
-    "1CH": "1 Chronicles", "2CH": "2 Chronicles", "EZR": "Ezra", "NEH": "Nehemiah",
-    "EST": "Esther", "JOB": "Job", "PSA": "Psalm", "PRO": "Proverbs",
-    "ECC": "Ecclesiastes", "SNG": "Song of Solomon", "ISA": "Isaiah", "JER": "Jeremiah",
-    "LAM": "Lamentations", "EZK": "Ezekiel", "DAN": "Daniel", "HOS": "Hosea",
-    "JOL": "Joel", "AMO": "Amos", "OBA": "Obadiah", "JON": "Jonah",
-    "MIC": "Micah", "NAM": "Nahum", "HAB": "Habakkuk", "ZEP": "Zephaniah",
-    "HAG": "Haggai", "ZEC": "Zechariah", "MAL": "Malachi", "MAT": "Matthew",
-    "MRK": "Mark", "LUK": "Luke", "JHN": "John", "ACT": "Acts",
-    "ROM": "Romans", "1CO": "1 Corinthians", "2CO": "2 Corinthians", "GAL": "Galatians",
-    "EPH": "Ephesians", "PHP": "Philippians", "COL": "Colossians",
-    "1TH": "1 Thessalonians", "2TH": "2 Thessalonians", "1TI": "1 Timothy",
-    "2TI": "2 Timothy", "TIT": "Titus", "PHM": "Philemon", "HEB": "Hebrews",
-    "JAS": "James", "1PE": "1 Peter", "2PE": "2 Peter", "1JN": "1 John",
-    "2JN": "2 John", "3JN": "3 John", "JUD": "Jude", "REV": "Revelation"
-}
+BOOK_MAPPING = source_mirror.NIV_BOOKS
 
 def fetch_niv_book(book_name):
     """Fetch NIV book from GitHub."""
-    url = f"{BASE_URL}/{urllib.request.quote(book_name)}.json"
+    url = f"{BASE_URL}/{urllib.parse.quote(book_name)}.json"
     try:
-        with urllib.request.urlopen(url, timeout=60) as response:
-            return json.loads(response.read().decode('utf-8'))
+        return source_mirror.fetch_json(url, timeout=60)
     except Exception as e:
         print(f"  ERROR fetching {book_name}: {e}")
         return None
@@ -93,6 +79,9 @@ def process_book(book_code):
 def main():
     print("Replacing English text with NIV translation...\n")
 
+    # All 66 book files in one concurrent pass; process_book then reads from disk
+    source_mirror.get_mirror().download(EDITION.urls())
+
     total_chapters = 0
     failed_books = []
 
@@ -4,17 +4,19 @@ Replace just Psalms English text with NIV.
 """
 
 import json
-import urllib.request
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import source_mirror
+
 UNIFIED_DIR = Path("./bible-translations/unified/PSA")
-URL = "https://raw.githubusercontent.com/jadenzaleski/bible-translations/master/NIV/NIV_books/Psalm.json"
+URL = source_mirror.EDITIONS["niv-books"].url("PSA")
 
 def main():
     print("Fetching NIV Psalms...", end=" ", flush=True)
 
-    with urllib.request.urlopen(URL, timeout=60) as response:
-        niv_data = json.loads(response.read().decode('utf-8'))
+    niv_data = source_mirror.fetch_json(URL, timeout=60)
 
     print("done")
 
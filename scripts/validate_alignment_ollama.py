@@ -7,7 +7,6 @@ Can auto-fix by regenerating misaligned verses.
 
 import json
 import re
-import requests
 import sys
 import threading
 import termios
@@ -15,6 +14,11 @@ import tty
 import select
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import ollama_client, output_budget, streaming
+from pipeline.tokenizer import mapped_words
+from pipeline.translation_cache import cached_batch
+
 # Global pause state
 paused = False
 pause_lock = threading.Lock()
@@ -55,9 +59,13 @@ def check_pause():
         import time
         time.sleep(0.2)
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "gemma3:12b"
 
+# Bump when a prompt changes so cached translations are not reused
+NUMBERED_PROMPT_VERSION = "numbered-v1"
+
+YES_NO_LINE = re.compile(r'.*\b(YES|NO)\b', re.IGNORECASE)
+
 NT_BOOKS = [
     "MAT", "MRK", "LUK", "JHN", "ACT", "ROM", "1CO", "2CO",
     "GAL", "EPH", "PHP", "COL", "1TH", "2TH", "1TI", "2TI",
@@ -92,20 +100,16 @@ English: {english_translation}
 Answer ONLY "YES" or "NO". YES if the translation is valid or close. NO only if it's clearly wrong."""
 
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0}
-        }, timeout=60)
-
-        result = response.json().get("response", "").strip().upper()
+        result = ollama_client.generate(
+            MODEL, prompt, {"temperature": 0}, timeout=60,
+            stream=streaming.LineStream(YES_NO_LINE, {1}, key=lambda m: 1)).upper()
         return "YES" in result
     except Exception as e:
         print(f"  Error calling Ollama: {e}")
         return None
 
 
+@cached_batch(MODEL, NUMBERED_PROMPT_VERSION)
 def translate_chunk_numbered(arabic_words, full_verse_ar, full_verse_en, chunk_idx):
     """
     Translate a chunk of words using NUMBERED format for alignment
@@ -128,14 +132,10 @@ Format: NUMBER. TRANSLATION
 Your {num_words} translations:"""
 
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0.1, "num_predict": 300}
-        }, timeout=120)
-
-        result = response.json().get("response", "").strip()
+        # num_predict is sized per chunk by output_budget
+        result = ollama_client.generate(MODEL, prompt, {"temperature": 0.1}, timeout=120,
+                                        stream=streaming.numbered(num_words),
+                                        budget=output_budget.plan(MODEL, num_words))
 
         # Parse numbered responses
         translations = {}
@@ -166,17 +166,8 @@ def regenerate_verse_mappings(arabic_verse, english_verse):
     Regenerate mappings using numbered format (proven approach from repair scripts)
     Chunks long verses for better accuracy
     """
-    # Extract words with positions
-    words_with_pos = []
-    current_pos = 0
-    for token in re.split(r'(\s+)', arabic_verse):
-        if token.strip():
-            start = current_pos
-            end = current_pos + len(token)
-            # Filter: only words >= 3 chars
-            if len(token) >= 3:
-                words_with_pos.append((token, start, end))
-        current_pos += len(token)
+    # Words >= 3 chars, with positions
+    words_with_pos = mapped_words(arabic_verse)
 
     words_only = [w for w, s, e in words_with_pos]
     num_words = len(words_only)
@@ -307,13 +298,8 @@ def fix_verse(verse_data, book, chapter, verse_num, mappings_dir):
                 # Get translation for this word
                 word_prompt = f"What does the Arabic word '{m['ar']}' mean in English? Reply with ONLY the English translation, 1-3 words."
                 try:
-                    response = requests.post(OLLAMA_URL, json={
-                        "model": MODEL,
-                        "prompt": word_prompt,
-                        "stream": False,
-                        "options": {"temperature": 0}
-                    }, timeout=30)
-                    m['en'] = response.json().get("response", "").strip()
+                    m['en'] = ollama_client.generate(MODEL, word_prompt, {"temperature": 0}, timeout=30,
+                                                      stream=streaming.plain(1))
                 except:
                     pass
         return shifted_mappings
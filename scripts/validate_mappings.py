@@ -9,6 +9,13 @@ import os
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import validation
+from pipeline.corpus_store import synced_store
+from pipeline.mmap_corpus import open_corpus
+
+MAPPINGS_DIR = "bible-translations/mappings"
+
 def validate_position_accuracy(verse_data):
     """Check if start/end positions match the actual Arabic substring."""
     issues = []
@@ -140,6 +147,10 @@ def validate_chapter(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
+    return validate_chapter_data(data, filepath)
+
+def validate_chapter_data(data, filepath):
+    """Validate all verses in an already-loaded chapter."""
     results = {
         "file": str(filepath),
         "book": data.get("book", "unknown"),
@@ -167,14 +178,66 @@ def validate_chapter(filepath):
 def validate_book(book_dir):
     """Validate all chapters in a book."""
     book_path = Path(book_dir)
+    tree = str(book_path.parent)
     all_results = []
 
-    for chapter_file in sorted(book_path.glob("*.json"), key=lambda x: int(x.stem)):
-        results = validate_chapter(chapter_file)
+    # Read the book from the packed corpus store (refreshed from any
+    # chapter files that changed) rather than parsing each JSON file
+    store = synced_store(tree, [book_path.name])
+    for book, chapter, data in store.iter_chapters(tree, [book_path.name]):
+        results = validate_chapter_data(data, book_path / f"{chapter}.json")
         all_results.append(results)
 
     return all_results
 
+def validate_positions_fast(books=None):
+    """Position-only check of many books over the mmap corpus (no per-mapping dicts)."""
+    mismatches_by_book = {}
+    with open_corpus(MAPPINGS_DIR) as corpus:
+        for v, j, n in corpus.position_mismatches():
+            book, chapter, verse_num = corpus.key(v)
+            if books and book not in books:
+                continue
+            start, end = corpus.mapping_span(j)
+            text = corpus.verse_text(v)
+            actual = text[start:end] if start is not None and end is not None else None
+            mismatches_by_book.setdefault(book, []).append({
+                "type": "position_mismatch",
+                "chapter": chapter,
+                "verse": verse_num,
+                "index": n,
+                "expected": corpus.mapping_word(j),
+                "actual": actual,
+                "start": start,
+                "end": end
+            })
+        total_mappings = corpus.mapping_count
+
+    print(f"Checked {total_mappings} mappings")
+    for book, issues in sorted(mismatches_by_book.items()):
+        print(f"\n{book}: {len(issues)} position mismatches")
+        for issue in issues[:3]:
+            print(f"  {issue['chapter']}:{issue['verse']}: Expected '{issue['expected']}' but got '{issue['actual']}'")
+
+    total = sum(len(issues) for issues in mismatches_by_book.values())
+    print(f"\n{'='*50}")
+    print(f"Total position mismatches: {total}")
+    return mismatches_by_book
+
+def write_issue_table(books=None):
+    """All checks over many books as arrays, in parallel; writes the issue table repair scripts read."""
+    table = validation.validate_tree(MAPPINGS_DIR, books, workers=min(8, os.cpu_count() or 1))
+    path = validation.write_issue_table(table)
+
+    print(f"Checked {table['mappings']} mappings in {len(table['books'])} books")
+    for issue_type, count in table["counts"].items():
+        if count:
+            print(f"  {issue_type}: {count}")
+
+    print(f"\n{'='*50}")
+    print(f"Total issues found: {len(table['rows'])} (written to {path})")
+    return table
+
 def print_summary(results):
     """Print a summary of validation results."""
     total_issues = 0
@@ -211,7 +274,7 @@ def print_summary(results):
 
 def validate_multiple_books(books):
     """Validate multiple books and return combined results."""
-    mappings_dir = Path("bible-translations/mappings")
+    mappings_dir = Path(MAPPINGS_DIR)
     all_results = {}
 
     for book in books:
@@ -273,6 +336,8 @@ def main():
         print("  python validate_mappings.py <BOOK> <CHAPTER>    # Validate single chapter")
         print("  python validate_mappings.py <BOOK1> <BOOK2> ... # Validate multiple books")
         print("  python validate_mappings.py --all               # Validate all mapped books")
+        print("  python validate_mappings.py --positions [BOOK ...] # Fast position-only check")
+        print(f"  python validate_mappings.py --table [BOOK ...]     # All checks -> {validation.ISSUES_PATH}")
         print("\nExample:")
         print("  python validate_mappings.py MRK")
         print("  python validate_mappings.py JHN 3")
@@ -280,7 +345,19 @@ def main():
         print("  python validate_mappings.py --all")
         sys.exit(1)
 
-    mappings_dir = Path("bible-translations/mappings")
+    mappings_dir = Path(MAPPINGS_DIR)
+
+    # Fast whole-Bible (or per-book) position check over the mmap corpus
+    if sys.argv[1] == "--positions":
+        books = sys.argv[2:] or None
+        mismatches = validate_positions_fast(books)
+        sys.exit(1 if mismatches else 0)
+
+    # Array-based check of every issue type, written as a table for the fix scripts
+    if sys.argv[1] == "--table":
+        books = sys.argv[2:] or None
+        table = write_issue_table(books)
+        sys.exit(1 if table["rows"] else 0)
 
     # Check for --all flag
     if sys.argv[1] == "--all":